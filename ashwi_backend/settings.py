@@ -43,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'products.middleware.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'ashwi_backend.urls'
@@ -71,6 +72,24 @@ DATABASES = {
     }
 }
 
+# Read replicas: SQLite snapshots of the primary, refreshed with the online
+# backup API (see `manage.py refresh_replicas`)
+REPLICA_DATABASES = []
+for _i in range(1, int(os.getenv('DJANGO_SQLITE_REPLICAS', '0')) + 1):
+    _alias = f'replica_{_i}'
+    DATABASES[_alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.replica{_i}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(_alias)
+
+DATABASE_ROUTERS = ['products.db_routers.ReplicaRouter']
+# Seconds a client reads from primary after its own write
+REPLICA_PIN_SECONDS = int(os.getenv('DJANGO_REPLICA_PIN_SECONDS', '10'))
+# Snapshot replicas as soon as a catalogue write commits
+REPLICA_REFRESH_ON_CHANGE = os.getenv('DJANGO_REPLICA_REFRESH_ON_CHANGE', 'True').lower() in ('1','true','yes')
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -105,6 +124,83 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    # Token-bucket limits per action ('burst/period'), see products.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'review_create': os.getenv('DJANGO_THROTTLE_REVIEW_CREATE', '5/hour'),
+        'product_search': os.getenv('DJANGO_THROTTLE_PRODUCT_SEARCH', '30/min'),
+    },
 }
 
+# Shared throttle counters, consistent across all worker processes
+THROTTLE_DB_PATH = BASE_DIR / 'throttle.sqlite3'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Maximum products per /api/products/batch/ request
+PRODUCT_BATCH_MAX_ITEMS = 50
+
+# Shared across worker processes so catalogue writes invalidate every copy
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'django',
+    }
+}
+
+# /api/home/: products per section, categories shown and how long a bundle
+# is served before it is rebuilt even without a catalogue change
+HOME_SECTION_SIZE = 4
+HOME_CATEGORY_LIMIT = 12
+HOME_CACHE_TIMEOUT = 300
+
+# Cache-Control max-age (seconds) on catalogue GET responses; shortened to
+# the next scheduled sale start or end so no cache outlives a price
+PRODUCT_CACHE_MAX_AGE = 300
+
+# Latest approved reviews embedded in product detail; the rest are paged at
+# /api/products/{slug}/reviews/
+PRODUCT_DETAIL_REVIEWS = 5
+
+# Sitemaps: storefront URLs, URLs per product shard and the shard file cache
+FRONTEND_BASE_URL = os.getenv('DJANGO_FRONTEND_BASE_URL', 'https://ashwi-furniture.com')
+SITEMAP_SHARD_SIZE = 50000
+SITEMAP_CACHE_DIR = BASE_DIR / 'cache' / 'sitemaps'
+
+# Product views are buffered per worker and flushed after this many views or
+# seconds; popularity is recomputed every POPULARITY_UPDATE_INTERVAL seconds
+# and halves for every POPULARITY_HALF_LIFE_DAYS of age
+POPULARITY_FLUSH_THRESHOLD = 200
+POPULARITY_FLUSH_INTERVAL = 60
+POPULARITY_UPDATE_INTERVAL = 3600
+POPULARITY_HALF_LIFE_DAYS = 7
+POPULARITY_WINDOW_DAYS = 90
+
+# Optional NumPy engine for /api/products/ filters and ordering, answered from
+# memory-mapped column snapshots shared by all workers (see products.columnar)
+COLUMNAR_ENGINE = os.getenv('DJANGO_COLUMNAR_ENGINE', 'False').lower() in ('1','true','yes')
+COLUMNAR_SNAPSHOT_DIR = BASE_DIR / 'cache' / 'columnar'
+
+# Archival (archive_catalogue): days a product stays inactive, and a review
+# unapproved, before it is moved to the archive tables
+PRODUCT_ARCHIVE_AFTER_DAYS = int(os.getenv('DJANGO_PRODUCT_ARCHIVE_AFTER_DAYS', '180'))
+REVIEW_ARCHIVE_AFTER_DAYS = int(os.getenv('DJANGO_REVIEW_ARCHIVE_AFTER_DAYS', '30'))
+
+# Admin changelists show an estimated total above this many rows
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Stock reservations: default and maximum hold time in seconds
+STOCK_RESERVATION_TTL = int(os.getenv('DJANGO_STOCK_RESERVATION_TTL', '900'))
+STOCK_RESERVATION_MAX_TTL = 3600
+
+# POS/warehouse sync (/api/inventory/sync/): items per batch, and how long
+# applied batch ids are remembered for idempotent retries
+INVENTORY_SYNC_MAX_ITEMS = 1000
+INVENTORY_SYNC_RETENTION_DAYS = 7
+
+# Background jobs (run_worker): attempts before giving up, base retry delay in
+# seconds (doubled per attempt), and how long a running job may hold its lock
+# before it is assumed abandoned and requeued
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF_SECONDS = 30
+JOB_LOCK_TIMEOUT = int(os.getenv('DJANGO_JOB_LOCK_TIMEOUT', '1800'))
+JOB_WORKER_CONCURRENCY = int(os.getenv('DJANGO_JOB_WORKER_CONCURRENCY', '2'))
@@ -12,8 +12,9 @@ interface Props {
 const ProductCard: React.FC<Props> = ({ product }) => {
   const average = product.average_rating || 0;
   const primaryImage = product.primary_image || product.images?.[0] || null;
-  const priceText = formatPriceNPR(product.sale_price || product.price);
-  const strikeText = product.sale_price ? formatPriceNPR(product.price) : '';
+  const onSale = parseFloat(product.effective_price) < parseFloat(product.price);
+  const priceText = formatPriceNPR(product.effective_price);
+  const strikeText = onSale ? formatPriceNPR(product.price) : '';
 
   return (
     <div className="product-card">
@@ -34,7 +35,7 @@ const ProductCard: React.FC<Props> = ({ product }) => {
           {product.is_bestseller && (
             <span className="absolute top-2 right-2 badge badge-bestseller">Bestseller</span>
           )}
-          {product.sale_price && (
+          {onSale && (
             <span className="absolute bottom-2 left-2 badge badge-sale">On Sale</span>
           )}
         </div>
@@ -4,28 +4,26 @@ import { ArrowRightIcon } from '@heroicons/react/24/outline';
 
 import ProductCard from '../components/ProductCard';
 import SEO from '../components/SEO';
-import { productsApi, categoriesApi } from '../services/api';
+import { homeApi } from '../services/api';
 import { Product, Category } from '../types';
 import { generateOrganizationSchema, generateWebsiteSchema } from '../utils/structuredData';
 
 const HomePage: React.FC = () => {
   const [featuredProducts, setFeaturedProducts] = useState<Product[]>([]);
   const [bestsellerProducts, setBestsellerProducts] = useState<Product[]>([]);
+  const [saleProducts, setSaleProducts] = useState<Product[]>([]);
   const [categories, setCategories] = useState<Category[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [featured, bestsellers, categoriesData] = await Promise.all([
-          productsApi.getFeatured(),
-          productsApi.getBestsellers(),
-          categoriesApi.getAll(),
-        ]);
+        const home = await homeApi.get();
         
-        setFeaturedProducts(featured.results.slice(0, 4));
-        setBestsellerProducts(bestsellers.results.slice(0, 4));
-        setCategories(categoriesData);
+        setFeaturedProducts(home.featured);
+        setBestsellerProducts(home.bestsellers);
+        setSaleProducts(home.on_sale);
+        setCategories(home.categories);
       } catch (error) {
         console.error('Error fetching data:', error);
       } finally {
@@ -220,6 +218,37 @@ const HomePage: React.FC = () => {
           </div>
         </section>
 
+        {/* On Sale */}
+        {saleProducts.length > 0 && (
+          <section className="py-16 bg-gray-50">
+            <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
+              <div className="flex justify-between items-center mb-12">
+                <div>
+                  <h2 className="text-3xl font-bold text-gray-900 mb-2">
+                    On Sale
+                  </h2>
+                  <p className="text-lg text-gray-600">
+                    Quality furniture at reduced prices
+                  </p>
+                </div>
+                <Link
+                  to="/products?on_sale=true"
+                  className="text-primary-600 hover:text-primary-700 font-semibold flex items-center"
+                >
+                  View All
+                  <ArrowRightIcon className="ml-2 h-4 w-4" />
+                </Link>
+              </div>
+              
+              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
+                {saleProducts.map((product) => (
+                  <ProductCard key={product.id} product={product} />
+                ))}
+              </div>
+            </div>
+          </section>
+        )}
+
 
         {/* CTA Section */}
         <section className="py-16 bg-primary-600 text-white">
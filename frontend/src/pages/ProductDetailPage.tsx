@@ -59,7 +59,7 @@ const ProductDetailPage: React.FC = () => {
 
   // Generate SEO meta description
   const metaDescription = product.meta_description || 
-    `${product.short_description || product.description.slice(0, 150)}. ${product.material} material, ${product.finish} finish. Price: ${formatPriceNPR(product.sale_price || product.price)}. ${product.stock_quantity > 0 ? 'In stock' : 'Out of stock'} at Ashwi Furniture.`;
+    `${product.short_description || product.description.slice(0, 150)}. ${product.material} material, ${product.finish} finish. Price: ${formatPriceNPR(product.effective_price)}. ${product.stock_quantity > 0 ? 'In stock' : 'Out of stock'} at Ashwi Furniture.`;
 
   const metaTitle = product.meta_title || 
     `${product.name} - ${product.category.name} | Ashwi Furniture`;
@@ -130,13 +130,13 @@ const ProductDetailPage: React.FC = () => {
             
             <div className="flex items-center gap-3 mb-4">
               <span className="text-2xl font-bold text-primary-600">
-                {formatPriceNPR(product.sale_price || product.price)}
+                {formatPriceNPR(product.effective_price)}
               </span>
-              {product.sale_price && (
+              {parseFloat(product.effective_price) < parseFloat(product.price) && (
                 <>
                   <span className="text-gray-500 line-through">{formatPriceNPR(product.price)}</span>
                   <span className="bg-red-100 text-red-600 px-2 py-1 rounded text-sm font-medium">
-                    Save {Math.round((1 - parseFloat(product.sale_price) / parseFloat(product.price)) * 100)}%
+                    Save {product.discount_percent}%
                   </span>
                 </>
               )}
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useLocation } from 'react-router-dom';
 import SEO from '../components/SEO';
 import { productsApi } from '../services/api';
-import { Product, ProductListResponse } from '../types';
+import { Product, ProductSearchResponse } from '../types';
 import ProductCard from '../components/ProductCard';
 
 function useQuery() {
@@ -13,18 +13,21 @@ const SearchPage: React.FC = () => {
   const query = useQuery();
   const q = query.get('q') || '';
   const [products, setProducts] = useState<Product[]>([]);
+  const [didYouMean, setDidYouMean] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
 
   useEffect(() => {
     const run = async () => {
       if (!q) {
         setProducts([]);
+        setDidYouMean(null);
         return;
       }
       setLoading(true);
       try {
-        const resp: ProductListResponse = await productsApi.search(q);
+        const resp: ProductSearchResponse = await productsApi.search(q);
         setProducts(resp.results);
+        setDidYouMean(resp.did_you_mean);
       } finally {
         setLoading(false);
       }
@@ -66,6 +69,15 @@ const SearchPage: React.FC = () => {
           {!loading && products.length > 0 && (
             <p className="text-gray-600">Found {products.length} product{products.length !== 1 ? 's' : ''}</p>
           )}
+          {!loading && didYouMean && (
+            <p className="text-gray-600 mt-1">
+              {products.length > 0 ? 'Showing results for' : 'Did you mean'}{' '}
+              <a href={`/search?q=${encodeURIComponent(didYouMean)}`} className="text-primary-600 hover:text-primary-700 font-semibold">
+                {didYouMean}
+              </a>
+              {products.length > 0 ? '' : '?'}
+            </p>
+          )}
         </div>
 
         {loading && (
@@ -2,11 +2,15 @@ import axios from 'axios';
 import { 
   Product, 
   ProductListResponse, 
+  ProductSearchResponse,
+  ProductBatchResponse,
   Category, 
   CategoryListResponse,
   Subcategory,
   SubcategoryListResponse,
   ProductReview,
+  ReviewPage,
+  HomeBundle,
   FilterOptions
 } from '../types';
 
@@ -91,6 +95,12 @@ export const productsApi = {
     return response.data;
   },
   
+  // Fetch several products (cart, wishlist, recently viewed) in one request
+  getBatch: async (slugs: string[]): Promise<ProductBatchResponse> => {
+    const response = await api.get<ProductBatchResponse>(`/products/batch/?slugs=${slugs.map(encodeURIComponent).join(',')}`);
+    return response.data;
+  },
+  
   getFeatured: async (): Promise<ProductListResponse> => {
     const response = await api.get<ProductListResponse>('/products/featured/');
     return response.data;
@@ -106,16 +116,26 @@ export const productsApi = {
     return response.data;
   },
   
-  search: async (query: string): Promise<ProductListResponse> => {
-    const response = await api.get<ProductListResponse>(`/products/search/?q=${encodeURIComponent(query)}`);
+  search: async (query: string): Promise<ProductSearchResponse> => {
+    const response = await api.get<ProductSearchResponse>(`/products/search/?q=${encodeURIComponent(query)}`);
+    return response.data;
+  },
+};
+
+// Homepage API
+export const homeApi = {
+  // Categories, featured, bestsellers and on-sale products in one request
+  get: async (): Promise<HomeBundle> => {
+    const response = await api.get<HomeBundle>('/home/');
     return response.data;
   },
 };
 
 // Reviews API
 export const reviewsApi = {
-  getByProduct: async (productSlug: string): Promise<ProductReview[]> => {
-    const response = await api.get<ProductReview[]>(`/products/${productSlug}/reviews/`);
+  // Pass the previous page's `next` URL to continue
+  getByProduct: async (productSlug: string, next?: string): Promise<ReviewPage> => {
+    const response = await api.get<ReviewPage>(next || `/products/${productSlug}/reviews/`);
     return response.data;
   },
   
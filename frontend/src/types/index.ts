@@ -58,6 +58,11 @@ export interface Product {
   description: string;
   price: string;
   sale_price: string | null;
+  sale_starts_at: string | null;
+  sale_ends_at: string | null;
+  // The price charged now: sale_price only while its window is open
+  effective_price: string;
+  discount_percent: number;
   cost_price: string | null;
   stock_quantity: number;
   low_stock_threshold: number;
@@ -80,6 +85,7 @@ export interface Product {
   reviews: ProductReview[];
   average_rating: number;
   review_count: number;
+  rating_histogram: Record<'1' | '2' | '3' | '4' | '5', number>;
   created_at: string;
   updated_at: string;
 }
@@ -91,6 +97,31 @@ export interface ProductListResponse {
   results: Product[];
 }
 
+export interface ProductSearchResponse extends ProductListResponse {
+  did_you_mean: string | null;
+}
+
+export interface HomeBundle {
+  categories: Category[];
+  featured: Product[];
+  bestsellers: Product[];
+  on_sale: Product[];
+}
+
+export interface ReviewPage {
+  next: string | null;
+  previous: string | null;
+  results: ProductReview[];
+}
+
+export interface ProductBatchResponse {
+  results: Product[];
+  missing: {
+    slugs: string[];
+    ids: number[];
+  };
+}
+
 export interface CategoryListResponse {
   count: number;
   next: string | null;
@@ -38,7 +38,7 @@ export const generateOrganizationSchema = () => {
 };
 
 export const generateProductSchema = (product: Product) => {
-  const price = product.sale_price || product.price;
+  const price = product.effective_price;
   
   return {
     '@context': 'https://schema.org',
@@ -211,7 +211,7 @@ export const generateOfferCatalogSchema = (products: any[]) => {
         sku: product.sku,
         offers: {
           '@type': 'Offer',
-          price: parseFloat(product.sale_price || product.price),
+          price: parseFloat(product.effective_price),
           priceCurrency: 'USD',
           availability: product.stock_quantity > 0 
             ? 'https://schema.org/InStock' 
@@ -1,8 +1,25 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, Q
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from django.urls import reverse
+from django.urls import path, reverse
 from django.utils.safestring import mark_safe
-from .models import Category, Subcategory, Product, ProductImage, ProductReview
+from .archive import restore_products, restore_reviews
+from .changes import touch_products
+from .forms import BulkSalePricingForm
+from .inventory import inventory_report
+from .merchandising import apply_sale_pricing, clear_sale_pricing, set_merchandising_flags
+from .models import (
+    ArchivedProduct, ArchivedReview, Category, InventorySyncBatch, Subcategory, Product, ProductImage, ProductReview, StockReservation
+)
+from .reviews import refresh_rating_histograms
+from .search import search_index_available, build_match_query, matching_product_ids
+from .signals import catalogue_changed
 from decimal import Decimal
 
 class ProductImageInline(admin.TabularInline):
@@ -28,6 +45,46 @@ def _format_npr(amount):
     # No decimals for price display
     return f"NPR {value:,.0f}"
 
+
+def _estimate_row_count(model, using):
+    """Cheap row-count estimate for a whole table, or None if unavailable"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            # Rowids only grow, so MAX() is an upper bound read straight off the primary key
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates the total instead of COUNT(*) on large unfiltered tables"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class SubcategoryListFilter(admin.RelatedFieldListFilter):
+    """Subcategory filter that loads categories in the same query for __str__"""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin) or Subcategory._meta.ordering
+        return [
+            (subcategory.pk, str(subcategory))
+            for subcategory in Subcategory.objects.select_related('category').order_by(*ordering)
+        ]
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'is_active', 'product_count', 'created_at']
@@ -36,9 +93,13 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at', 'updated_at']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_product_count=Count('products'))
+    
     def product_count(self, obj):
-        return obj.products.count()
+        return obj._product_count
     product_count.short_description = 'Products'
+    product_count.admin_order_field = '_product_count'
 
 @admin.register(Subcategory)
 class SubcategoryAdmin(admin.ModelAdmin):
@@ -47,10 +108,19 @@ class SubcategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description', 'category__name']
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['category']
+    autocomplete_fields = ['category']
+    
+    def get_queryset(self, request):
+        # select_related here also covers autocomplete results, which render __str__
+        return super().get_queryset(request).select_related('category').annotate(
+            _product_count=Count('products')
+        )
     
     def product_count(self, obj):
-        return obj.products.count()
+        return obj._product_count
     product_count.short_description = 'Products'
+    product_count.admin_order_field = '_product_count'
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -59,10 +129,15 @@ class ProductAdmin(admin.ModelAdmin):
         'stock_quantity', 'is_active', 'is_featured', 'is_bestseller', 'created_at'
     ]
     list_filter = [
-        'category', 'subcategory', 'is_active', 'is_featured', 'is_bestseller',
+        'category', ('subcategory', SubcategoryListFilter), 'is_active', 'is_featured', 'is_bestseller',
         'material', 'finish', 'created_at'
     ]
-    search_fields = ['name', 'sku', 'description', 'category__name', 'subcategory__name']
+    # On SQLite get_search_results goes through the full-text index instead
+    search_fields = ['name', '=sku', 'category__name', 'subcategory__name']
+    list_select_related = ['category', 'subcategory__category']
+    autocomplete_fields = ['category', 'subcategory']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = [
         'sku', 'created_at', 'updated_at', 'is_on_sale', 'discount_percentage',
@@ -79,6 +154,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': (
                 ('price', 'price_display_npr'),
                 ('sale_price', 'sale_price_display_npr'),
+                ('sale_starts_at', 'sale_ends_at'),
                 ('cost_price', 'cost_price_display_npr'),
             )
         }),
@@ -102,6 +178,108 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
     inlines = [ProductImageInline, ProductReviewInline]
+    actions = [
+        'apply_sale_pricing', 'clear_sale_pricing', 'mark_featured', 'unmark_featured',
+        'mark_bestseller', 'unmark_bestseller'
+    ]
+    
+    def _bulk_progress(self):
+        batches = []
+        return batches, lambda done, total: batches.append((done, total))
+    
+    def apply_sale_pricing(self, request, queryset):
+        form = BulkSalePricingForm(request.POST if 'apply' in request.POST else None)
+        if form.is_bound and form.is_valid():
+            batches, progress = self._bulk_progress()
+            updated, skipped = apply_sale_pricing(
+                queryset,
+                form.cleaned_data['mode'],
+                form.cleaned_data['amount'],
+                form.cleaned_data['rounding'],
+                progress=progress,
+                starts_at=form.cleaned_data['starts_at'],
+                ends_at=form.cleaned_data['ends_at']
+            )
+            self.message_user(request, f'Sale price set on {updated} products in {len(batches)} batches.')
+            if skipped:
+                self.message_user(
+                    request,
+                    f'{skipped} products were skipped because the discount left no valid sale price.',
+                    messages.WARNING
+                )
+            return None
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Apply sale pricing',
+            'form': form,
+            'selected_ids': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'product_count': queryset.count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'select_across': request.POST.get('select_across', '0'),
+        }
+        return TemplateResponse(request, 'admin/products/product/bulk_sale_pricing.html', context)
+    apply_sale_pricing.short_description = "Apply sale pricing to selected products"
+    
+    def clear_sale_pricing(self, request, queryset):
+        batches, progress = self._bulk_progress()
+        updated = clear_sale_pricing(queryset, progress=progress)
+        self.message_user(request, f'Sale price removed from {updated} products in {len(batches)} batches.')
+    clear_sale_pricing.short_description = "Remove sale pricing from selected products"
+    
+    def _set_flags(self, request, queryset, label, **flags):
+        batches, progress = self._bulk_progress()
+        updated = set_merchandising_flags(queryset, progress=progress, **flags)
+        self.message_user(request, f'{updated} products {label} in {len(batches)} batches.')
+    
+    def mark_featured(self, request, queryset):
+        self._set_flags(request, queryset, 'marked as featured', is_featured=True)
+    mark_featured.short_description = "Mark selected products as featured"
+    
+    def unmark_featured(self, request, queryset):
+        self._set_flags(request, queryset, 'removed from featured', is_featured=False)
+    unmark_featured.short_description = "Remove selected products from featured"
+    
+    def mark_bestseller(self, request, queryset):
+        self._set_flags(request, queryset, 'marked as bestsellers', is_bestseller=True)
+    mark_bestseller.short_description = "Mark selected products as bestsellers"
+    
+    def unmark_bestseller(self, request, queryset):
+        self._set_flags(request, queryset, 'removed from bestsellers', is_bestseller=False)
+    unmark_bestseller.short_description = "Remove selected products from bestsellers"
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_index_available(queryset.db) or not build_match_query(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        
+        term = search_term.strip()
+        matches = (
+            Q(pk__in=matching_product_ids(term)) |
+            Q(sku__iexact=term) |
+            Q(category__in=Category.objects.filter(name__icontains=term)) |
+            Q(subcategory__in=Subcategory.objects.filter(name__icontains=term))
+        )
+        return queryset.filter(matches), False
+    
+    def get_urls(self):
+        urls = [
+            path(
+                'inventory-report/',
+                self.admin_site.admin_view(self.inventory_report_view),
+                name='products_product_inventory_report'
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def inventory_report_view(self, request):
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Inventory report',
+            'report': inventory_report(),
+        }
+        return TemplateResponse(request, 'admin/products/product/inventory_report.html', context)
     
     def current_price_display(self, obj):
         if obj.is_on_sale:
@@ -132,6 +310,10 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_filter = ['is_primary', 'created_at']
     search_fields = ['product__name', 'alt_text']
     readonly_fields = ['created_at']
+    list_select_related = ['product']
+    autocomplete_fields = ['product']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def image_preview(self, obj):
         if obj.image:
@@ -148,14 +330,118 @@ class ProductReviewAdmin(admin.ModelAdmin):
     list_filter = ['rating', 'is_approved', 'created_at']
     search_fields = ['product__name', 'customer_name', 'title', 'comment']
     readonly_fields = ['created_at']
+    list_select_related = ['product']
+    autocomplete_fields = ['product']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ['approve_reviews', 'disapprove_reviews']
     
+    def _set_approved(self, queryset, approved):
+        # update() skips the review signals that keep product rating stats current
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        updated = queryset.update(is_approved=approved)
+        refresh_rating_histograms(product_ids)
+        touch_products(product_ids)
+        # One notification for the batch, as the bulk merchandising actions send
+        if updated:
+            catalogue_changed.send(sender=Product, instance=None)
+        return updated
+    
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        updated = self._set_approved(queryset, True)
         self.message_user(request, f'{updated} reviews have been approved.')
     approve_reviews.short_description = "Approve selected reviews"
     
     def disapprove_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=False)
+        updated = self._set_approved(queryset, False)
         self.message_user(request, f'{updated} reviews have been disapproved.')
     disapprove_reviews.short_description = "Disapprove selected reviews"
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['token', 'product', 'user', 'quantity', 'status', 'expires_at', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['token', 'product__name', 'product__sku', 'user__username']
+    list_select_related = ['product', 'user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['token', 'product', 'user', 'quantity', 'status', 'expires_at', 'created_at', 'updated_at']
+    
+    def has_add_permission(self, request):
+        # Reservations deduct stock, so they are only created through the API
+        return False
+
+
+class ArchiveAdmin(admin.ModelAdmin):
+    """Read-only view of archived rows; they leave the archive only through the restore actions"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def _report(self, request, message, errors):
+        self.message_user(request, message)
+        for error in errors:
+            self.message_user(request, error, messages.ERROR)
+
+
+@admin.register(ArchivedProduct)
+class ArchivedProductAdmin(ArchiveAdmin):
+    list_display = ['name', 'sku', 'product_id', 'image_count', 'review_count', 'last_updated_at', 'archived_at']
+    list_filter = ['archived_at']
+    search_fields = ['name', '=sku', 'slug']
+    date_hierarchy = 'archived_at'
+    actions = ['restore']
+    
+    def image_count(self, obj):
+        return len(obj.images)
+    image_count.short_description = 'Images'
+    
+    def review_count(self, obj):
+        return len(obj.reviews)
+    review_count.short_description = 'Reviews'
+    
+    def restore(self, request, queryset):
+        restored, errors = restore_products(queryset)
+        self._report(request, f'{restored} products have been restored as inactive.', errors)
+    restore.short_description = "Restore selected products"
+
+
+@admin.register(ArchivedReview)
+class ArchivedReviewAdmin(ArchiveAdmin):
+    list_display = ['customer_name', 'product_id', 'rating', 'title', 'created_at', 'archived_at']
+    list_filter = ['rating', 'archived_at']
+    search_fields = ['customer_name', 'email', 'title', 'comment']
+    date_hierarchy = 'archived_at'
+    actions = ['restore', 'restore_approved']
+    
+    def restore(self, request, queryset):
+        restored, errors = restore_reviews(queryset)
+        self._report(request, f'{restored} reviews have been restored for moderation.', errors)
+    restore.short_description = "Restore selected reviews for moderation"
+    
+    def restore_approved(self, request, queryset):
+        restored, errors = restore_reviews(queryset, approve=True)
+        self._report(request, f'{restored} reviews have been approved and restored.', errors)
+    restore_approved.short_description = "Approve and restore selected reviews"
+
+
+@admin.register(InventorySyncBatch)
+class InventorySyncBatchAdmin(admin.ModelAdmin):
+    list_display = ['batch_id', 'user', 'item_count', 'updated_count', 'created_at']
+    list_filter = ['created_at']
+    search_fields = ['=batch_id']
+    list_select_related = ['user']
+    readonly_fields = ['batch_id', 'payload_hash', 'user', 'item_count', 'updated_count', 'results', 'created_at']
+    
+    def has_add_permission(self, request):
+        # Batches are only recorded by /api/inventory/sync/
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,187 @@
+"""Hot/cold archival of inactive products and unapproved reviews
+
+Storefront queries only read active products and approved reviews, but the
+rows they skip still fill the same tables and indexes. archive_products()
+moves products left inactive (not updated) for PRODUCT_ARCHIVE_AFTER_DAYS
+into ArchivedProduct together with their images, reviews and reservations;
+archive_reviews() moves reviews still unapproved after
+REVIEW_ARCHIVE_AFTER_DAYS into ArchivedReview. Both run in batches, one
+transaction each, and delete through the ORM so the outbox, change feed
+tombstones and derived indexes follow. restore_products() and
+restore_reviews() put the rows back under their original ids.
+
+Image files stay in storage. Daily view counts are dropped; a restored
+product keeps the popularity score it was archived with.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .db_routers import pinned_to_primary
+from .models import (
+    ArchivedProduct, ArchivedReview, Category, Product, ProductImage, ProductReview, StockReservation, Subcategory
+)
+
+BATCH_SIZE = 200
+
+
+class RestoreConflict(Exception):
+    """An archived row cannot go back: its id, slug or SKU is taken, or its parent is gone"""
+
+
+def archivable_products(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.PRODUCT_ARCHIVE_AFTER_DAYS)
+    return Product.objects.filter(is_active=False, updated_at__lt=cutoff).exclude(
+        reservations__status=StockReservation.STATUS_ACTIVE
+    )
+
+
+def archivable_reviews(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.REVIEW_ARCHIVE_AFTER_DAYS)
+    return ProductReview.objects.filter(is_approved=False, created_at__lt=cutoff)
+
+
+def _batches(queryset, batch_size):
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        yield ids[start:start + batch_size], len(ids)
+
+
+def _dump_by_product(model, product_ids):
+    rows = defaultdict(list)
+    for row in serializers.serialize('python', model.objects.filter(product_id__in=product_ids).order_by('pk')):
+        rows[row['fields']['product']].append(row)
+    return rows
+
+
+def _load(rows):
+    # Raw saves keep the original ids and timestamps; post_save still runs
+    for obj in serializers.deserialize('python', rows):
+        obj.save()
+
+
+def archive_products(now=None, batch_size=BATCH_SIZE, progress=None):
+    """Move long-inactive products and their related rows into ArchivedProduct; returns the number moved"""
+    archived = 0
+    with pinned_to_primary():
+        for batch, total in _batches(archivable_products(now), batch_size):
+            with transaction.atomic():
+                # Checked again under the lock: a product reactivated since the id scan stays
+                products = list(archivable_products(now).filter(pk__in=batch).select_for_update())
+                pks = [product.pk for product in products]
+                images = _dump_by_product(ProductImage, pks)
+                reviews = _dump_by_product(ProductReview, pks)
+                reservations = _dump_by_product(StockReservation, pks)
+                ArchivedProduct.objects.bulk_create([
+                    ArchivedProduct(
+                        product_id=product.pk, name=product.name, sku=product.sku, slug=product.slug,
+                        category_id=product.category_id, data=data, images=images[product.pk],
+                        reviews=reviews[product.pk], reservations=reservations[product.pk],
+                        last_updated_at=product.updated_at,
+                    )
+                    for product, data in zip(products, serializers.serialize('python', products))
+                ])
+                Product.objects.filter(pk__in=pks).delete()
+            archived += len(products)
+            if progress:
+                progress(archived, total)
+    return archived
+
+
+def archive_reviews(now=None, batch_size=BATCH_SIZE, progress=None):
+    """Move reviews left unapproved past the moderation window into ArchivedReview; returns the number moved"""
+    archived = 0
+    with pinned_to_primary():
+        for batch, total in _batches(archivable_reviews(now), batch_size):
+            with transaction.atomic():
+                reviews = list(archivable_reviews(now).filter(pk__in=batch).select_for_update())
+                ArchivedReview.objects.bulk_create([
+                    ArchivedReview(
+                        review_id=review.pk, product_id=review.product_id, customer_name=review.customer_name,
+                        email=review.email, rating=review.rating, title=review.title, comment=review.comment,
+                        created_at=review.created_at,
+                    )
+                    for review in reviews
+                ])
+                ProductReview.objects.filter(pk__in=[review.pk for review in reviews]).delete()
+            archived += len(reviews)
+            if progress:
+                progress(archived, total)
+    return archived
+
+
+def restore_product(archived):
+    """Recreate one archived product, inactive, with its related rows; raises RestoreConflict"""
+    taken = Product.objects.filter(Q(pk=archived.product_id) | Q(slug=archived.slug) | Q(sku=archived.sku))
+    if taken.exists():
+        raise RestoreConflict(f'{archived}: a product with this id, slug or SKU already exists')
+    fields = archived.data['fields']
+    if not Category.objects.filter(pk=fields['category']).exists() or \
+            not Subcategory.objects.filter(pk=fields['subcategory']).exists():
+        raise RestoreConflict(f'{archived}: its category or subcategory has been deleted')
+
+    with transaction.atomic():
+        _load([archived.data])
+        # A fresh change sequence and updated_at, so feed clients see it and it is not archived again at once
+        Product.objects.get(pk=archived.product_id).save(update_fields=['updated_at'])
+        reservations = archived.reservations
+        users = set(get_user_model().objects.filter(
+            pk__in={row['fields'].get('user') for row in reservations}
+        ).values_list('pk', flat=True))
+        for row in reservations:
+            # Archived before reservations had users, or the user was deleted since
+            if row['fields'].get('user') not in users:
+                row['fields']['user'] = None
+        _load(archived.images + archived.reviews + reservations)
+        archived.delete()
+
+
+def restore_products(queryset):
+    """Restore archived products one transaction each; returns (restored, error messages)"""
+    restored, errors = 0, []
+    with pinned_to_primary():
+        for archived in queryset.order_by('pk'):
+            try:
+                restore_product(archived)
+            except RestoreConflict as exc:
+                errors.append(str(exc))
+            else:
+                restored += 1
+    return restored, errors
+
+
+def restore_reviews(queryset, approve=False):
+    """Put archived reviews back, approving them if asked; returns (restored, error messages)
+
+    Reviews restored unapproved are archived again by the next run unless
+    they are approved first.
+    """
+    restored, errors = 0, []
+    with pinned_to_primary():
+        archived = list(queryset.order_by('pk'))
+        existing = set(Product.objects.filter(
+            pk__in={review.product_id for review in archived}
+        ).values_list('pk', flat=True))
+        with transaction.atomic():
+            for review in archived:
+                if review.product_id not in existing:
+                    errors.append(f'{review}: product {review.product_id} is archived or deleted')
+                    continue
+                _load([{
+                    'model': 'products.productreview',
+                    'pk': review.review_id,
+                    'fields': {
+                        'product': review.product_id, 'customer_name': review.customer_name,
+                        'email': review.email, 'rating': review.rating, 'title': review.title,
+                        'comment': review.comment, 'is_approved': approve, 'created_at': review.created_at,
+                    },
+                }])
+                review.delete()
+                restored += 1
+    return restored, errors
@@ -0,0 +1,107 @@
+"""Incremental product change feed
+
+Every product write takes the next value of the 'catalogue' ChangeSequence,
+so (change_seq, id) is a total order over product changes. Clients pass back
+the opaque token from the previous page and receive only what changed since.
+Deleted products are reported from ProductTombstone rows; deactivated ones
+are still in the product table and are reported the same way.
+"""
+import base64
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChangeSequence, OutboxEvent, Product, ProductTombstone
+from .outbox import record_events
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class InvalidChangeToken(ValueError):
+    """Raised when a ?since= token was not issued by the change feed"""
+
+
+def encode_token(change_seq, pk):
+    return base64.urlsafe_b64encode(f'{change_seq}:{pk}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """(change_seq, id) position for a token; an empty token starts from the beginning"""
+    if not token:
+        return 0, 0
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        change_seq, pk = (int(part) for part in raw.split(':'))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidChangeToken('Invalid change token')
+    if change_seq < 0 or pk < 0:
+        raise InvalidChangeToken('Invalid change token')
+    return change_seq, pk
+
+
+def touch_products(product_ids):
+    """Move products to the head of the feed after a write that bypassed save()"""
+    product_ids = [pk for pk in product_ids if pk is not None]
+    if not product_ids:
+        return 0
+    updated = Product.objects.filter(pk__in=product_ids).update(
+        change_seq=ChangeSequence.next_value(),
+        updated_at=timezone.now()
+    )
+    record_events(Product, product_ids, OutboxEvent.ACTION_UPDATED)
+    return updated
+
+
+def record_tombstone(product):
+    ProductTombstone.objects.update_or_create(
+        product_id=product.pk,
+        defaults={'slug': product.slug, 'change_seq': ChangeSequence.next_value()}
+    )
+
+
+def _after(change_seq, pk, id_field):
+    return Q(change_seq__gt=change_seq) | Q(change_seq=change_seq, **{f'{id_field}__gt': pk})
+
+
+def changes_since(token, limit=DEFAULT_PAGE_SIZE, queryset=None):
+    """Next page of changes after `token`
+
+    Returns (entries, next_token, has_more). Entries are ('product', product)
+    for active products and ('deleted', (id, slug, change_seq)) for deleted or
+    deactivated ones, in change order. `queryset` lets the caller pick what is
+    loaded for active products.
+    """
+    change_seq, pk = decode_token(token)
+    queryset = Product.objects.all() if queryset is None else queryset
+
+    # Each source is read one row past the page so the merge knows if more remain
+    products = list(
+        queryset.filter(_after(change_seq, pk, 'id')).order_by('change_seq', 'id')[:limit + 1]
+    )
+    tombstones = list(
+        ProductTombstone.objects.filter(_after(change_seq, pk, 'product_id'))
+        .order_by('change_seq', 'product_id')
+        .values_list('change_seq', 'product_id', 'slug')[:limit + 1]
+    )
+
+    merged = sorted(
+        [((product.change_seq, product.pk), product) for product in products] +
+        [((seq, product_id), (product_id, slug)) for seq, product_id, slug in tombstones],
+        key=lambda entry: entry[0]
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    entries = []
+    for position, item in merged:
+        if isinstance(item, Product):
+            if item.is_active:
+                entries.append(('product', item))
+            else:
+                entries.append(('deleted', (item.pk, item.slug, position[0])))
+        else:
+            entries.append(('deleted', (*item, position[0])))
+
+    next_token = encode_token(*merged[-1][0]) if merged else (token or encode_token(0, 0))
+    return entries, next_token, has_more
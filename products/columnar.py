@@ -0,0 +1,380 @@
+"""In-memory columnar engine for the product list (optional, needs NumPy)
+
+The active catalogue is written as one .npy file per column into a versioned
+snapshot directory, and a CURRENT file names the live version. Every worker
+memory-maps the arrays read-only, so the pages are shared through the OS
+page cache, and evaluates the list filters and orderings as vectorised masks
+and sorts. Only the requested page of rows is then read from the database.
+
+Snapshots are kept current from the outbox: each one records the last
+outbox event it includes, and the products.refresh_columnar_snapshot job
+reloads the products named by newer events and patches them into a new
+version. A full rebuild happens when the outbox has been pruned past the
+snapshot. Requests the engine cannot answer exactly (other filters, bad
+values, no snapshot yet or one behind the outbox) return None and go
+through the ORM.
+"""
+import json
+import math
+import os
+import shutil
+import uuid
+from datetime import timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Max
+
+from .filters import DEFAULT_PRODUCT_ORDERING, resolve_product_ordering
+from .models import Category, OutboxEvent, Product, Subcategory
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows; the refresh lock needs it
+    fcntl = None
+
+PRODUCT_EVENT = 'products.product'
+
+# Query parameters the engine answers; anything else goes to the ORM
+SUPPORTED_PARAMS = {
+    'category', 'subcategory', 'material', 'finish', 'color', 'min_price', 'max_price',
+    'on_sale', 'in_stock', 'is_featured', 'is_bestseller', 'ordering', 'page', 'fields', 'omit', 'format',
+}
+_BOOLEANS = {'true': True, 'True': True, 'false': False, 'False': False}
+
+_SOURCE_FIELDS = [
+    'id', 'category_id', 'subcategory_id', 'material', 'finish', 'color', 'name', 'price', 'effective_price',
+    'discount_percent', 'stock_quantity', 'is_featured', 'is_bestseller', 'popularity', 'created_at',
+]
+# Ordering names from products.filters mapped to snapshot columns
+_SORT_COLUMNS = {
+    'effective_price': 'effective_cents',
+    'discount_percent': 'discount_percent',
+    'created_at': 'created_at',
+    'name': 'name',
+    'popularity': 'popularity',
+}
+
+
+def engine_enabled():
+    return np is not None and fcntl is not None and settings.COLUMNAR_ENGINE
+
+
+def _cents(value):
+    return -1 if value is None else int(value * 100)
+
+
+def _micros(value):
+    return int(value.astimezone(dt_timezone.utc).timestamp() * 1_000_000)
+
+
+def _columns(rows):
+    """Column arrays for (values_list) product rows"""
+    rows = list(rows)
+    get = {name: [row[i] for row in rows] for i, name in enumerate(_SOURCE_FIELDS)}
+    return {
+        'id': np.array(get['id'], dtype=np.int64),
+        'category_id': np.array(get['category_id'], dtype=np.int64),
+        'subcategory_id': np.array(get['subcategory_id'], dtype=np.int64),
+        # Fixed-width unicode compares and sorts by code point, like SQLite's binary collation
+        'material': np.array(get['material'], dtype=np.str_),
+        'finish': np.array(get['finish'], dtype=np.str_),
+        'color': np.array(get['color'], dtype=np.str_),
+        'name': np.array(get['name'], dtype=np.str_),
+        'price_cents': np.array([_cents(value) for value in get['price']], dtype=np.int64),
+        'effective_cents': np.array([_cents(value) for value in get['effective_price']], dtype=np.int64),
+        'discount_percent': np.array([value or 0 for value in get['discount_percent']], dtype=np.int64),
+        'stock_quantity': np.array(get['stock_quantity'], dtype=np.int64),
+        'is_featured': np.array(get['is_featured'], dtype=bool),
+        'is_bestseller': np.array(get['is_bestseller'], dtype=bool),
+        'popularity': np.array(get['popularity'], dtype=np.float64),
+        'created_at': np.array([_micros(value) for value in get['created_at']], dtype=np.int64),
+    }
+
+
+class Snapshot:
+    """One published, memory-mapped version of the catalogue columns"""
+
+    def __init__(self, path):
+        self.path = path
+        self.version = os.path.basename(path)
+        with open(os.path.join(path, 'meta.json')) as meta_file:
+            self.meta = json.load(meta_file)
+        # Empty arrays cannot be memory-mapped
+        mmap_mode = 'r' if self.meta['count'] else None
+        self.columns = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in self.meta['columns']
+        }
+        self.orders = {
+            name: np.load(os.path.join(path, f'order_{name}.npy'), mmap_mode=mmap_mode)
+            for name in self.meta['orders']
+        }
+        self.category_ids = set(self.meta['category_ids'])
+        self.subcategory_ids = set(self.meta['subcategory_ids'])
+
+    @property
+    def position(self):
+        return self.meta['position']
+
+    def __len__(self):
+        return self.meta['count']
+
+    def select(self, conditions, ordering):
+        """Product ids matching every condition, in `ordering` order"""
+        columns = self.columns
+        mask = np.ones(len(self), dtype=bool)
+        for name, op, value in conditions:
+            column = columns[name]
+            if op == 'eq':
+                mask &= column == value
+            elif op == 'gte':
+                mask &= column >= value
+            elif op == 'lte':
+                mask &= column <= value
+            elif op == 'on_sale':
+                # effective_price only drops below price inside an open sale window
+                mask &= columns['effective_cents'] < columns['price_cents']
+        if len(ordering) == 1:
+            # Walk the precomputed order and keep the matching rows, no sort needed
+            field = ordering[0]
+            order = self.orders[_SORT_COLUMNS[field.lstrip('-')]]
+            if field.startswith('-'):
+                order = order[::-1]
+            return columns['id'][order[mask[order]]]
+
+        rows = np.flatnonzero(mask)
+        # lexsort takes its primary key last; id breaks ties so pages are stable
+        keys = [columns['id'][rows]]
+        for field in reversed(ordering):
+            descending = field.startswith('-')
+            values = columns[_SORT_COLUMNS[field.lstrip('-')]][rows]
+            if descending:
+                # Rank first so strings can be reversed the same way as numbers
+                values = -np.unique(values, return_inverse=True)[1] if values.dtype.kind == 'U' else -values
+            keys.append(values)
+        return columns['id'][rows[np.lexsort(keys)]]
+
+
+def _snapshot_dir():
+    return str(settings.COLUMNAR_SNAPSHOT_DIR)
+
+
+def _current_path():
+    return os.path.join(_snapshot_dir(), 'CURRENT')
+
+
+def _publish(columns, position):
+    """Write the columns as a new version and point CURRENT at it; returns the version"""
+    root = _snapshot_dir()
+    os.makedirs(root, exist_ok=True)
+    version = f'{position}-{uuid.uuid4().hex[:8]}'
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f'{name}.npy'), values)
+    # Row order for each sortable column, ties by id, so single-column orderings skip sorting
+    orders = sorted(set(_SORT_COLUMNS.values()))
+    for name in orders:
+        np.save(os.path.join(path, f'order_{name}.npy'), np.lexsort((columns['id'], columns[name])))
+    meta = {
+        'position': position,
+        'count': len(columns['id']),
+        'columns': list(columns),
+        'orders': orders,
+        'category_ids': list(Category.objects.order_by().values_list('pk', flat=True)),
+        'subcategory_ids': list(Subcategory.objects.order_by().values_list('pk', flat=True)),
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as meta_file:
+        json.dump(meta, meta_file)
+
+    tmp_path = f'{_current_path()}.{version}.tmp'
+    with open(tmp_path, 'w') as pointer:
+        pointer.write(version)
+    previous = _read_current()
+    os.replace(tmp_path, _current_path())
+
+    # Keep the version just replaced for workers still reading it
+    for entry in os.listdir(root):
+        if entry not in (version, previous) and os.path.isdir(os.path.join(root, entry)):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return version
+
+
+def load_snapshot(version):
+    return Snapshot(os.path.join(_snapshot_dir(), version))
+
+
+def _read_current():
+    try:
+        with open(_current_path()) as pointer:
+            return pointer.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _latest_position():
+    return OutboxEvent.objects.aggregate(position=Max('id'))['position'] or 0
+
+
+def _active_rows(ids=None):
+    products = Product.objects.filter(is_active=True).order_by('pk')
+    if ids is not None:
+        products = products.filter(pk__in=ids)
+    return products.values_list(*_SOURCE_FIELDS)
+
+
+def build_snapshot():
+    """Write a full snapshot of the active catalogue; returns its version"""
+    position = _latest_position()
+    return _publish(_columns(_active_rows().iterator(chunk_size=2000)), position)
+
+
+def _changed_product_ids(position):
+    """Product ids with outbox events after `position`, or None when events were pruned"""
+    events = OutboxEvent.objects.filter(id__gt=position).order_by('id')
+    first = events.values_list('id', flat=True).first()
+    if first is not None and first != position + 1:
+        return None
+    return set(events.filter(model=PRODUCT_EVENT).values_list('object_id', flat=True))
+
+
+def refresh_snapshot(snapshot=None):
+    """Patch the products changed since the current snapshot into a new version
+
+    Returns the new version, or None when another process holds the refresh
+    lock or the snapshot is already current.
+    """
+    os.makedirs(_snapshot_dir(), exist_ok=True)
+    with open(os.path.join(_snapshot_dir(), 'refresh.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        current = _read_current()
+        if snapshot is None or snapshot.version != current:
+            snapshot = load_snapshot(current) if current else None
+        if snapshot is None:
+            return build_snapshot()
+
+        position = _latest_position()
+        if position <= snapshot.position:
+            return None
+        changed = _changed_product_ids(snapshot.position)
+        if changed is None:
+            return build_snapshot()
+
+        keep = ~np.isin(snapshot.columns['id'], np.fromiter(changed, dtype=np.int64, count=len(changed)))
+        fresh = _columns(_active_rows(changed))
+        if set(fresh) != set(snapshot.columns):
+            # Published with an older column layout
+            return build_snapshot()
+        columns = {
+            name: np.concatenate([np.asarray(values)[keep], fresh[name]])
+            for name, values in snapshot.columns.items()
+        }
+        return _publish(columns, position)
+
+
+_loaded = {}
+
+
+def current_snapshot():
+    """The live snapshot for this process, or None when it is missing or behind the outbox
+
+    Refreshes run on the worker (products.refresh_columnar_snapshot), never
+    inside a request; until one publishes, the list goes through the ORM.
+    """
+    version = _read_current()
+    if version is None:
+        return None
+    snapshot = _loaded.get('snapshot')
+    if snapshot is None or snapshot.version != version:
+        snapshot = load_snapshot(version)
+        _loaded['snapshot'] = snapshot
+    if _latest_position() > snapshot.position:
+        return None
+    return snapshot
+
+
+def _parse_id(value, known):
+    try:
+        pk = int(value)
+    except ValueError:
+        return None
+    return pk if pk in known else None
+
+
+def _parse_cents(value, rounding):
+    try:
+        amount = Decimal(value) * 100
+    except InvalidOperation:
+        return None
+    if not amount.is_finite():
+        return None
+    return rounding(amount)
+
+
+def build_conditions(params, snapshot):
+    """Mask conditions for supported query params, or None to leave the request to the ORM
+
+    Values the ORM would reject (unknown categories, invalid choices, bad
+    numbers) also return None, so the ORM path produces its usual errors.
+    """
+    if any(name not in SUPPORTED_PARAMS for name in params):
+        return None
+    conditions = []
+    for name, known in (('category', snapshot.category_ids), ('subcategory', snapshot.subcategory_ids)):
+        if params.get(name):
+            pk = _parse_id(params[name], known)
+            if pk is None:
+                return None
+            conditions.append((f'{name}_id', 'eq', pk))
+
+    for name, choices in (('material', Product.MATERIAL_CHOICES), ('finish', Product.FINISH_CHOICES)):
+        value = params.get(name)
+        if value:
+            if value not in dict(choices):
+                return None
+            conditions.append((name, 'eq', value))
+    if params.get('color'):
+        conditions.append(('color', 'eq', params['color']))
+
+    for name in ('is_featured', 'is_bestseller'):
+        value = params.get(name)
+        if value:
+            if value not in _BOOLEANS:
+                return None
+            conditions.append((name, 'eq', _BOOLEANS[value]))
+
+    for name, op, rounding in (('min_price', 'gte', math.ceil), ('max_price', 'lte', math.floor)):
+        if params.get(name):
+            cents = _parse_cents(params[name], rounding)
+            if cents is None:
+                return None
+            conditions.append(('effective_cents', op, cents))
+
+    if params.get('on_sale') == 'true':
+        conditions.append(('effective_cents', 'on_sale', None))
+    if params.get('in_stock') == 'true':
+        conditions.append(('stock_quantity', 'gte', 1))
+    return conditions
+
+
+def columnar_product_ids(params):
+    """Ordered ids for a product list request, or None when the ORM should answer it"""
+    if not engine_enabled():
+        return None
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return None
+    conditions = build_conditions(params, snapshot)
+    if conditions is None:
+        return None
+    ordering = resolve_product_ordering(params.get('ordering')) or [DEFAULT_PRODUCT_ORDERING]
+    return snapshot.select(conditions, ordering)
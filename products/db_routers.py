@@ -0,0 +1,61 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Set while a read-only catalogue view is handling the request
+_replica_reads = ContextVar('replica_reads', default=False)
+# Set when the client has written recently and must read its own writes
+_primary_pinned = ContextVar('primary_pinned', default=False)
+
+
+def get_replica_aliases():
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+@contextmanager
+def replica_reads():
+    """Route catalogue reads inside the block to a read replica"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def pinned_to_primary():
+    """Force every read inside the block onto the primary database"""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+class ReplicaRouter:
+    """Send catalogue reads from read-only views to replicas, everything else to primary"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'products':
+            return None
+        if not _replica_reads.get() or _primary_pinned.get():
+            return None
+        replicas = get_replica_aliases()
+        if not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas are copies of primary, so rows may relate across aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are refreshed from primary snapshots, never migrated directly
+        if db in get_replica_aliases():
+            return False
+        return None
@@ -0,0 +1,146 @@
+"""Dimension filters backed by an R*Tree index
+
+Products with all three dimensions set are stored as points in an SQLite
+R*Tree over length, width, height and the sorted footprint (shorter and
+longer of length/width), so "fits in" queries become one range lookup
+instead of a scan over three decimal columns. Triggers keep the index in
+sync with every write to products_product; migrations create them, like
+the full-text index.
+
+R*Tree stores 32-bit floats, so the index is queried with a little slack and
+the exact decimal comparison is applied to the candidates it returns.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+from .models import Product
+from .search import search_index_available
+
+RTREE_TABLE = 'products_product_dims'
+# Dimensions have two decimal places, so slack under 0.01 cm only absorbs float rounding
+_SLACK = 0.005
+
+_HAS_DIMENSIONS = 'new.dimensions_length IS NOT NULL AND new.dimensions_width IS NOT NULL ' \
+                  'AND new.dimensions_height IS NOT NULL'
+_RTREE_ROW = '''new.id,
+            new.dimensions_length, new.dimensions_length,
+            new.dimensions_width, new.dimensions_width,
+            new.dimensions_height, new.dimensions_height,
+            min(new.dimensions_length, new.dimensions_width), min(new.dimensions_length, new.dimensions_width),
+            max(new.dimensions_length, new.dimensions_width), max(new.dimensions_length, new.dimensions_width)'''
+
+_RTREE_SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(
+        id,
+        min_length, max_length,
+        min_width, max_width,
+        min_height, max_height,
+        min_short_side, max_short_side,
+        min_long_side, max_long_side
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ai AFTER INSERT ON products_product
+        WHEN {_HAS_DIMENSIONS} BEGIN
+        INSERT INTO {RTREE_TABLE} VALUES ({_RTREE_ROW});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ad AFTER DELETE ON products_product BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_au AFTER UPDATE OF dimensions_length, dimensions_width,
+        dimensions_height ON products_product BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        INSERT INTO {RTREE_TABLE} SELECT {_RTREE_ROW} WHERE {_HAS_DIMENSIONS};
+    END''',
+]
+_RTREE_TRIGGERS = [f'{RTREE_TABLE}_ai', f'{RTREE_TABLE}_ad', f'{RTREE_TABLE}_au']
+
+# Applied by migrations, see products.operations
+RTREE_SQL = _RTREE_SCHEMA + [
+    f'DELETE FROM {RTREE_TABLE}',
+    f'INSERT INTO {RTREE_TABLE} SELECT {_RTREE_ROW.replace("new.", "")} '
+    f'FROM products_product WHERE {_HAS_DIMENSIONS.replace("new.", "")}',
+]
+RTREE_DROP_SQL = [f'DROP TRIGGER IF EXISTS {name}' for name in _RTREE_TRIGGERS] + [f'DROP TABLE IF EXISTS {RTREE_TABLE}']
+
+
+def _parse_cm(name, value):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Must be a number of centimetres.'})
+    if not number.is_finite() or number <= 0:
+        raise ValidationError({name: 'Must be a positive number of centimetres.'})
+    return number
+
+
+def _parse_box(value):
+    parts = value.lower().replace('×', 'x').split('x')
+    if len(parts) != 3:
+        raise ValidationError({'fits': 'Use LENGTHxWIDTHxHEIGHT in centimetres, e.g. 200x90x100.'})
+    return [_parse_cm('fits', part) for part in parts]
+
+
+def dimension_limits(params):
+    """Upper bounds per indexed dimension from ?max_length=, ?max_width=, ?max_height= and ?fits=
+
+    `fits=LxWxH` matches products that fit the box standing upright, turned
+    either way on the floor: the shorter side must fit the box's shorter
+    side and the longer side its longer side.
+    """
+    limits = {}
+
+    def limit(dimension, value):
+        limits[dimension] = min(limits.get(dimension, value), value)
+
+    for dimension in ('length', 'width', 'height'):
+        value = params.get(f'max_{dimension}')
+        if value:
+            limit(dimension, _parse_cm(f'max_{dimension}', value))
+
+    fits = params.get('fits')
+    if fits:
+        length, width, height = _parse_box(fits)
+        limit('short_side', min(length, width))
+        limit('long_side', max(length, width))
+        limit('height', height)
+    return limits
+
+
+def _exact_filters(limits):
+    filters = {}
+    for dimension, value in limits.items():
+        if dimension in ('length', 'width', 'height'):
+            filters[f'dimensions_{dimension}__lte'] = value
+    return filters
+
+
+def filter_dimensions(queryset, params):
+    """Apply dimension filters from query params, through the R*Tree when available"""
+    limits = dimension_limits(params)
+    if not limits:
+        return queryset
+    if queryset.model is not Product:
+        # Read models such as ProductListing share product ids but not the dimension columns
+        return queryset.filter(pk__in=filter_dimensions(Product.objects.all(), params).values('pk'))
+
+    if search_index_available(queryset.db):
+        where = ' AND '.join(f'max_{dimension} <= %s' for dimension in limits)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT id FROM {RTREE_TABLE} WHERE {where}',
+            [float(value) + _SLACK for value in limits.values()]
+        ))
+    else:
+        queryset = queryset.filter(
+            dimensions_length__isnull=False, dimensions_width__isnull=False, dimensions_height__isnull=False
+        )
+    # Exact decimal bounds on the candidates
+    queryset = queryset.filter(**_exact_filters(limits))
+    if 'short_side' in limits:
+        queryset = queryset.filter(
+            Q(dimensions_length__lte=limits['short_side'], dimensions_width__lte=limits['long_side']) |
+            Q(dimensions_width__lte=limits['short_side'], dimensions_length__lte=limits['long_side'])
+        )
+    return queryset
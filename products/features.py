@@ -0,0 +1,104 @@
+"""Feature tags normalised from Product.features
+
+The JSON list on each product is mirrored into FeatureTag rows (one per
+distinct feature, keyed by slug) linked through ProductFeature, which is
+indexed by (tag, product). Filtering and sidebar counts use those tables.
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.utils.text import slugify
+
+from .models import FeatureTag, Product, ProductFeature
+
+FEATURE_PARAM = 'feature'
+SYNC_CHUNK_SIZE = 500
+
+
+def _product_features(product):
+    """{slug: name} for a product's feature list, skipping blanks and repeats"""
+    features = {}
+    for name in product.features if isinstance(product.features, list) else []:
+        if not isinstance(name, str):
+            continue
+        name = ' '.join(name.split())[:200]
+        slug = slugify(name)[:200]
+        if slug and slug not in features:
+            features[slug] = name
+    return features
+
+
+def sync_feature_tags(products):
+    """Bring the tag links of `products` in line with their feature lists
+
+    Works on any number of products with a fixed number of queries, so bulk
+    imports can call it once per chunk. Returns the number of links changed.
+    """
+    products = [product for product in products if product.pk]
+    if not products:
+        return 0
+    wanted = {product.pk: _product_features(product) for product in products}
+    names = {}
+    for features in wanted.values():
+        for slug, name in features.items():
+            names.setdefault(slug, name)
+
+    with transaction.atomic():
+        FeatureTag.objects.bulk_create(
+            [FeatureTag(slug=slug, name=name) for slug, name in names.items()],
+            ignore_conflicts=True
+        )
+        tag_ids = dict(FeatureTag.objects.filter(slug__in=names).values_list('slug', 'id'))
+
+        current = {}
+        for product_id, tag_id in ProductFeature.objects.filter(
+                product_id__in=wanted).values_list('product_id', 'tag_id'):
+            current.setdefault(product_id, set()).add(tag_id)
+
+        added, removed = [], []
+        for product_id, features in wanted.items():
+            target = {tag_ids[slug] for slug in features}
+            existing = current.get(product_id, set())
+            added.extend(ProductFeature(product_id=product_id, tag_id=tag_id) for tag_id in target - existing)
+            removed.extend((product_id, tag_id) for tag_id in existing - target)
+
+        ProductFeature.objects.bulk_create(added, ignore_conflicts=True)
+        for product_id, tag_id in removed:
+            ProductFeature.objects.filter(product_id=product_id, tag_id=tag_id).delete()
+    return len(added) + len(removed)
+
+
+def rebuild_feature_tags(chunk_size=SYNC_CHUNK_SIZE):
+    """Resync tag links for every product; returns the number of links changed"""
+    changed = 0
+    products = Product.objects.order_by('pk').only('pk', 'features')
+    chunk = []
+    for product in products.iterator(chunk_size=chunk_size):
+        chunk.append(product)
+        if len(chunk) >= chunk_size:
+            changed += sync_feature_tags(chunk)
+            chunk = []
+    changed += sync_feature_tags(chunk)
+    return changed
+
+
+def filter_features(queryset, params):
+    """?feature=a,b matches any of the tags; repeating ?feature= requires every group"""
+    for raw in params.getlist(FEATURE_PARAM):
+        slugs = [slugify(value) for value in raw.split(',') if value.strip()]
+        if slugs:
+            queryset = queryset.filter(
+                pk__in=ProductFeature.objects.filter(tag__slug__in=slugs).values('product_id')
+            )
+    return queryset
+
+
+def feature_counts(queryset, limit=None):
+    """Tags used by products in `queryset` with how many of them carry each, most common first"""
+    rows = ProductFeature.objects.filter(
+        product__in=queryset.order_by().values('pk')
+    ).order_by().values('tag__slug', 'tag__name').annotate(
+        count=Count('product_id')
+    ).order_by('-count', 'tag__name')
+    if limit:
+        rows = rows[:limit]
+    return [{'slug': row['tag__slug'], 'name': row['tag__name'], 'count': row['count']} for row in rows]
@@ -0,0 +1,42 @@
+from rest_framework.filters import OrderingFilter
+
+# Public ordering names mapped to the indexed columns that serve them
+PRODUCT_ORDERING_FIELDS = {
+    'price': 'effective_price',
+    'discount': 'discount_percent',
+    'created_at': 'created_at',
+    'name': 'name',
+    # Most popular first; `-popularity` reverses it
+    'popularity': '-popularity',
+}
+DEFAULT_PRODUCT_ORDERING = '-created_at'
+
+
+def resolve_product_ordering(ordering):
+    """Map a comma-separated ?ordering= value to model fields, dropping unknown terms"""
+    resolved = []
+    for term in (ordering or '').split(','):
+        term = term.strip()
+        descending = term.startswith('-')
+        field = PRODUCT_ORDERING_FIELDS.get(term.lstrip('-'))
+        if field:
+            if descending:
+                field = field[1:] if field.startswith('-') else f'-{field}'
+            resolved.append(field)
+    return resolved
+
+
+def order_products(queryset, ordering):
+    return queryset.order_by(*(resolve_product_ordering(ordering) or [DEFAULT_PRODUCT_ORDERING]))
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """OrderingFilter that sorts `price` by the effective (sale-aware) price and `popularity` by score"""
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            ordering = resolve_product_ordering(params)
+            if ordering:
+                return ordering
+        return self.get_default_ordering(view)
@@ -0,0 +1,23 @@
+from decimal import Decimal
+
+from django import forms
+
+from .merchandising import SALE_MODE_CHOICES, ROUNDING_CHOICES
+
+
+class BulkSalePricingForm(forms.Form):
+    """Parameters for the bulk sale pricing admin action"""
+    mode = forms.ChoiceField(choices=SALE_MODE_CHOICES)
+    amount = forms.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    rounding = forms.ChoiceField(choices=ROUNDING_CHOICES, initial='none')
+    starts_at = forms.DateTimeField(required=False, help_text='Leave blank to start the sale now.')
+    ends_at = forms.DateTimeField(required=False, help_text='Leave blank to run the sale until it is removed.')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('mode') == 'percent' and cleaned_data.get('amount', 0) >= 100:
+            self.add_error('amount', 'A percentage discount must be below 100.')
+        starts_at, ends_at = cleaned_data.get('starts_at'), cleaned_data.get('ends_at')
+        if starts_at and ends_at and ends_at <= starts_at:
+            self.add_error('ends_at', 'The sale must end after it starts.')
+        return cleaned_data
@@ -0,0 +1,83 @@
+"""Homepage bundle: every homepage section in one cached payload
+
+Categories, featured, bestseller and on-sale products are built together.
+Each section only selects product ids; the union of those ids is loaded and
+serialised once, so a product that is both featured and a bestseller costs
+one row. The result is cached per host (image URLs are absolute) under a
+version key that the outbox consumer drops after catalogue writes, with HOME_CACHE_TIMEOUT as the
+backstop for writes that send no signal, such as stock reservations. An
+entry never outlives the next scheduled sale start or end.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.dispatch import receiver
+
+from .listing import grid_queryset
+from .models import Category
+from .outbox import DEFAULT_CONSUMER, outbox_batch
+from .pricing import next_price_change, seconds_until_price_change
+from .serializers import CategorySerializer, ProductListSerializer, grid_serializer_class
+
+HOME_CACHE_VERSION_KEY = 'home:version'
+
+HOME_SECTIONS = {
+    'featured': lambda products: products.filter(is_featured=True),
+    'bestsellers': lambda products: products.filter(is_bestseller=True),
+    'on_sale': lambda products: products.filter(effective_price__lt=F('price')),
+}
+
+
+def invalidate_home_bundle():
+    cache.delete(HOME_CACHE_VERSION_KEY)
+
+
+@receiver(outbox_batch)
+def _invalidate_on_batch(sender, consumer, events, **kwargs):
+    # Outbox events are committed, so a rebuild cannot cache the rows being replaced
+    if consumer == DEFAULT_CONSUMER:
+        invalidate_home_bundle()
+
+
+def _cache_key(request):
+    version = cache.get_or_set(HOME_CACHE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    return f'home:{version}:{request.get_host()}'
+
+
+def build_home_bundle(request):
+    """Serialise the homepage sections in a fixed number of queries"""
+    context = {'request': request}
+    fields = set(ProductListSerializer(context=context).fields)
+    products = grid_queryset(fields)
+
+    section_ids = {
+        name: list(select(products).order_by('-created_at').values_list('pk', flat=True)[:settings.HOME_SECTION_SIZE])
+        for name, select in HOME_SECTIONS.items()
+    }
+    wanted = {pk for ids in section_ids.values() for pk in ids}
+    serializer_class = grid_serializer_class(products)
+    serialized = {
+        row['id']: row
+        for row in serializer_class(products.filter(pk__in=wanted), many=True, context=context).data
+    } if wanted else {}
+
+    categories = Category.objects.filter(is_active=True)[:settings.HOME_CATEGORY_LIMIT]
+    bundle = {'categories': CategorySerializer(categories, many=True, context=context).data}
+    for name, ids in section_ids.items():
+        bundle[name] = [serialized[pk] for pk in ids if pk in serialized]
+    return bundle
+
+
+def home_bundle(request):
+    """The cached homepage bundle, built on a miss"""
+    key = _cache_key(request)
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_home_bundle(request)
+        # Never past the next sale start or end, whose prices the bundle would miss
+        timeout = seconds_until_price_change(next_price_change(), settings.HOME_CACHE_TIMEOUT)
+        if timeout:
+            cache.set(key, bundle, timeout)
+    return bundle
@@ -0,0 +1,332 @@
+import hashlib
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.utils import timezone
+
+from .models import ChangeSequence, InventorySyncBatch, OutboxEvent, Product, StockReservation
+from .outbox import record_events
+from .signals import catalogue_changed
+
+SYNC_FIELDS = ('stock_quantity', 'price', 'sale_price')
+SYNC_MODES = [
+    ('absolute', 'Set the given values'),
+    ('delta', 'Add the given values to the current ones'),
+]
+
+
+def filter_stock_status(queryset, stock_status):
+    """Filter products by stock status in the database
+
+    `low` means in stock but at or below the product's low-stock threshold,
+    matching `Product.is_low_stock` without the out-of-stock items. The
+    comparison goes through the indexed `stock_headroom` expression.
+    """
+    if stock_status == 'out':
+        return queryset.filter(stock_quantity=0)
+    queryset = queryset.alias(stock_headroom=F('stock_quantity') - F('low_stock_threshold'))
+    if stock_status == 'low':
+        return queryset.filter(stock_headroom__lte=0, stock_quantity__gt=0)
+    if stock_status == 'ok':
+        return queryset.filter(stock_headroom__gt=0)
+    return queryset
+
+
+def inventory_report():
+    """Stock totals per category and subcategory from a single grouped query"""
+    rows = Product.objects.order_by().values(
+        'category_id', 'category__name', 'category__slug',
+        'subcategory_id', 'subcategory__name', 'subcategory__slug'
+    ).annotate(
+        product_count=Count('id'),
+        total_units=Sum('stock_quantity'),
+        stock_value=Sum(
+            F('stock_quantity') * F('cost_price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+        low_stock_count=Count('id', filter=Q(stock_quantity__gt=0, stock_quantity__lte=F('low_stock_threshold'))),
+        out_of_stock_count=Count('id', filter=Q(stock_quantity=0)),
+        unvalued_count=Count('id', filter=Q(cost_price__isnull=True)),
+    ).order_by('category__name', 'subcategory__name')
+
+    totals_fields = ['product_count', 'total_units', 'stock_value', 'low_stock_count',
+                     'out_of_stock_count', 'unvalued_count']
+
+    def empty_totals():
+        return {field: 0 for field in totals_fields}
+
+    categories = {}
+    grand_total = empty_totals()
+    for row in rows:
+        subcategory = {
+            'id': row['subcategory_id'],
+            'name': row['subcategory__name'],
+            'slug': row['subcategory__slug'],
+        }
+        for field in totals_fields:
+            subcategory[field] = row[field] or 0
+
+        category = categories.setdefault(row['category_id'], {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+            **empty_totals(),
+            'subcategories': [],
+        })
+        category['subcategories'].append(subcategory)
+        # Roll subcategory rows up in Python rather than issuing a second query
+        for field in totals_fields:
+            category[field] += subcategory[field]
+            grand_total[field] += subcategory[field]
+
+    return {'categories': list(categories.values()), 'totals': grand_total}
+
+
+class InsufficientStock(Exception):
+    """Raised when a product does not have enough stock left to reserve"""
+
+
+def reserve_stock(product, quantity, ttl_seconds=None, user=None):
+    """Atomically deduct stock and create a reservation that holds it until expiry
+
+    The deduction is a single conditional UPDATE, so concurrent buyers can
+    never drive stock below zero and no read-modify-write window exists. It
+    also moves the product to the head of the change feed, since the feed
+    payload carries stock_quantity.
+    """
+    if quantity < 1:
+        raise ValueError('Quantity must be at least 1')
+    if ttl_seconds is None:
+        ttl_seconds = settings.STOCK_RESERVATION_TTL
+
+    with transaction.atomic():
+        now = timezone.now()
+        updated = Product.objects.filter(
+            pk=product.pk,
+            is_active=True,
+            stock_quantity__gte=quantity
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            change_seq=ChangeSequence.next_value(),
+            updated_at=now
+        )
+        if not updated:
+            raise InsufficientStock(f'Not enough stock to reserve {quantity} of {product}')
+        record_events(Product, [product.pk], OutboxEvent.ACTION_UPDATED)
+
+        reservation = StockReservation.objects.create(
+            product=product,
+            user=user,
+            quantity=quantity,
+            expires_at=now + timedelta(seconds=ttl_seconds)
+        )
+    catalogue_changed.send(sender=Product, instance=None)
+    return reservation
+
+
+def commit_reservation(reservation):
+    """Turn an unexpired hold into a sale; the stock was already deducted"""
+    now = timezone.now()
+    updated = StockReservation.objects.filter(
+        pk=reservation.pk,
+        status=StockReservation.STATUS_ACTIVE,
+        expires_at__gt=now
+    ).update(status=StockReservation.STATUS_COMMITTED, updated_at=now)
+    return bool(updated)
+
+
+def release_reservation(reservation, status=StockReservation.STATUS_RELEASED):
+    """Cancel an active hold and return its stock"""
+    with transaction.atomic():
+        now = timezone.now()
+        updated = StockReservation.objects.filter(
+            pk=reservation.pk,
+            status=StockReservation.STATUS_ACTIVE
+        ).update(status=status, updated_at=now)
+        if updated:
+            Product.objects.filter(pk=reservation.product_id).update(
+                stock_quantity=F('stock_quantity') + reservation.quantity,
+                change_seq=ChangeSequence.next_value(),
+                updated_at=now
+            )
+            record_events(Product, [reservation.product_id], OutboxEvent.ACTION_UPDATED)
+    if updated:
+        catalogue_changed.send(sender=Product, instance=None)
+    return bool(updated)
+
+
+def release_expired_reservations(batch_size=500, now=None):
+    """Expire lapsed holds in batches and return their stock; returns the count released"""
+    now = now or timezone.now()
+    released_total = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.filter(
+                    status=StockReservation.STATUS_ACTIVE,
+                    expires_at__lte=now
+                ).order_by('expires_at').values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                break
+
+            # Flip each row conditionally so a hold committed or released
+            # concurrently is never returned to stock twice
+            released = defaultdict(int)
+            for reservation_id, product_id, quantity in batch:
+                if StockReservation.objects.filter(
+                    pk=reservation_id,
+                    status=StockReservation.STATUS_ACTIVE
+                ).update(status=StockReservation.STATUS_EXPIRED, updated_at=now):
+                    released[product_id] += quantity
+                    released_total += 1
+
+            # One stock update per product for the whole batch, all at one feed position
+            change_seq = ChangeSequence.next_value() if released else None
+            for product_id, quantity in released.items():
+                Product.objects.filter(pk=product_id).update(
+                    stock_quantity=F('stock_quantity') + quantity,
+                    change_seq=change_seq,
+                    updated_at=now
+                )
+            record_events(Product, list(released), OutboxEvent.ACTION_UPDATED)
+
+        if len(batch) < batch_size:
+            break
+
+    if released_total:
+        catalogue_changed.send(sender=Product, instance=None)
+    return released_total
+
+
+class SyncBatchConflict(Exception):
+    """Raised when a sync batch id is sent again with a different payload"""
+
+
+def _payload_hash(items, mode):
+    payload = json.dumps({'mode': mode, 'items': items}, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _sync_values(product, item, mode):
+    """New values for the item's fields, or (None, errors) when they are not valid"""
+    values, errors = {}, []
+    for field in SYNC_FIELDS:
+        if field not in item:
+            continue
+        value = item[field]
+        if mode == 'delta' and value is not None:
+            current = getattr(product, field)
+            if current is None:
+                errors.append(f'{field} has no current value to adjust')
+                continue
+            value = current + value
+        values[field] = value
+
+    stock = values.get('stock_quantity', product.stock_quantity)
+    price = values.get('price', product.price)
+    sale_price = values.get('sale_price', product.sale_price)
+    if stock < 0:
+        errors.append('stock_quantity cannot go below zero')
+    if price <= 0:
+        errors.append('price must be positive')
+    # Only when the batch touches pricing, so a stock count is never blocked by existing prices
+    pricing = 'price' in values or 'sale_price' in values
+    if pricing and sale_price is not None and not 0 < sale_price < price:
+        errors.append('sale_price must be positive and below price')
+    return (None, errors) if errors else (values, [])
+
+
+def _sync_result(product, status, changed=()):
+    return {
+        'sku': product.sku,
+        'status': status,
+        'changed': sorted(changed),
+        'stock_quantity': product.stock_quantity,
+        'price': str(product.price),
+        'sale_price': None if product.sale_price is None else str(product.sale_price),
+    }
+
+
+def _apply_sync_batch(batch_id, payload_hash, items, mode, user):
+    now = timezone.now()
+    # Allocated first: on SQLite the write lock it takes queues concurrent
+    # writers before any stock is read, so deltas never race
+    change_seq = ChangeSequence.next_value()
+    products = {
+        product.sku: product
+        for product in Product.objects.select_for_update().filter(
+            sku__in={item['sku'] for item in items}
+        ).only('pk', 'sku', *SYNC_FIELDS)
+    }
+
+    results, changed = [], {}
+    for item in items:
+        product = products.get(item['sku'])
+        if product is None:
+            results.append({'sku': item['sku'], 'status': 'not_found'})
+            continue
+        values, errors = _sync_values(product, item, item.get('mode') or mode)
+        if errors:
+            results.append({'sku': item['sku'], 'status': 'rejected', 'errors': errors})
+            continue
+        fields = {field for field, value in values.items() if getattr(product, field) != value}
+        for field in fields:
+            setattr(product, field, values[field])
+        if fields:
+            changed.setdefault(product.pk, (product, set()))[1].update(fields)
+        results.append(_sync_result(product, 'updated' if fields else 'unchanged', fields))
+
+    # One UPDATE per distinct set of changed columns, so untouched columns are never written
+    groups = defaultdict(list)
+    for product, fields in changed.values():
+        product.updated_at = now
+        product.change_seq = change_seq
+        groups[frozenset(fields)].append(product)
+    for fields, group in groups.items():
+        Product.objects.bulk_update(group, [*sorted(fields), 'updated_at', 'change_seq'])
+    record_events(Product, list(changed), OutboxEvent.ACTION_UPDATED)
+
+    InventorySyncBatch.objects.filter(
+        created_at__lt=now - timedelta(days=settings.INVENTORY_SYNC_RETENTION_DAYS)
+    ).delete()
+    batch = InventorySyncBatch.objects.create(
+        batch_id=batch_id, payload_hash=payload_hash, user=user, item_count=len(items),
+        updated_count=len(changed), results=results,
+    )
+    if changed:
+        catalogue_changed.send(sender=Product, instance=None)
+    return batch
+
+
+def sync_inventory(batch_id, items, mode='absolute', user=None):
+    """Apply a POS/warehouse batch of stock and price changes once per batch id
+
+    Each item has a `sku` and any of stock_quantity, price and sale_price
+    (null clears the sale price), as absolute values or, in `delta` mode,
+    amounts to add; an item may override the batch mode. Valid items are
+    written in one transaction and invalid ones reported, never partly
+    applied. Returns (batch, replayed): sending a batch id again returns the
+    stored batch without touching stock, and raises SyncBatchConflict if
+    the payload differs.
+    """
+    payload_hash = _payload_hash(items, mode)
+    batch = InventorySyncBatch.objects.filter(batch_id=batch_id).first()
+    if batch is None:
+        try:
+            with transaction.atomic():
+                return _apply_sync_batch(batch_id, payload_hash, items, mode, user), False
+        except IntegrityError:
+            # A concurrent request with the same batch id committed first
+            batch = InventorySyncBatch.objects.filter(batch_id=batch_id).first()
+            if batch is None:
+                raise
+    if batch.payload_hash != payload_hash:
+        raise SyncBatchConflict(f'Batch {batch_id} was already applied with a different payload')
+    return batch, True
@@ -0,0 +1,148 @@
+"""Database-backed background jobs
+
+Tasks are plain functions registered with @task and enqueued by name with a
+JSON payload. Workers (run_worker) claim the highest-priority due job with a
+conditional UPDATE from queued to running, so two workers never run the same
+job without needing row locks. Failures are retried with exponential backoff
+until max_attempts, and jobs left running by a dead worker are requeued once
+their lock times out.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+class UnknownTask(Exception):
+    """Raised when a job names a task that is not registered"""
+
+
+def task(name):
+    """Register a function as a job task under `name`"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, payload=None, priority=0, unique_key=None, delay=0, max_attempts=None):
+    """Queue a job; with `unique_key`, returns the pending job holding that key instead of adding one"""
+    if task_name not in TASKS:
+        raise UnknownTask(task_name)
+    job = Job(
+        task=task_name,
+        payload=payload or {},
+        priority=priority,
+        unique_key=unique_key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if unique_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = Job.objects.filter(unique_key=unique_key, status__in=Job.PENDING_STATUSES).first()
+        if existing is None:
+            # The holder finished between the insert and the lookup
+            return enqueue(task_name, payload, priority, unique_key, delay, max_attempts)
+        return existing
+
+
+def claim_job(worker_id, tasks=None):
+    """Atomically take the next due job for this worker, or None when nothing is due"""
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+    if tasks:
+        candidates = candidates.filter(task__in=tasks)
+    # Another worker may win the race for the first candidate; try the next few
+    for job_id in candidates.order_by('-priority', 'run_at', 'id').values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, locked_by=worker_id, locked_at=now,
+            attempts=F('attempts') + 1, updated_at=now
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    return settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns True on success"""
+    try:
+        func = TASKS.get(job.task)
+        if func is None:
+            raise UnknownTask(job.task)
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %s', job.pk, job.task, job.attempts)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            values = {'status': Job.STATUS_FAILED}
+        else:
+            values = {'status': Job.STATUS_QUEUED, 'run_at': now + timedelta(seconds=retry_delay(job.attempts))}
+        Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING).update(
+            **values, last_error=error, locked_by='', locked_at=None, updated_at=now
+        )
+        return False
+
+    Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING).update(
+        status=Job.STATUS_SUCCEEDED, last_error='', locked_by='', locked_at=None, updated_at=timezone.now()
+    )
+    return True
+
+
+def run_job_by_id(job_id):
+    """Pool entry point: jobs are passed by id and reloaded in the worker thread or process"""
+    try:
+        return run_job(Job.objects.get(pk=job_id))
+    finally:
+        connection.close()
+
+
+def requeue_stale_jobs(timeout=None):
+    """Put back running jobs locked longer than the timeout (their worker died); returns the count"""
+    timeout = settings.JOB_LOCK_TIMEOUT if timeout is None else timeout
+    now = timezone.now()
+    return Job.objects.filter(
+        status=Job.STATUS_RUNNING,
+        locked_at__lt=now - timedelta(seconds=timeout)
+    ).update(status=Job.STATUS_QUEUED, locked_by='', locked_at=None, run_at=now, updated_at=now)
+
+
+def queue_metrics():
+    """Queue depth per status and task, plus the age of the oldest due job"""
+    now = timezone.now()
+    rows = Job.objects.order_by().values('task', 'status').annotate(count=Count('id'))
+    by_status = {status: 0 for status, _ in Job.STATUS_CHOICES}
+    by_task = {}
+    for row in rows:
+        by_status[row['status']] += row['count']
+        by_task.setdefault(row['task'], {status: 0 for status, _ in Job.STATUS_CHOICES})[row['status']] = row['count']
+
+    due = Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now).aggregate(
+        count=Count('id'), oldest=Min('run_at')
+    )
+    return {
+        'by_status': by_status,
+        'by_task': by_task,
+        'due': due['count'],
+        'oldest_due_seconds': round((now - due['oldest']).total_seconds(), 1) if due['oldest'] else 0,
+    }
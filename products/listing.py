@@ -0,0 +1,109 @@
+"""Denormalised product listing read model
+
+ProductListing holds one row per active product with everything the grid
+endpoints return: prices, flags, category/subcategory names, primary image
+and approved review stats. On SQLite, triggers on the product, category,
+subcategory, image and review tables rewrite the affected rows inside the
+writing transaction, so queryset.update(), stock reservations and raw SQL
+keep it current too. The triggers and the initial fill come from
+migrations; rebuild_listings rewrites the table by hand. Other databases
+keep serving grids from the product tables.
+"""
+from django.db import connections, transaction
+
+from .models import Product, ProductListing
+from .search import search_index_available
+
+LISTING_TABLE = 'products_productlisting'
+
+_LISTING_COLUMNS = [
+    'product_id', 'name', 'slug', 'price', 'sale_price', 'effective_price', 'discount_percent',
+    'stock_quantity', 'low_stock_threshold', 'material', 'finish', 'color', 'is_featured',
+    'is_bestseller', 'popularity', 'category_id', 'category_name', 'category_slug', 'subcategory_id',
+    'subcategory_name', 'subcategory_slug', 'primary_image_id', 'primary_image', 'primary_image_alt',
+    'primary_image_is_primary', 'primary_image_order', 'average_rating', 'review_count', 'created_at',
+]
+
+# Primary image as in the serializers: the first image flagged primary, else the first image
+_LISTING_SELECT = '''SELECT
+        p.id, p.name, p.slug, p.price, p.sale_price, p.effective_price, p.discount_percent,
+        p.stock_quantity, p.low_stock_threshold, p.material, p.finish, p.color, p.is_featured,
+        p.is_bestseller, p.popularity, c.id, c.name, c.slug, s.id, s.name, s.slug,
+        i.id, COALESCE(i.image, ''), COALESCE(i.alt_text, ''), COALESCE(i.is_primary, 0), COALESCE(i."order", 0),
+        COALESCE((SELECT ROUND(AVG(r.rating), 1) FROM products_productreview r
+                  WHERE r.product_id = p.id AND r.is_approved), 0),
+        (SELECT COUNT(*) FROM products_productreview r WHERE r.product_id = p.id AND r.is_approved),
+        p.created_at
+    FROM products_product p
+    JOIN products_category c ON c.id = p.category_id
+    JOIN products_subcategory s ON s.id = p.subcategory_id
+    LEFT JOIN products_productimage i ON i.id = (
+        SELECT pi.id FROM products_productimage pi WHERE pi.product_id = p.id
+        ORDER BY pi.is_primary DESC, pi."order", pi.created_at, pi.id LIMIT 1
+    )
+    WHERE p.is_active'''
+
+
+def _refresh(product_id):
+    """Trigger statements that rewrite one product's row (or drop it when inactive)"""
+    return f'''DELETE FROM {LISTING_TABLE} WHERE product_id = {product_id};
+        INSERT INTO {LISTING_TABLE} ({', '.join(_LISTING_COLUMNS)})
+        {_LISTING_SELECT} AND p.id = {product_id};'''
+
+
+_LISTING_TRIGGERS = {
+    'product_ai': f'AFTER INSERT ON products_product BEGIN {_refresh("new.id")} END',
+    'product_au': f'AFTER UPDATE ON products_product BEGIN {_refresh("new.id")} END',
+    'product_ad': f'AFTER DELETE ON products_product BEGIN '
+                  f'DELETE FROM {LISTING_TABLE} WHERE product_id = old.id; END',
+    'category_au': f'''AFTER UPDATE OF name, slug ON products_category BEGIN
+        UPDATE {LISTING_TABLE} SET category_name = new.name, category_slug = new.slug
+        WHERE category_id = new.id; END''',
+    'subcategory_au': f'''AFTER UPDATE OF name, slug ON products_subcategory BEGIN
+        UPDATE {LISTING_TABLE} SET subcategory_name = new.name, subcategory_slug = new.slug
+        WHERE subcategory_id = new.id; END''',
+    'image_ai': f'AFTER INSERT ON products_productimage BEGIN {_refresh("new.product_id")} END',
+    'image_au': f'AFTER UPDATE ON products_productimage BEGIN '
+                f'{_refresh("old.product_id")} {_refresh("new.product_id")} END',
+    'image_ad': f'AFTER DELETE ON products_productimage BEGIN {_refresh("old.product_id")} END',
+    'review_ai': f'AFTER INSERT ON products_productreview BEGIN {_refresh("new.product_id")} END',
+    'review_au': f'AFTER UPDATE OF rating, is_approved, product_id ON products_productreview BEGIN '
+                 f'{_refresh("old.product_id")} {_refresh("new.product_id")} END',
+    'review_ad': f'AFTER DELETE ON products_productreview BEGIN {_refresh("old.product_id")} END',
+}
+
+
+def _trigger_name(suffix):
+    return f'{LISTING_TABLE}_{suffix}'
+
+
+# Applied by migrations, see products.operations
+LISTING_TRIGGER_SQL = [
+    f'CREATE TRIGGER IF NOT EXISTS {_trigger_name(suffix)} {body}' for suffix, body in _LISTING_TRIGGERS.items()
+]
+LISTING_TRIGGER_DROP_SQL = [f'DROP TRIGGER IF EXISTS {_trigger_name(suffix)}' for suffix in _LISTING_TRIGGERS]
+LISTING_FILL_SQL = [
+    f'DELETE FROM {LISTING_TABLE}',
+    f'INSERT INTO {LISTING_TABLE} ({", ".join(_LISTING_COLUMNS)}) {_LISTING_SELECT}',
+]
+
+
+def listing_available(using='default'):
+    return search_index_available(using)
+
+
+def rebuild_listings(using='default'):
+    """Rewrite every listing row from the catalogue tables; returns the row count"""
+    with transaction.atomic(using), connections[using].cursor() as cursor:
+        for statement in LISTING_FILL_SQL:
+            cursor.execute(statement)
+        cursor.execute(f'SELECT COUNT(*) FROM {LISTING_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def grid_queryset(fields=None):
+    """Queryset the grid endpoints serialise: the listing table, or products with their joins"""
+    if listing_available(ProductListing.objects.db):
+        return ProductListing.objects.all()
+    return Product.objects.filter(is_active=True).for_listing(fields)
+
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.pricing import apply_due_price_changes, next_price_change
+
+
+class Command(BaseCommand):
+    help = 'Start and end the sales whose scheduled window has been reached'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Products updated per transaction')
+
+    def handle(self, *args, **options):
+        updated = apply_due_price_changes(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} product prices'))
+        upcoming = next_price_change()
+        if upcoming:
+            self.stdout.write(f'Next scheduled price change: {upcoming.isoformat()}')
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.archive import (
+    BATCH_SIZE, archivable_products, archivable_reviews, archive_products, archive_reviews
+)
+
+
+class Command(BaseCommand):
+    help = 'Move long-inactive products and stale unapproved reviews into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows moved per transaction')
+        parser.add_argument('--products-only', action='store_true', help='Skip review archival')
+        parser.add_argument('--reviews-only', action='store_true', help='Skip product archival')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        progress = lambda done, total: self.stdout.write(f'  {done}/{total}')
+        if not options['reviews_only']:
+            self._run(
+                'products', archivable_products, archive_products, options, progress,
+                f'inactive for {settings.PRODUCT_ARCHIVE_AFTER_DAYS} days'
+            )
+        if not options['products_only']:
+            self._run(
+                'reviews', archivable_reviews, archive_reviews, options, progress,
+                f'unapproved for {settings.REVIEW_ARCHIVE_AFTER_DAYS} days'
+            )
+
+    def _run(self, label, candidates, archive, options, progress, reason):
+        if options['dry_run']:
+            self.stdout.write(f'{candidates().count()} {label} {reason} would be archived')
+            return
+        archived = archive(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} {label} {reason}'))
@@ -0,0 +1,128 @@
+import shutil
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from random import Random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import QueryDict
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products.columnar import build_snapshot, columnar_product_ids, fcntl, np
+from products.models import Category, Product, Subcategory
+from products.views import ProductViewSet
+
+SCENARIOS = [
+    '',
+    'ordering=price',
+    'ordering=-name',
+    'on_sale=true&ordering=discount',
+    'in_stock=true&min_price=200&max_price=1500',
+    'category={category}&ordering=popularity',
+    'subcategory={subcategory}&material=wood',
+    'is_featured=true&color=Brown&ordering=-price',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare /api/products/ filtering and ordering through the ORM and the columnar engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=0,
+                            help='Temporary products to add for the run (rolled back afterwards)')
+        parser.add_argument('--iterations', type=int, default=50, help='Runs per scenario and engine')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('The columnar engine needs NumPy: pip install numpy')
+        if fcntl is None:
+            raise CommandError('The columnar engine needs fcntl file locks, which this platform lacks')
+        snapshot_dir = tempfile.mkdtemp(prefix='columnar-benchmark-')
+        try:
+            with override_settings(COLUMNAR_ENGINE=True, COLUMNAR_SNAPSHOT_DIR=snapshot_dir), transaction.atomic():
+                if options['products']:
+                    self._add_products(options['products'])
+                started = time.perf_counter()
+                build_snapshot()
+                self.stdout.write(
+                    f'Snapshot of {Product.objects.filter(is_active=True).count()} products '
+                    f'built in {(time.perf_counter() - started) * 1000:.1f} ms'
+                )
+                self._run(options['iterations'])
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    def _add_products(self, count):
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        subcategory, _ = Subcategory.objects.get_or_create(category=category, name='Benchmark')
+        random = Random(0)
+        materials = [choice for choice, _ in Product.MATERIAL_CHOICES]
+        colors = ['Brown', 'Black', 'White', 'Grey', 'Oak', 'Walnut']
+        stamp = int(timezone.now().timestamp())
+        products = []
+        for i in range(count):
+            price = Decimal(random.randint(50, 3000))
+            products.append(Product(
+                name=f'Columnar benchmark {random.randint(0, 10 ** 6)} {i}',
+                slug=f'columnar-benchmark-{stamp}-{i}',
+                sku=f'CB-{stamp}-{i}',
+                category=category,
+                subcategory=subcategory,
+                description='Temporary product for benchmark_columnar',
+                price=price,
+                sale_price=price * Decimal('0.8') if random.random() < 0.3 else None,
+                stock_quantity=random.randint(0, 20),
+                material=random.choice(materials),
+                color=random.choice(colors),
+                is_featured=random.random() < 0.05,
+                is_bestseller=random.random() < 0.05,
+                popularity=random.random() * 100,
+            ))
+        Product.objects.bulk_create(products, batch_size=500)
+
+    def _orm_page(self, query, page_size):
+        view = ProductViewSet()
+        view.action = 'list'
+        view.format_kwarg = None
+        view.request = Request(APIRequestFactory().get('/api/products/', QueryDict(query)))
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset.count(), list(queryset.values_list('pk', flat=True)[:page_size])
+
+    def _columnar_page(self, query, page_size):
+        ids = columnar_product_ids(QueryDict(query))
+        return len(ids), ids[:page_size].tolist()
+
+    def _time(self, func, query, iterations, page_size):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            result = func(query, page_size)
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def _run(self, iterations):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        product = Product.objects.filter(is_active=True).order_by('pk').first()
+        if product is None:
+            raise CommandError('No active products; pass --products to add some')
+
+        self.stdout.write(f'{"Scenario":<50} {"ORM ms":>8} {"Columnar ms":>12} {"Speedup":>8}')
+        for scenario in SCENARIOS:
+            query = scenario.format(category=product.category_id, subcategory=product.subcategory_id)
+            (orm_count, _), orm_ms = self._time(self._orm_page, query, iterations, page_size)
+            (columnar_count, _), columnar_ms = self._time(self._columnar_page, query, iterations, page_size)
+            if orm_count != columnar_count:
+                self.stdout.write(self.style.ERROR(
+                    f'{query or "(no filters)"}: ORM matched {orm_count} products, columnar {columnar_count}'
+                ))
+                continue
+            self.stdout.write(
+                f'{query or "(no filters)":<50} {orm_ms:>8.2f} {columnar_ms:>12.2f} {orm_ms / columnar_ms:>7.1f}x'
+            )
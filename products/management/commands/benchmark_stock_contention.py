@@ -0,0 +1,110 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, OperationalError
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from products.inventory import InsufficientStock, reserve_stock, release_expired_reservations
+from products.models import Category, OutboxEvent, ProductTombstone, Subcategory, Product, StockReservation
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent stock reservations against a single hot product (its rows are removed afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=32, help='Concurrent buyer threads')
+        parser.add_argument('--attempts', type=int, default=50, help='Reservation attempts per buyer')
+        parser.add_argument('--stock', type=int, default=1000, help='Starting stock of the hot product')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per reservation')
+
+    def handle(self, *args, **options):
+        position = OutboxEvent.objects.aggregate(position=Max('id'))['position'] or 0
+        category, created_category = Category.objects.get_or_create(name='Benchmark')
+        subcategory, created_subcategory = Subcategory.objects.get_or_create(category=category, name='Benchmark')
+        product = Product.objects.create(
+            name=f'Contention benchmark {timezone.now().timestamp()}',
+            category=category,
+            subcategory=subcategory,
+            description='Temporary product for benchmark_stock_contention',
+            price=100,
+            stock_quantity=options['stock'],
+        )
+
+        counts = {'reserved': 0, 'sold_out': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def buyer():
+            local = {'reserved': 0, 'sold_out': 0, 'errors': 0}
+            try:
+                for _ in range(options['attempts']):
+                    try:
+                        reserve_stock(product, options['quantity'])
+                        local['reserved'] += 1
+                    except InsufficientStock:
+                        local['sold_out'] += 1
+                    except OperationalError:
+                        local['errors'] += 1
+            finally:
+                connection.close()
+            with lock:
+                for key, value in local.items():
+                    counts[key] += value
+
+        threads = [threading.Thread(target=buyer) for _ in range(options['buyers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            product.refresh_from_db()
+            held = sum(StockReservation.objects.filter(product=product).values_list('quantity', flat=True))
+            attempts = options['buyers'] * options['attempts']
+            self.stdout.write(f'Attempts:        {attempts} in {elapsed:.2f}s ({attempts / elapsed:.0f}/s)')
+            self.stdout.write(f'Reserved:        {counts["reserved"]}')
+            self.stdout.write(f'Sold out:        {counts["sold_out"]}')
+            self.stdout.write(f'Lock errors:     {counts["errors"]}')
+            self.stdout.write(f'Remaining stock: {product.stock_quantity}')
+
+            if product.stock_quantity + held != options['stock']:
+                self.stdout.write(self.style.ERROR('Stock does not balance: units were lost or oversold'))
+                return
+
+            # Expire every hold and check the stock comes back in full
+            StockReservation.objects.filter(product=product).update(expires_at=timezone.now() - timedelta(seconds=1))
+            started = time.perf_counter()
+            released = release_expired_reservations()
+            product.refresh_from_db()
+            self.stdout.write(f'Released:        {released} holds in {time.perf_counter() - started:.2f}s')
+            if product.stock_quantity != options['stock']:
+                self.stdout.write(self.style.ERROR('Expired holds did not return all stock'))
+                return
+            self.stdout.write(self.style.SUCCESS('Stock balanced: no overselling, all holds released'))
+        finally:
+            self._clean_up(position, product, category if created_category else None,
+                           subcategory if created_subcategory else None)
+
+    def _clean_up(self, position, product, category, subcategory):
+        """Remove every row the run wrote
+
+        Buyers commit on their own thread connections, so unlike
+        benchmark_columnar the run cannot be one rolled-back transaction.
+        """
+        # delete() clears pk, so the ids are taken first
+        product_id = product.pk
+        written = Q(model=Product._meta.label_lower, object_id=product_id)
+        for obj in (subcategory, category):
+            if obj is not None:
+                written |= Q(model=obj._meta.label_lower, object_id=obj.pk)
+        with transaction.atomic():
+            product.delete()
+            for obj in (subcategory, category):
+                if obj is not None:
+                    obj.delete()
+            ProductTombstone.objects.filter(product_id=product_id).delete()
+            OutboxEvent.objects.filter(written, id__gt=position).delete()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.columnar import build_snapshot, load_snapshot, fcntl, np, refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mapped column snapshot used by the columnar product list engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Patch the products changed since the current snapshot instead of a full rebuild')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('The columnar engine needs NumPy: pip install numpy')
+        if fcntl is None:
+            raise CommandError('The columnar engine needs fcntl file locks, which this platform lacks')
+        version = refresh_snapshot() if options['incremental'] else build_snapshot()
+        if version is None:
+            self.stdout.write('Snapshot already current')
+            return
+        snapshot = load_snapshot(version)
+        self.stdout.write(self.style.SUCCESS(f'Published snapshot {version} with {len(snapshot)} products'))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.outbox import DEFAULT_CONSUMER, process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending catalogue outbox events to their consumers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', default=DEFAULT_CONSUMER, help='Checkpoint name for this consumer')
+        parser.add_argument('--batch-size', type=int, default=500, help='Events read per batch')
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and poll every N seconds (default: drain once and exit)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            read, delivered = process_outbox(options['consumer'], batch_size=options['batch_size'])
+            if read or not interval:
+                self.stdout.write(f'Processed {read} events ({delivered} after coalescing)')
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.features import rebuild_feature_tags
+
+
+class Command(BaseCommand):
+    help = 'Resync feature tags from Product.features, e.g. after a bulk import'
+
+    def handle(self, *args, **options):
+        changed = rebuild_feature_tags()
+        self.stdout.write(self.style.SUCCESS(f'Added or removed {changed} feature tag links'))
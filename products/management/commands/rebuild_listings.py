@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.listing import listing_available, rebuild_listings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalised product listing table from the catalogue tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not listing_available(using):
+            raise CommandError('The listing table is only maintained on SQLite; grids read products directly')
+        count = rebuild_listings(using)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} product listings'))
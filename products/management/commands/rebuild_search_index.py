@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.search import rebuild_search_index, search_index_available
+from products.trigrams import rebuild_trigram_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text and trigram search indexes from the catalogue tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search_index_available(using):
+            raise CommandError('The search indexes are only maintained on SQLite')
+        rebuild_search_index(using)
+        rebuild_trigram_index(using)
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search indexes'))
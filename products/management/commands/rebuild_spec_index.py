@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.specs import rebuild_spec_index
+
+
+class Command(BaseCommand):
+    help = 'Resync the filterable specification rows from Product.specifications'
+
+    def handle(self, *args, **options):
+        changed = rebuild_spec_index()
+        self.stdout.write(self.style.SUCCESS(f'Resynced specifications for {changed} products'))
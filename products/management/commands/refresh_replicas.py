@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.db_routers import get_replica_aliases
+from products.replicas import refresh_replicas
+
+
+class Command(BaseCommand):
+    help = 'Refresh SQLite read replicas from the primary database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and refresh every N seconds (default: refresh once and exit)'
+        )
+
+    def handle(self, *args, **options):
+        if not get_replica_aliases():
+            self.stdout.write(self.style.WARNING('No read replicas configured (set DJANGO_SQLITE_REPLICAS)'))
+            return
+
+        interval = options['interval']
+        while True:
+            started = time.monotonic()
+            refreshed = refresh_replicas()
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'Refreshed {", ".join(refreshed) or "no replicas"} in {elapsed:.2f}s')
+            if not interval:
+                break
+            time.sleep(max(interval - elapsed, 0))
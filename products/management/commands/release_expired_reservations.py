@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Expire lapsed stock reservations and return their stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reservations released per transaction')
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations'))
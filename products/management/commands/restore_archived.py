@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.archive import restore_products, restore_reviews
+from products.models import ArchivedProduct, ArchivedReview
+
+
+class Command(BaseCommand):
+    help = 'Move archived products (by SKU) or reviews (by review id) back into the catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sku', action='append', default=[], help='Archived product SKU; repeatable')
+        parser.add_argument('--review', type=int, action='append', default=[], help='Archived review id; repeatable')
+        parser.add_argument('--approve', action='store_true', help='Approve the restored reviews')
+
+    def handle(self, *args, **options):
+        if not options['sku'] and not options['review']:
+            raise CommandError('Pass --sku and/or --review')
+        errors = []
+        if options['sku']:
+            restored, failed = restore_products(ArchivedProduct.objects.filter(sku__in=options['sku']))
+            errors += failed
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} products (inactive)'))
+        if options['review']:
+            restored, failed = restore_reviews(
+                ArchivedReview.objects.filter(review_id__in=options['review']), approve=options['approve']
+            )
+            errors += failed
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} reviews'))
+        for error in errors:
+            self.stderr.write(error)
+        if errors:
+            raise CommandError(f'{len(errors)} rows could not be restored')
@@ -0,0 +1,78 @@
+import json
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.jobs import claim_job, queue_metrics, requeue_stale_jobs, run_job_by_id
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY,
+            help='Jobs run at the same time'
+        )
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Run jobs in threads (default) or separate processes for CPU-heavy tasks'
+        )
+        parser.add_argument('--task', action='append', dest='tasks', help='Only run this task (repeatable)')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no jobs are due')
+        parser.add_argument('--stats', action='store_true', help='Print queue depth metrics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_metrics(), indent=2))
+            return
+
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        concurrency = max(options['concurrency'], 1)
+        if options['pool'] == 'process':
+            # Children must not inherit the parent's open database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} abandoned jobs'))
+        self.stdout.write(f'Worker {worker_id} started with {concurrency} {options["pool"]} slots')
+
+        running = set()
+        succeeded = failed = 0
+        try:
+            while True:
+                # Fill free slots before waiting on running jobs
+                while len(running) < concurrency:
+                    job = claim_job(worker_id, options['tasks'])
+                    if job is None:
+                        break
+                    running.add(executor.submit(run_job_by_id, job.pk))
+
+                if not running:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.result():
+                        succeeded += 1
+                    else:
+                        failed += 1
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping; waiting for running jobs to finish')
+        finally:
+            executor.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Jobs succeeded: {succeeded}, failed attempts: {failed}'))
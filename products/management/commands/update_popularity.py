@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.popularity import update_popularity
+
+
+class Command(BaseCommand):
+    help = 'Recompute time-decayed product popularity from daily view counts'
+
+    def handle(self, *args, **options):
+        changed = update_popularity()
+        self.stdout.write(self.style.SUCCESS(f'Updated popularity for {changed} products'))
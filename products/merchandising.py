@@ -0,0 +1,142 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChangeSequence, OutboxEvent, Product
+from .outbox import record_events
+from .signals import catalogue_changed
+
+CHUNK_SIZE = 500
+
+SALE_MODE_CHOICES = [
+    ('percent', 'Percentage off'),
+    ('fixed', 'Fixed amount off'),
+]
+
+ROUNDING_CHOICES = [
+    ('none', 'No rounding'),
+    ('whole', 'Nearest 1'),
+    ('nearest_10', 'Nearest 10'),
+    ('nearest_100', 'Nearest 100'),
+]
+
+_ROUNDING_STEPS = {
+    'none': Decimal('0.01'),
+    'whole': Decimal('1'),
+    'nearest_10': Decimal('10'),
+    'nearest_100': Decimal('100'),
+}
+
+
+def compute_sale_price(price, mode, amount, rounding='none'):
+    """Sale price for `price`, or None when the discount would not leave a valid price"""
+    price = Decimal(price)
+    amount = Decimal(amount)
+    if mode == 'percent':
+        sale_price = price * (Decimal(100) - amount) / Decimal(100)
+    elif mode == 'fixed':
+        sale_price = price - amount
+    else:
+        raise ValueError(f'Unknown sale pricing mode: {mode}')
+
+    step = _ROUNDING_STEPS[rounding]
+    sale_price = (sale_price / step).quantize(Decimal('1'), rounding=ROUND_HALF_UP) * step
+    sale_price = sale_price.quantize(Decimal('0.01'))
+    if sale_price <= 0 or sale_price >= price:
+        return None
+    return sale_price
+
+
+def _chunks(queryset, chunk_size):
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def _finish(updated):
+    # One invalidation for the whole run instead of one per product
+    if updated:
+        catalogue_changed.send(sender=Product, instance=None)
+
+
+def apply_sale_pricing(queryset, mode, amount, rounding='none', chunk_size=CHUNK_SIZE, progress=None,
+                       starts_at=None, ends_at=None):
+    """Set sale prices across a queryset in chunked bulk updates
+
+    The sale runs from starts_at until ends_at; either bound may be left
+    open. Products where the discount would leave no valid sale price (zero,
+    or not below the list price) are skipped. Returns (updated, skipped).
+    """
+    chunks = list(_chunks(queryset, chunk_size))
+    total = sum(len(chunk) for chunk in chunks)
+    updated = skipped = done = 0
+
+    for chunk in chunks:
+        now = timezone.now()
+        with transaction.atomic():
+            products = list(Product.objects.filter(pk__in=chunk).only(
+                'pk', 'price', 'sale_price', 'sale_starts_at', 'sale_ends_at', 'sale_active', 'next_price_change_at'
+            ))
+            changed = []
+            change_seq = ChangeSequence.next_value()
+            for product in products:
+                sale_price = compute_sale_price(product.price, mode, amount, rounding)
+                if sale_price is None:
+                    skipped += 1
+                    continue
+                product.sale_price = sale_price
+                product.sale_starts_at, product.sale_ends_at = starts_at, ends_at
+                product.refresh_sale_window(now)
+                product.updated_at = now
+                product.change_seq = change_seq
+                changed.append(product)
+            Product.objects.bulk_update(changed, [
+                'sale_price', 'sale_starts_at', 'sale_ends_at', 'sale_active', 'next_price_change_at',
+                'updated_at', 'change_seq',
+            ])
+            record_events(Product, [product.pk for product in changed], OutboxEvent.ACTION_UPDATED)
+        updated += len(changed)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+
+    _finish(updated)
+    return updated, skipped
+
+
+def clear_sale_pricing(queryset, chunk_size=CHUNK_SIZE, progress=None):
+    """Remove sale prices and their windows across a queryset; returns the number of products changed"""
+    cleared = {
+        'sale_price': None, 'sale_starts_at': None, 'sale_ends_at': None,
+        'sale_active': True, 'next_price_change_at': None,
+    }
+    return _update_in_chunks(queryset.filter(sale_price__isnull=False), cleared, chunk_size, progress)
+
+
+def set_merchandising_flags(queryset, chunk_size=CHUNK_SIZE, progress=None, **flags):
+    """Set is_featured / is_bestseller across a queryset; returns the number changed"""
+    unknown = set(flags) - {'is_featured', 'is_bestseller'}
+    if unknown:
+        raise ValueError(f'Unknown merchandising flags: {", ".join(sorted(unknown))}')
+    # Skip products that already carry these flags
+    return _update_in_chunks(queryset.exclude(**flags), flags, chunk_size, progress)
+
+
+def _update_in_chunks(queryset, values, chunk_size, progress):
+    chunks = list(_chunks(queryset, chunk_size))
+    total = sum(len(chunk) for chunk in chunks)
+    updated = done = 0
+
+    for chunk in chunks:
+        with transaction.atomic():
+            updated += Product.objects.filter(pk__in=chunk).update(
+                **values, updated_at=timezone.now(), change_seq=ChangeSequence.next_value()
+            )
+            record_events(Product, chunk, OutboxEvent.ACTION_UPDATED)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+
+    _finish(updated)
+    return updated
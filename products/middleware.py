@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+
+from .db_routers import get_replica_aliases, pinned_to_primary
+
+PRIMARY_PIN_COOKIE = 'ashwi_primary_pin'
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class PrimaryPinMiddleware:
+    """Read-your-writes stickiness for replica routing
+
+    After a successful write the client gets a short-lived cookie; while it is
+    valid every read for that client is served from the primary database, so
+    it never sees a replica snapshot taken before its own write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_replica_aliases():
+            return self.get_response(request)
+
+        if self._is_pinned(request):
+            with pinned_to_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        if request.method in UNSAFE_METHODS and response.status_code < 400:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                str(int(time.time()) + pin_seconds),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def _is_pinned(self, request):
+        try:
+            pinned_until = int(request.COOKIES.get(PRIMARY_PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return pinned_until > time.time()
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:12
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock_quantity'], name='product_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('stock_quantity'), '-', models.F('low_stock_threshold')), name='product_stock_headroom_idx'),
+        ),
+    ]
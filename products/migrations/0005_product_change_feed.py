@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+def seed_catalogue_sequence(apps, schema_editor):
+    ChangeSequence = apps.get_model('products', 'ChangeSequence')
+    ChangeSequence.objects.using(schema_editor.connection.alias).get_or_create(name='catalogue')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(unique=True)),
+                ('slug', models.SlugField(max_length=200)),
+                ('change_seq', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['change_seq', 'product_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['change_seq', 'id'], name='product_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producttombstone',
+            index=models.Index(fields=['change_seq', 'product_id'], name='tombstone_change_seq_idx'),
+        ),
+        migrations.RunPython(seed_catalogue_sequence, migrations.RunPython.noop),
+    ]
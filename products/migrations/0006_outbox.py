@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:22
+
+from django.db import migrations, models
+
+from products.operations import SQLiteRunSQL
+from products.outbox import drop_outbox_trigger_sql, outbox_trigger_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCheckpoint',
+            fields=[
+                ('consumer', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        SQLiteRunSQL(outbox_trigger_sql(), reverse_sql=drop_outbox_trigger_sql()),
+    ]
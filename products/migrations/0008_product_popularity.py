@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products.operations import around_product_rebuild
+from products.outbox import drop_outbox_trigger_sql, outbox_trigger_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_job_queue'),
+    ]
+
+    # SQLite rebuilds products_product here; see products.operations
+    operations = around_product_rebuild([
+        migrations.CreateModel(
+            name='ProductDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['popularity'], name='product_popularity_idx'),
+        ),
+        migrations.AddField(
+            model_name='productdailyviews',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='productdailyviews',
+            index=models.Index(fields=['date'], name='daily_views_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productdailyviews',
+            unique_together={('product', 'date')},
+        ),
+    ], outbox_trigger_sql(['products_product']), drop_outbox_trigger_sql(['products_product']))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSpec',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('value_normalized', models.CharField(max_length=255)),
+                ('value_number', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spec_values', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value_normalized', 'product'], name='spec_key_value_idx'), models.Index(fields=['key', 'value_number', 'product'], name='spec_key_number_idx')],
+            },
+        ),
+    ]
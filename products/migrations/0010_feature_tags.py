@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products.operations import around_product_rebuild
+from products.outbox import drop_outbox_trigger_sql, outbox_trigger_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_spec_index'),
+    ]
+
+    # SQLite rebuilds products_product here; see products.operations
+    operations = around_product_rebuild([
+        migrations.CreateModel(
+            name='FeatureTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=200, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_links', to='products.product')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_links', to='products.featuretag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='feature_tags',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='products', through='products.ProductFeature', to='products.featuretag'),
+        ),
+        migrations.AddIndex(
+            model_name='productfeature',
+            index=models.Index(fields=['tag', 'product'], name='product_feature_tag_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productfeature',
+            unique_together={('product', 'tag')},
+        ),
+    ], outbox_trigger_sql(['products_product']), drop_outbox_trigger_sql(['products_product']))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+from products.operations import around_product_rebuild
+from products.outbox import drop_outbox_trigger_sql, outbox_trigger_sql
+from django.db.models import Count
+
+
+def fill_rating_histograms(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductReview = apps.get_model('products', 'ProductReview')
+    alias = schema_editor.connection.alias
+    histograms = {}
+    rows = ProductReview.objects.using(alias).filter(is_approved=True).order_by().values_list(
+        'product_id', 'rating'
+    ).annotate(count=Count('pk'))
+    for product_id, rating, count in rows:
+        histograms.setdefault(product_id, {str(star): 0 for star in range(1, 6)})[str(rating)] = count
+    for product_id, histogram in histograms.items():
+        Product.objects.using(alias).filter(pk=product_id).update(rating_histogram=histogram)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_feature_tags'),
+    ]
+
+    # SQLite rebuilds products_product here; see products.operations
+    operations = around_product_rebuild([
+        migrations.AddField(
+            model_name='product',
+            name='rating_histogram',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['product', '-created_at', '-id'], name='review_product_approved_idx'),
+        ),
+        migrations.RunPython(fill_rating_histograms, migrations.RunPython.noop),
+    ], outbox_trigger_sql(['products_product']), drop_outbox_trigger_sql(['products_product']))
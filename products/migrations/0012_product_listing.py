@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products.listing import LISTING_FILL_SQL, LISTING_TRIGGER_DROP_SQL, LISTING_TRIGGER_SQL
+from products.operations import SQLiteRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_review_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=200)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sale_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('effective_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount_percent', models.IntegerField(default=0)),
+                ('stock_quantity', models.PositiveIntegerField(default=0)),
+                ('low_stock_threshold', models.PositiveIntegerField(default=5)),
+                ('material', models.CharField(max_length=20)),
+                ('finish', models.CharField(max_length=20)),
+                ('color', models.CharField(max_length=50)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('is_bestseller', models.BooleanField(default=False)),
+                ('popularity', models.FloatField(default=0)),
+                ('category_name', models.CharField(max_length=100)),
+                ('category_slug', models.SlugField(max_length=100)),
+                ('subcategory_name', models.CharField(max_length=100)),
+                ('subcategory_slug', models.SlugField(max_length=100)),
+                ('primary_image_id', models.BigIntegerField(blank=True, null=True)),
+                ('primary_image', models.CharField(blank=True, max_length=100)),
+                ('primary_image_alt', models.CharField(blank=True, max_length=200)),
+                ('primary_image_is_primary', models.BooleanField(default=False)),
+                ('primary_image_order', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.FloatField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('category', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.category')),
+                ('subcategory', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.subcategory')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='listing_created_idx'), models.Index(fields=['category', '-created_at'], name='listing_category_idx'), models.Index(fields=['subcategory', '-created_at'], name='listing_subcategory_idx'), models.Index(fields=['effective_price'], name='listing_price_idx'), models.Index(fields=['discount_percent'], name='listing_discount_idx'), models.Index(fields=['popularity'], name='listing_popularity_idx'), models.Index(fields=['is_featured', '-created_at'], name='listing_featured_idx'), models.Index(fields=['is_bestseller', '-created_at'], name='listing_bestseller_idx')],
+            },
+        ),
+        SQLiteRunSQL(LISTING_TRIGGER_SQL + LISTING_FILL_SQL, reverse_sql=LISTING_TRIGGER_DROP_SQL),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:41
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+from products.listing import LISTING_TRIGGER_DROP_SQL, LISTING_TRIGGER_SQL
+from products.operations import around_product_rebuild
+from products.outbox import drop_outbox_trigger_sql, outbox_trigger_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_listing'),
+    ]
+
+    # SQLite rebuilds products_product here; see products.operations
+    operations = around_product_rebuild([
+        migrations.AddField(
+            model_name='product',
+            name='next_price_change_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sale_active',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sale_ends_at',
+            field=models.DateTimeField(blank=True, help_text='Sale price applies until', null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sale_starts_at',
+            field=models.DateTimeField(blank=True, help_text='Sale price applies from', null=True),
+        ),
+        # Generated columns cannot be altered in place: drop them with their indexes and re-add
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_effective_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_discount_idx',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='discount_percent',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='effective_price',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='discount_percent',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('sale_active', True), ('sale_price__isnull', False), ('sale_price__lt', models.F('price'))), then=django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '-', models.F('sale_price')), '*', models.Value(100)), '/', models.F('price')), models.IntegerField())), default=models.Value(0)), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('sale_active', True), ('sale_price__isnull', False), ('sale_price__lt', models.F('price'))), then=models.F('sale_price')), default=models.F('price')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price'], name='product_effective_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['discount_percent'], name='product_discount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('next_price_change_at__isnull', False)), fields=['next_price_change_at'], name='product_price_change_idx'),
+        ),
+    ], outbox_trigger_sql(['products_product']) + LISTING_TRIGGER_SQL, LISTING_TRIGGER_DROP_SQL + drop_outbox_trigger_sql(['products_product']))
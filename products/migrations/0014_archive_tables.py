@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:49
+
+import products.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_sale_windows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('sku', models.CharField(db_index=True, max_length=50)),
+                ('slug', models.SlugField(max_length=200)),
+                ('category_id', models.BigIntegerField()),
+                ('data', models.JSONField(encoder=products.models.ArchiveJSONEncoder)),
+                ('images', models.JSONField(default=list, encoder=products.models.ArchiveJSONEncoder)),
+                ('reviews', models.JSONField(default=list, encoder=products.models.ArchiveJSONEncoder)),
+                ('reservations', models.JSONField(default=list, encoder=products.models.ArchiveJSONEncoder)),
+                ('last_updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_id', models.BigIntegerField(unique=True)),
+                ('product_id', models.BigIntegerField(db_index=True)),
+                ('customer_name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('rating', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('comment', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['updated_at'], name='product_inactive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['created_at'], name='review_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:10
+
+from django.db import migrations
+
+from products.operations import SQLiteRunSQL
+from products.search import FTS_SQL, FTS_DROP_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_inventory_sync_batches'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(FTS_SQL, reverse_sql=FTS_DROP_SQL),
+    ]
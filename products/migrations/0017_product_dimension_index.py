@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:10
+
+from django.db import migrations
+
+from products.dimensions import RTREE_SQL, RTREE_DROP_SQL
+from products.operations import SQLiteRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_product_search_index'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(RTREE_SQL, reverse_sql=RTREE_DROP_SQL),
+    ]
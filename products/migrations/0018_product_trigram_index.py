@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:10
+
+from django.db import migrations
+
+from products.operations import SQLiteRunSQL
+from products.trigrams import TRIGRAM_SQL, TRIGRAM_DROP_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_product_dimension_index'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(TRIGRAM_SQL, reverse_sql=TRIGRAM_DROP_SQL),
+    ]
@@ -1,6 +1,13 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Avg, Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.text import slugify
+import datetime
 import uuid
 
 class Category(models.Model):
@@ -49,6 +56,61 @@ class Subcategory(models.Model):
     def __str__(self):
         return f"{self.category.name} - {self.name}"
 
+
+class ChangeSequence(models.Model):
+    """Named monotonic counters; the catalogue one orders the product change feed"""
+    CATALOGUE = 'catalogue'
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def next_value(cls, name=CATALOGUE):
+        """Allocate the next value; the row stays locked until the caller's transaction commits"""
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(value=F('value') + 1):
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(value=F('value') + 1)
+            return cls.objects.values_list('value', flat=True).get(name=name)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+# Matches Product.is_on_sale; sale_active tracks the sale window (see products.pricing)
+ON_SALE = Q(sale_price__isnull=False, sale_price__lt=F('price'), sale_active=True)
+
+class ProductQuerySet(models.QuerySet):
+    def with_review_stats(self):
+        """Annotate approved review count and average rating without a GROUP BY"""
+        approved = ProductReview.objects.filter(
+            product=OuterRef('pk'), is_approved=True
+        ).order_by().values('product')
+        return self.annotate(
+            approved_review_count=Coalesce(
+                Subquery(approved.annotate(count=Count('pk')).values('count')), 0
+            ),
+            approved_rating_avg=Subquery(approved.annotate(avg=Avg('rating')).values('avg')),
+        )
+
+    def for_listing(self, fields=None):
+        """Load what the listing serializers read, in a fixed number of queries
+
+        `fields` limits the work to the serializer fields actually emitted.
+        """
+        def wanted(*names):
+            return fields is None or any(name in fields for name in names)
+
+        queryset = self
+        if wanted('category'):
+            queryset = queryset.select_related('category')
+        if wanted('subcategory'):
+            queryset = queryset.select_related('subcategory__category')
+        if wanted('primary_image', 'images'):
+            queryset = queryset.prefetch_related('images')
+        if wanted('average_rating', 'review_count'):
+            queryset = queryset.with_review_stats()
+        return queryset
+
 class Product(models.Model):
     """Furniture products with detailed specifications"""
     MATERIAL_CHOICES = [
@@ -86,7 +148,29 @@ class Product(models.Model):
     # Pricing
     price = models.DecimalField(max_digits=10, decimal_places=2)
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # Optional sale window; an empty bound leaves that side open
+    sale_starts_at = models.DateTimeField(blank=True, null=True, help_text="Sale price applies from")
+    sale_ends_at = models.DateTimeField(blank=True, null=True, help_text="Sale price applies until")
+    # Whether now falls in the sale window, and when that next changes; kept by save() and
+    # products.pricing.apply_due_price_changes()
+    sale_active = models.BooleanField(default=True, editable=False)
+    next_price_change_at = models.DateTimeField(blank=True, null=True, editable=False)
     cost_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # Stored copies of current_price and discount_percentage, so sorting and
+    # range filters on the price customers pay can use an index
+    effective_price = models.GeneratedField(
+        expression=Case(When(ON_SALE, then=F('sale_price')), default=F('price')),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
+    discount_percent = models.GeneratedField(
+        expression=Case(
+            When(ON_SALE, then=Cast((F('price') - F('sale_price')) * 100 / F('price'), models.IntegerField())),
+            default=Value(0),
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     
     # Inventory
     stock_quantity = models.PositiveIntegerField(default=0)
@@ -103,12 +187,20 @@ class Product(models.Model):
     
     # Features
     features = models.JSONField(default=list, blank=True, help_text="List of product features")
+    # Normalised from `features` on save, for filtering and counts
+    feature_tags = models.ManyToManyField(
+        'FeatureTag', through='ProductFeature', related_name='products', blank=True, editable=False
+    )
     specifications = models.JSONField(default=dict, blank=True, help_text="Additional specifications")
     
     # Status
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     is_bestseller = models.BooleanField(default=False)
+    # Approved reviews per star rating, {"1": n, ..., "5": n}, kept current by review writes
+    rating_histogram = models.JSONField(default=dict, blank=True, editable=False)
+    # Time-decayed product detail views, recomputed by update_popularity
+    popularity = models.FloatField(default=0, editable=False)
     
     # SEO
     meta_title = models.CharField(max_length=60, blank=True)
@@ -117,23 +209,66 @@ class Product(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Position in the change feed (ChangeSequence 'catalogue'), bumped on every write
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['change_seq', 'id'], name='product_change_seq_idx'),
+            models.Index(fields=['stock_quantity'], name='product_stock_idx'),
+            # Matches the stock_headroom alias used by the stock_status filter
+            models.Index(F('stock_quantity') - F('low_stock_threshold'), name='product_stock_headroom_idx'),
+            models.Index(fields=['effective_price'], name='product_effective_price_idx'),
+            models.Index(fields=['discount_percent'], name='product_discount_idx'),
+            models.Index(fields=['popularity'], name='product_popularity_idx'),
+            models.Index(
+                fields=['next_price_change_at'], name='product_price_change_idx',
+                condition=Q(next_price_change_at__isnull=False)
+            ),
+            # Archival candidates; see products.archive
+            models.Index(fields=['updated_at'], name='product_inactive_idx', condition=Q(is_active=False)),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         if not self.sku:
             self.sku = f"ASHWI-{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
+        self.refresh_sale_window()
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'change_seq', 'updated_at', 'sale_active', 'next_price_change_at'
+            }
+        # Same transaction as the sequence bump, so feed positions commit in order
+        with transaction.atomic():
+            self.change_seq = ChangeSequence.next_value()
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        super().clean()
+        if self.sale_starts_at and self.sale_ends_at and self.sale_ends_at <= self.sale_starts_at:
+            raise ValidationError({'sale_ends_at': 'The sale must end after it starts.'})
+
+    def refresh_sale_window(self, now=None):
+        """Set sale_active and next_price_change_at for `now`; returns whether either changed"""
+        now = now or timezone.now()
+        starts, ends = self.sale_starts_at, self.sale_ends_at
+        active = (starts is None or starts <= now) and (ends is None or ends > now)
+        next_change = min((moment for moment in (starts, ends) if moment and moment > now), default=None)
+        changed = (active, next_change) != (self.sale_active, self.next_price_change_at)
+        self.sale_active, self.next_price_change_at = active, next_change
+        return changed
+
     @property
     def is_on_sale(self):
-        return self.sale_price is not None and self.sale_price < self.price
+        return self.sale_price is not None and self.sale_price < self.price and self.sale_active
 
     @property
     def current_price(self):
@@ -187,6 +322,344 @@ class ProductReview(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Latest approved reviews of a product, and keyset pages through them. Partial on
+            # is_approved since SQLite filters booleans as a bare column, not an equality
+            models.Index(
+                fields=['product', '-created_at', '-id'],
+                condition=Q(is_approved=True),
+                name='review_product_approved_idx'
+            ),
+            # Moderation queue, oldest first, and archival of reviews never approved
+            models.Index(fields=['created_at'], condition=Q(is_approved=False), name='review_pending_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.customer_name} ({self.rating} stars)"
+
+class StockReservation(models.Model):
+    """Time-limited hold on product stock, deducted atomically when taken"""
+    STATUS_ACTIVE = 'active'
+    STATUS_COMMITTED = 'committed'
+    STATUS_RELEASED = 'released'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_COMMITTED, 'Committed'),
+        (STATUS_RELEASED, 'Released'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    # Null for holds made outside the API; kept when the user is deleted so the hold still expires
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_reservations'
+    )
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Expiry sweeps scan active holds in expiry order
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.quantity} ({self.status})"
+
+
+class ProductTombstone(models.Model):
+    """Marker left in the change feed when a product is deleted"""
+    product_id = models.BigIntegerField(unique=True)
+    slug = models.SlugField(max_length=200)
+    change_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['change_seq', 'product_id']
+        indexes = [
+            models.Index(fields=['change_seq', 'product_id'], name='tombstone_change_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted product {self.product_id} ({self.slug})"
+
+
+class OutboxEvent(models.Model):
+    """Catalogue write recorded in the writing transaction, consumed by process_outbox"""
+    ACTION_CREATED = 'created'
+    ACTION_UPDATED = 'updated'
+    ACTION_DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (ACTION_CREATED, 'Created'),
+        (ACTION_UPDATED, 'Updated'),
+        (ACTION_DELETED, 'Deleted'),
+    ]
+
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.action}"
+
+
+class OutboxCheckpoint(models.Model):
+    """Last outbox event a named consumer has fully processed"""
+    consumer = models.CharField(max_length=100, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.position}"
+
+
+class Job(models.Model):
+    """Background job stored in the database and run by the run_worker command"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    PENDING_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0, help_text="Higher runs first")
+    # Only one queued or running job may hold a given key
+    unique_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at', 'id'], name='job_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=Q(status__in=['queued', 'running']),
+                name='job_pending_unique_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class ProductDailyViews(models.Model):
+    """Product detail views per day, flushed in batches from per-worker buffers"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['product', 'date']
+        indexes = [
+            models.Index(fields=['date'], name='daily_views_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}: {self.views}"
+
+
+class ProductSpec(models.Model):
+    """One filterable key/value from Product.specifications, kept in sync on save"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='spec_values')
+    # Normalised key used in ?spec.<key>= filters, and the key as written
+    key = models.CharField(max_length=100)
+    label = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    value_normalized = models.CharField(max_length=255)
+    value_number = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'value_normalized', 'product'], name='spec_key_value_idx'),
+            models.Index(fields=['key', 'value_number', 'product'], name='spec_key_number_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.key}={self.value}"
+
+
+class FeatureTag(models.Model):
+    """Normalised product feature, shared by every product listing it"""
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class ProductFeature(models.Model):
+    """Link between a product and one of its feature tags"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='feature_links')
+    tag = models.ForeignKey(FeatureTag, on_delete=models.CASCADE, related_name='product_links')
+
+    class Meta:
+        unique_together = ['product', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'product'], name='product_feature_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.tag_id}"
+
+
+class ProductListing(models.Model):
+    """Denormalised grid row per active product, maintained by database triggers
+
+    Holds exactly what the listing endpoints return so grids read one table
+    with no joins. See products.listing.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, primary_key=True, db_constraint=False, related_name='listing'
+    )
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    sale_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_percent = models.IntegerField(default=0)
+    stock_quantity = models.PositiveIntegerField(default=0)
+    low_stock_threshold = models.PositiveIntegerField(default=5)
+    material = models.CharField(max_length=20)
+    finish = models.CharField(max_length=20)
+    color = models.CharField(max_length=50)
+    is_featured = models.BooleanField(default=False)
+    is_bestseller = models.BooleanField(default=False)
+    popularity = models.FloatField(default=0)
+    category = models.ForeignKey(
+        Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    category_name = models.CharField(max_length=100)
+    category_slug = models.SlugField(max_length=100)
+    subcategory = models.ForeignKey(
+        Subcategory, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    subcategory_name = models.CharField(max_length=100)
+    subcategory_slug = models.SlugField(max_length=100)
+    primary_image_id = models.BigIntegerField(null=True, blank=True)
+    primary_image = models.CharField(max_length=100, blank=True)
+    primary_image_alt = models.CharField(max_length=200, blank=True)
+    primary_image_is_primary = models.BooleanField(default=False)
+    primary_image_order = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='listing_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='listing_category_idx'),
+            models.Index(fields=['subcategory', '-created_at'], name='listing_subcategory_idx'),
+            models.Index(fields=['effective_price'], name='listing_price_idx'),
+            models.Index(fields=['discount_percent'], name='listing_discount_idx'),
+            models.Index(fields=['popularity'], name='listing_popularity_idx'),
+            models.Index(fields=['is_featured', '-created_at'], name='listing_featured_idx'),
+            models.Index(fields=['is_bestseller', '-created_at'], name='listing_bestseller_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that keeps microseconds, so restored timestamps match exactly"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class ArchivedProduct(models.Model):
+    """Inactive product moved out of the hot tables with its images, reviews and reservations
+
+    `data` and the related lists hold rows in Django's serialisation format
+    so products.archive can restore them with their original ids.
+    """
+    product_id = models.BigIntegerField(unique=True)
+    name = models.CharField(max_length=200)
+    sku = models.CharField(max_length=50, db_index=True)
+    slug = models.SlugField(max_length=200)
+    category_id = models.BigIntegerField()
+    data = models.JSONField(encoder=ArchiveJSONEncoder)
+    images = models.JSONField(encoder=ArchiveJSONEncoder, default=list)
+    reviews = models.JSONField(encoder=ArchiveJSONEncoder, default=list)
+    reservations = models.JSONField(encoder=ArchiveJSONEncoder, default=list)
+    last_updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-archived_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.sku})"
+
+
+class ArchivedReview(models.Model):
+    """Unapproved review moved out of products_productreview after the moderation window"""
+    review_id = models.BigIntegerField(unique=True)
+    product_id = models.BigIntegerField(db_index=True)
+    customer_name = models.CharField(max_length=100)
+    email = models.EmailField()
+    rating = models.PositiveIntegerField()
+    title = models.CharField(max_length=200)
+    comment = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-archived_at']
+
+    def __str__(self):
+        return f"{self.customer_name} on product {self.product_id} ({self.rating} stars)"
+
+
+class InventorySyncBatch(models.Model):
+    """Applied POS/warehouse sync batch, kept so a retried batch id gets the same results"""
+    batch_id = models.CharField(max_length=100, unique=True)
+    payload_hash = models.CharField(max_length=64)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    item_count = models.PositiveIntegerField()
+    updated_count = models.PositiveIntegerField()
+    results = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'inventory sync batches'
+
+    def __str__(self):
+        return f"{self.batch_id} ({self.updated_count}/{self.item_count} updated)"
@@ -0,0 +1,34 @@
+"""Migration operations for the SQLite-only schema objects
+
+Full-text and trigram indexes, the dimension R*Tree and the outbox and
+listing triggers are created by migrations with SQLiteRunSQL, so sqlmigrate
+shows them and they reverse with the migration. Other databases skip them.
+
+SQLite rebuilds products_product for most field changes: the triggers on it
+are dropped with the old table, and the rename fails while triggers on other
+tables read it. A migration that alters the product table wraps its
+operations with around_product_rebuild() and the trigger SQL in place at
+that point of the history.
+"""
+from django.db import migrations
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """RunSQL that only runs on SQLite"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def around_product_rebuild(operations, create_sql, drop_sql):
+    """Drop the given triggers before `operations` and create them again after, in both directions"""
+    return [
+        SQLiteRunSQL(drop_sql, reverse_sql=create_sql),
+        *operations,
+        SQLiteRunSQL(create_sql, reverse_sql=drop_sql),
+    ]
@@ -0,0 +1,128 @@
+"""Transactional outbox for catalogue changes
+
+Every insert, update and delete on a catalogue table appends an OutboxEvent
+in the same transaction. On SQLite this is done by triggers created in
+migrations, so queryset.update(), bulk_update() and raw SQL are captured as
+well as save().
+Other databases fall back to post_save/post_delete and the bulk merchandising
+paths calling record_events().
+
+process_outbox reads events in id order, coalesces repeated events for the
+same object, hands each batch to the `outbox_batch` signal and only then
+advances the consumer's checkpoint, so delivery is at-least-once. Events
+every consumer has passed are then pruned. The derived data (home cache,
+sale schedule, replicas, columnar snapshot) is refreshed by receivers for
+the default consumer; catalogue_changed only queues products.process_outbox.
+"""
+from django.db import connections
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import OutboxCheckpoint, OutboxEvent
+
+# Sent with `events`, a list of coalesced OutboxEvent-like records; a receiver
+# that raises leaves the batch unacknowledged so it is delivered again
+outbox_batch = Signal()
+
+DEFAULT_CONSUMER = 'default'
+
+OUTBOX_TABLE = 'products_outboxevent'
+OUTBOX_TABLES = {
+    'products_category': 'products.category',
+    'products_subcategory': 'products.subcategory',
+    'products_product': 'products.product',
+    'products_productimage': 'products.productimage',
+    'products_productreview': 'products.productreview',
+}
+_TRIGGER_EVENTS = [
+    ('ai', 'INSERT', 'new', OutboxEvent.ACTION_CREATED),
+    ('au', 'UPDATE', 'new', OutboxEvent.ACTION_UPDATED),
+    ('ad', 'DELETE', 'old', OutboxEvent.ACTION_DELETED),
+]
+
+
+def _trigger_name(table, suffix):
+    return f'{table}_outbox_{suffix}'
+
+
+def _trigger_sql(table, label, suffix, event, row, action):
+    return f'''CREATE TRIGGER IF NOT EXISTS {_trigger_name(table, suffix)} AFTER {event} ON {table} BEGIN
+        INSERT INTO {OUTBOX_TABLE}(model, object_id, action, created_at)
+        VALUES ('{label}', {row}.id, '{action}', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END'''
+
+
+def triggers_available(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def outbox_trigger_sql(tables=OUTBOX_TABLES):
+    """CREATE TRIGGER statements for the given catalogue tables; applied by migrations"""
+    return [
+        _trigger_sql(table, OUTBOX_TABLES[table], suffix, event, row, action)
+        for table in tables for suffix, event, row, action in _TRIGGER_EVENTS
+    ]
+
+
+def drop_outbox_trigger_sql(tables=OUTBOX_TABLES):
+    return [f'DROP TRIGGER IF EXISTS {_trigger_name(table, suffix)}' for table in tables for suffix, *_ in _TRIGGER_EVENTS]
+
+
+def record_events(model, object_ids, action, using='default'):
+    """Append events for writes the triggers cannot see (non-SQLite databases only)"""
+    if triggers_available(using):
+        return
+    OutboxEvent.objects.using(using).bulk_create([
+        OutboxEvent(model=model._meta.label_lower, object_id=object_id, action=action)
+        for object_id in object_ids
+    ])
+
+
+def coalesce(events):
+    """Collapse events per object into one, keeping the order of each object's last event
+
+    A create followed by updates stays a create; anything followed by a delete
+    is a delete.
+    """
+    latest = {}
+    for event in events:
+        key = (event.model, event.object_id)
+        previous = latest.pop(key, None)
+        if previous is not None and previous.action == OutboxEvent.ACTION_CREATED \
+                and event.action == OutboxEvent.ACTION_UPDATED:
+            event.action = OutboxEvent.ACTION_CREATED
+        latest[key] = event
+    return list(latest.values())
+
+
+def process_outbox(consumer=DEFAULT_CONSUMER, batch_size=500, max_batches=None):
+    """Deliver pending events to `outbox_batch` receivers, then prune; returns (events read, delivered)"""
+    read = delivered = batches = 0
+    while max_batches is None or batches < max_batches:
+        checkpoint, _ = OutboxCheckpoint.objects.get_or_create(consumer=consumer)
+        events = list(OutboxEvent.objects.filter(id__gt=checkpoint.position).order_by('id')[:batch_size])
+        if not events:
+            break
+
+        coalesced = coalesce(events)
+        outbox_batch.send(sender=OutboxEvent, consumer=consumer, events=coalesced)
+        # Checkpoint only after every receiver succeeded
+        OutboxCheckpoint.objects.filter(consumer=consumer, position=checkpoint.position).update(
+            position=events[-1].id, updated_at=timezone.now()
+        )
+
+        read += len(events)
+        delivered += len(coalesced)
+        batches += 1
+        if len(events) < batch_size:
+            break
+    if read:
+        prune_outbox()
+    return read, delivered
+
+
+def prune_outbox():
+    """Delete events every consumer has processed; returns the number deleted"""
+    position = min(OutboxCheckpoint.objects.values_list('position', flat=True), default=0)
+    deleted, _ = OutboxEvent.objects.filter(id__lte=position).delete()
+    return deleted
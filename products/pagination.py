@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewCursorPagination(CursorPagination):
+    """Keyset pages of reviews, newest first, served from the (product, is_approved, created_at) index"""
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
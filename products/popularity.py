@@ -0,0 +1,165 @@
+"""Product view counting and popularity ranking
+
+Detail views are counted in a per-process buffer. A daemon thread flushes it
+as aggregated per-product, per-day increments every POPULARITY_FLUSH_INTERVAL
+seconds, or sooner once POPULARITY_FLUSH_THRESHOLD views are waiting, so a
+page view never writes to the database. update_popularity() turns the daily
+counts into a time-decayed score stored on the indexed Product.popularity
+column; it runs as the products.update_popularity job, queued on an
+interval once views are flushed.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .db_routers import pinned_to_primary
+from .jobs import enqueue
+from .models import Product, ProductDailyViews
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """Thread-safe in-memory view counts for one worker process, flushed by a daemon thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._total = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+    def add(self, product_id):
+        with self._lock:
+            self._start_flusher()
+            self._counts[product_id] += 1
+            self._total += 1
+            if self._total >= settings.POPULARITY_FLUSH_THRESHOLD:
+                self._wake.set()
+
+    def _start_flusher(self):
+        # Started on first use, and again in each forked worker since threads are not inherited
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='view-buffer-flush', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(settings.POPULARITY_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            connection.close()
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._total = 0
+        return counts
+
+    def flush(self):
+        """Write buffered counts as one increment per product; returns the views written"""
+        counts = self.drain()
+        if not counts:
+            return 0
+        try:
+            write_daily_views(counts)
+            schedule_popularity_update()
+        except Exception:
+            # Keep the counts for the next flush rather than losing them
+            with self._lock:
+                self._counts.update(counts)
+                self._total += sum(counts.values())
+            logger.exception('Could not flush %s buffered product views', sum(counts.values()))
+            return 0
+        return sum(counts.values())
+
+    def stop(self, timeout=10):
+        """Stop the flush thread, letting a write in progress finish, then flush what is left"""
+        self._stopping = True
+        if self._thread is not None and self._pid == os.getpid():
+            self._wake.set()
+            self._thread.join(timeout)
+        self.flush()
+
+
+def write_daily_views(counts, date=None):
+    """Add view counts to today's rows in a single transaction"""
+    date = date or timezone.localdate()
+    # The flush thread inherits no routing state; the rows being incremented live on primary
+    with pinned_to_primary(), transaction.atomic():
+        existing = set(
+            ProductDailyViews.objects.filter(date=date, product_id__in=counts).values_list('product_id', flat=True)
+        )
+        for product_id in existing:
+            ProductDailyViews.objects.filter(product_id=product_id, date=date).update(
+                views=F('views') + counts[product_id]
+            )
+        # Products deleted since they were viewed are dropped
+        live = set(Product.objects.filter(pk__in=set(counts) - existing).values_list('pk', flat=True))
+        ProductDailyViews.objects.bulk_create(
+            [ProductDailyViews(product_id=product_id, date=date, views=counts[product_id]) for product_id in live],
+            ignore_conflicts=True
+        )
+
+
+view_buffer = ViewBuffer()
+# The daemon thread dies with the interpreter; stop it cleanly so a write in progress is not cut off
+atexit.register(view_buffer.stop)
+
+
+def record_view(product_id):
+    view_buffer.add(product_id)
+
+
+def schedule_popularity_update():
+    """Queue products.update_popularity for the next POPULARITY_UPDATE_INTERVAL boundary"""
+    interval = settings.POPULARITY_UPDATE_INTERVAL
+    run_at = math.ceil(time.time() / interval) * interval
+    # Keyed by the slot: the running job can queue the next one, and flushes share it
+    return enqueue('products.update_popularity', unique_key=f'products.update_popularity:{run_at}',
+                   delay=max(run_at - time.time(), 0))
+
+
+def update_popularity(now=None, chunk_size=500):
+    """Recompute Product.popularity from daily views; returns the number of products changed
+
+    Each day's views are weighted by 0.5 ** (age in days / half-life), over
+    POPULARITY_WINDOW_DAYS. Products whose score did not change are skipped.
+    """
+    today = timezone.localdate(now)
+    half_life = settings.POPULARITY_HALF_LIFE_DAYS
+    since = today - timedelta(days=settings.POPULARITY_WINDOW_DAYS)
+
+    scores = Counter()
+    rows = ProductDailyViews.objects.filter(date__gt=since).values_list('product_id', 'date', 'views')
+    for product_id, date, views in rows.iterator(chunk_size=2000):
+        scores[product_id] += views * 0.5 ** ((today - date).days / half_life)
+
+    changed = []
+    current = Product.objects.order_by().values_list('pk', 'popularity')
+    for product_id, popularity in current.iterator(chunk_size=2000):
+        score = round(scores.get(product_id, 0.0), 4)
+        if score != popularity:
+            changed.append(Product(pk=product_id, popularity=score))
+
+    for start in range(0, len(changed), chunk_size):
+        with transaction.atomic():
+            Product.objects.bulk_update(changed[start:start + chunk_size], ['popularity'])
+
+    ProductDailyViews.objects.filter(date__lte=since).delete()
+    return len(changed)
@@ -0,0 +1,107 @@
+"""Scheduled sale windows
+
+A sale price applies between the product's sale_starts_at and sale_ends_at.
+Product.save() stores whether the window is open (sale_active, which feeds
+the generated effective_price and discount_percent columns, so filters and
+ordering stay in the database) and the next start or end still ahead
+(next_price_change_at, indexed). When that moment passes,
+apply_due_price_changes() flips the products due with chunked bulk updates,
+so the listing table, search index, outbox and caches follow as for any
+other bulk write. It runs as the products.apply_price_changes job, which the
+outbox consumer queues for the next transition after product writes, and
+which queues the following one after each run; reads never write. Read endpoints cap cache lifetimes at the
+next transition, so a cached response never outlives the prices it shows.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .db_routers import pinned_to_primary
+from .jobs import enqueue
+from .models import ChangeSequence, OutboxEvent, Product
+from .outbox import DEFAULT_CONSUMER, outbox_batch, record_events
+from .signals import catalogue_changed
+
+CHUNK_SIZE = 500
+NEXT_CHANGE_CACHE_KEY = 'pricing:next_change'
+
+
+def forget_next_price_change():
+    cache.delete(NEXT_CHANGE_CACHE_KEY)
+
+
+@receiver(outbox_batch)
+def _reschedule_on_batch(sender, consumer, events, **kwargs):
+    # A saved product may have moved its window; look the next transition up again
+    if consumer == DEFAULT_CONSUMER and any(event.model == Product._meta.label_lower for event in events):
+        forget_next_price_change()
+        schedule_price_changes()
+
+
+def next_price_change():
+    """The earliest scheduled sale start or end, or None; one indexed query, then cached"""
+    cached = cache.get(NEXT_CHANGE_CACHE_KEY)
+    if cached is not None:
+        return cached[0]
+    # From primary: a lagging replica would report transitions already applied
+    with pinned_to_primary():
+        moment = Product.objects.filter(next_price_change_at__isnull=False).aggregate(
+            moment=Min('next_price_change_at')
+        )['moment']
+    # Cached in a tuple so "nothing scheduled" is a hit too; the transition itself ends the entry
+    timeout = None if moment is None else max(int((moment - timezone.now()).total_seconds()), 1)
+    cache.set(NEXT_CHANGE_CACHE_KEY, (moment,), timeout)
+    return moment
+
+
+def apply_due_price_changes(now=None, chunk_size=CHUNK_SIZE):
+    """Open and close the sale windows whose transition has passed; returns the number changed"""
+    now = now or timezone.now()
+    updated = 0
+    with pinned_to_primary():
+        ids = list(
+            Product.objects.filter(next_price_change_at__lte=now).order_by('pk').values_list('pk', flat=True)
+        )
+        for start in range(0, len(ids), chunk_size):
+            with transaction.atomic():
+                products = list(
+                    Product.objects.select_for_update().filter(pk__in=ids[start:start + chunk_size]).only(
+                        'pk', 'sale_starts_at', 'sale_ends_at', 'sale_active', 'next_price_change_at'
+                    )
+                )
+                changed = [product for product in products if product.refresh_sale_window(now)]
+                change_seq = ChangeSequence.next_value()
+                for product in changed:
+                    product.updated_at = now
+                    product.change_seq = change_seq
+                Product.objects.bulk_update(
+                    changed, ['sale_active', 'next_price_change_at', 'updated_at', 'change_seq']
+                )
+                record_events(Product, [product.pk for product in changed], OutboxEvent.ACTION_UPDATED)
+            updated += len(changed)
+    forget_next_price_change()
+    if updated:
+        catalogue_changed.send(sender=Product, instance=None)
+    return updated
+
+
+def schedule_price_changes():
+    """Queue products.apply_price_changes for the next transition; returns it, or None"""
+    moment = next_price_change()
+    if moment is not None:
+        # One job per transition: an earlier one added later still gets its own run
+        enqueue(
+            'products.apply_price_changes',
+            unique_key=f'products.apply_price_changes:{moment.isoformat()}',
+            delay=max((moment - timezone.now()).total_seconds(), 0)
+        )
+    return moment
+
+
+def seconds_until_price_change(moment, limit):
+    """`limit` seconds, or fewer when a price changes sooner"""
+    if moment is None:
+        return limit
+    return max(0, min(limit, int((moment - timezone.now()).total_seconds())))
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+from .db_routers import get_replica_aliases
+
+_refresh_lock = threading.Lock()
+
+
+def _sqlite_path(alias):
+    db = connections.databases[alias]
+    if db['ENGINE'] != 'django.db.backends.sqlite3':
+        return None
+    return str(db['NAME'])
+
+
+def refresh_replica(alias, source_alias='default'):
+    """Copy the primary SQLite database into a replica with the online backup API
+
+    The snapshot is written next to the replica file and swapped in with an
+    atomic rename, so connections opened by the replica alias only ever see
+    a complete copy. Connections already open keep reading the previous file
+    until Django closes them at the end of their request.
+    """
+    source_path = _sqlite_path(source_alias)
+    target_path = _sqlite_path(alias)
+    if source_path is None or target_path is None:
+        # Non-SQLite replicas are kept in sync by the database server itself
+        return False
+
+    tmp_path = f'{target_path}.tmp'
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target, pages=getattr(settings, 'REPLICA_BACKUP_PAGES', -1))
+        finally:
+            target.close()
+    finally:
+        source.close()
+    os.replace(tmp_path, target_path)
+    return True
+
+
+def refresh_replicas():
+    """Refresh every configured replica from primary and return the refreshed aliases"""
+    refreshed = []
+    with _refresh_lock:
+        for alias in get_replica_aliases():
+            if refresh_replica(alias):
+                refreshed.append(alias)
+    return refreshed
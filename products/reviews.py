@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch
+
+from .models import Product, ProductReview
+
+RATINGS = range(1, 6)
+
+
+def empty_histogram():
+    return {str(rating): 0 for rating in RATINGS}
+
+
+def latest_approved_reviews(product=None, limit=None):
+    """The newest approved reviews, at most `limit` (PRODUCT_DETAIL_REVIEWS) per product when prefetched"""
+    limit = settings.PRODUCT_DETAIL_REVIEWS if limit is None else limit
+    reviews = ProductReview.objects.filter(is_approved=True)
+    if product is not None:
+        reviews = reviews.filter(product=product)
+    return reviews.order_by('-created_at', '-id')[:limit]
+
+
+def prefetch_latest_reviews(limit=None):
+    """Prefetch into `latest_reviews`; the sliced queryset is limited per product"""
+    return Prefetch('reviews', queryset=latest_approved_reviews(limit=limit), to_attr='latest_reviews')
+
+
+def refresh_rating_histograms(product_ids):
+    """Recount approved reviews per star for the given products from one grouped query"""
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return
+    histograms = {pk: empty_histogram() for pk in product_ids}
+    rows = ProductReview.objects.filter(
+        product_id__in=product_ids, is_approved=True
+    ).order_by().values_list('product_id', 'rating').annotate(count=Count('pk'))
+    for product_id, rating, count in rows:
+        histograms[product_id][str(rating)] = count
+    with transaction.atomic():
+        for product_id, histogram in histograms.items():
+            Product.objects.filter(pk=product_id).update(rating_histogram=histogram)
@@ -0,0 +1,59 @@
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_product_fts'
+
+# External-content FTS5 index over the product text columns. Triggers keep it
+# in sync with every write, including queryset.update() and raw SQL.
+_FTS_SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, sku, short_description, description,
+        content='products_product', content_rowid='id'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, short_description, description)
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, short_description, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, sku, short_description, description
+        ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, short_description, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, short_description, description)
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END''',
+]
+_FTS_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+# Applied by migrations, see products.operations
+FTS_SQL = _FTS_SCHEMA + [f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"]
+FTS_DROP_SQL = [f'DROP TRIGGER IF EXISTS {name}' for name in _FTS_TRIGGERS] + [f'DROP TABLE IF EXISTS {FTS_TABLE}']
+
+
+def search_index_available(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def rebuild_search_index(using='default'):
+    """Reindex every product from the product table"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_query(term):
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    words = re.findall(r'\w+', term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def matching_product_ids(term):
+    """Subquery of product ids whose text matches `term` through the FTS index"""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [build_match_query(term)]
+    )
@@ -1,7 +1,129 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Avg, Count
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
-from .models import Category, Subcategory, Product, ProductImage, ProductReview
+from .inventory import SYNC_FIELDS, SYNC_MODES
+from .merchandising import SALE_MODE_CHOICES, ROUNDING_CHOICES
+from .models import Category, Subcategory, Product, ProductImage, ProductReview, StockReservation, ProductListing
+from .reviews import empty_histogram, latest_approved_reviews
+
+
+def attach_product_counts(categories=(), subcategories=()):
+    """Set active_product_count on categories/subcategories with one grouped query per model"""
+    for objects, field in ((categories, 'category'), (subcategories, 'subcategory')):
+        missing = {obj.pk for obj in objects if not hasattr(obj, 'active_product_count')}
+        if not missing:
+            continue
+        counts = dict(
+            Product.objects.filter(is_active=True, **{f'{field}__in': missing})
+            .order_by().values(field).annotate(count=Count('pk')).values_list(field, 'count')
+        )
+        for obj in objects:
+            if not hasattr(obj, 'active_product_count'):
+                obj.active_product_count = counts.get(obj.pk, 0)
+
+
+def _product_count(obj):
+    count = getattr(obj, 'active_product_count', None)
+    if count is None:
+        count = obj.products.filter(is_active=True).count()
+    return count
+
+
+def _primary_image(obj):
+    # Reads the prefetched images when available instead of filtering per product
+    images = list(obj.images.all())
+    for image in images:
+        if image.is_primary:
+            return image
+    return images[0] if images else None
+
+
+def _review_stats(obj):
+    """Approved review count and rounded average rating, from annotations when present"""
+    if hasattr(obj, 'approved_review_count'):
+        count, average = obj.approved_review_count, obj.approved_rating_avg
+    else:
+        stats = obj.reviews.filter(is_approved=True).aggregate(count=Count('pk'), average=Avg('rating'))
+        count, average = stats['count'], stats['average']
+    return count, round(average, 1) if count else 0
+
+
+def _as_list(data):
+    return list(data.all() if isinstance(data, BaseManager) else data)
+
+
+def _csv_param(request, name):
+    if request is None:
+        return set()
+    return {field.strip() for field in request.query_params.get(name, '').split(',') if field.strip()}
+
 
-class CategorySerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """Honour ?fields= and ?omit= on the top-level serializer of a response
+
+    Nested serializers are left whole. Views read the resulting field set to
+    skip the joins, prefetches and subqueries behind fields that are dropped.
+    Pass `sparse_fields: False` in the context to opt out.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('sparse_fields', True) or not self._is_response_root():
+            return fields
+
+        request = self.context.get('request')
+        requested = _csv_param(request, 'fields')
+        omitted = _csv_param(request, 'omit')
+        for name in list(fields):
+            if (requested and name not in requested) or name in omitted:
+                fields.pop(name)
+        return fields
+
+    def _is_response_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+def _has_fields(list_serializer, *names):
+    return any(name in list_serializer.child.fields for name in names)
+
+
+class CategoryListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        categories = _as_list(data)
+        if _has_fields(self, 'product_count'):
+            attach_product_counts(categories=categories)
+        return super().to_representation(categories)
+
+class SubcategoryListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        subcategories = _as_list(data)
+        attach_product_counts(
+            categories=[subcategory.category for subcategory in subcategories] if _has_fields(self, 'category') else [],
+            subcategories=subcategories if _has_fields(self, 'product_count') else []
+        )
+        return super().to_representation(subcategories)
+
+class ProductListListSerializer(serializers.ListSerializer):
+    """Fills nested category/subcategory product counts for a whole page at once"""
+    def to_representation(self, data):
+        products = _as_list(data)
+        categories, subcategories = [], []
+        if _has_fields(self, 'category'):
+            categories += [product.category for product in products]
+        if _has_fields(self, 'subcategory'):
+            categories += [product.subcategory.category for product in products]
+            subcategories += [product.subcategory for product in products]
+        attach_product_counts(categories=categories, subcategories=subcategories)
+        return super().to_representation(products)
+
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -11,11 +133,12 @@ class CategorySerializer(serializers.ModelSerializer):
             'product_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'created_at', 'updated_at']
+        list_serializer_class = CategoryListSerializer
     
     def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        return _product_count(obj)
 
-class SubcategorySerializer(serializers.ModelSerializer):
+class SubcategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
     product_count = serializers.SerializerMethodField()
@@ -27,9 +150,10 @@ class SubcategorySerializer(serializers.ModelSerializer):
             'category', 'category_id', 'product_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'created_at', 'updated_at']
+        list_serializer_class = SubcategoryListSerializer
     
     def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        return _product_count(obj)
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
@@ -61,13 +185,16 @@ class ProductReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Rating must be between 1 and 5")
         return value
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     subcategory = SubcategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
     subcategory_id = serializers.IntegerField(write_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
-    reviews = ProductReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
+    effective_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    discount_percent = serializers.IntegerField(read_only=True)
     primary_image = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
@@ -77,40 +204,46 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'slug', 'sku', 'category', 'subcategory',
             'category_id', 'subcategory_id', 'short_description', 'description',
-            'price', 'sale_price', 'cost_price', 'stock_quantity', 'low_stock_threshold',
+            'price', 'sale_price', 'sale_starts_at', 'sale_ends_at', 'cost_price', 'effective_price',
+            'discount_percent', 'stock_quantity', 'low_stock_threshold',
             'material', 'finish', 'dimensions_length', 'dimensions_width', 'dimensions_height',
             'weight', 'color', 'features', 'specifications', 'is_active', 'is_featured',
             'is_bestseller', 'meta_title', 'meta_description', 'images', 'primary_image',
-            'reviews', 'average_rating', 'review_count', 'created_at', 'updated_at'
+            'reviews', 'average_rating', 'review_count', 'rating_histogram', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'slug', 'sku', 'created_at', 'updated_at'
         ]
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return ProductImageSerializer(primary_image, context=self.context).data
-        # Return first image if no primary image
-        first_image = obj.images.first()
-        if first_image:
-            return ProductImageSerializer(first_image, context=self.context).data
+        # Primary image, falling back to the first image
+        image = _primary_image(obj)
+        if image:
+            return ProductImageSerializer(image, context=self.context).data
         return None
     
+    def get_reviews(self, obj):
+        # Latest approved reviews only; the full list is paged on the nested reviews route
+        reviews = getattr(obj, 'latest_reviews', None)
+        if reviews is None:
+            reviews = latest_approved_reviews(obj)
+        return ProductReviewSerializer(reviews, many=True, context=self.context).data
+    
+    def get_rating_histogram(self, obj):
+        return {**empty_histogram(), **(obj.rating_histogram or {})}
+    
     def get_average_rating(self, obj):
-        approved_reviews = obj.reviews.filter(is_approved=True)
-        if approved_reviews.exists():
-            total_rating = sum(review.rating for review in approved_reviews)
-            return round(total_rating / approved_reviews.count(), 1)
-        return 0
+        return _review_stats(obj)[1]
     
     def get_review_count(self, obj):
-        return obj.reviews.filter(is_approved=True).count()
+        return _review_stats(obj)[0]
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Simplified serializer for product listings"""
     category = CategorySerializer(read_only=True)
     subcategory = SubcategorySerializer(read_only=True)
+    effective_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    discount_percent = serializers.IntegerField(read_only=True)
     primary_image = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
@@ -119,29 +252,67 @@ class ProductListSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'name', 'slug', 'category', 'subcategory', 'price', 'sale_price',
-            'stock_quantity', 'material', 'color', 'is_featured', 'is_bestseller',
+            'effective_price', 'discount_percent', 'stock_quantity', 'material', 'color', 'is_featured', 'is_bestseller',
             'primary_image', 'average_rating', 'review_count', 'created_at'
         ]
         read_only_fields = ['slug', 'created_at']
+        list_serializer_class = ProductListListSerializer
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return ProductImageSerializer(primary_image, context=self.context).data
-        first_image = obj.images.first()
-        if first_image:
-            return ProductImageSerializer(first_image, context=self.context).data
+        # Primary image, falling back to the first image
+        image = _primary_image(obj)
+        if image:
+            return ProductImageSerializer(image, context=self.context).data
         return None
     
     def get_average_rating(self, obj):
-        approved_reviews = obj.reviews.filter(is_approved=True)
-        if approved_reviews.exists():
-            total_rating = sum(review.rating for review in approved_reviews)
-            return round(total_rating / approved_reviews.count(), 1)
-        return 0
+        return _review_stats(obj)[1]
     
     def get_review_count(self, obj):
-        return obj.reviews.filter(is_approved=True).count()
+        return _review_stats(obj)[0]
+
+class ProductListingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Product grid rows read from the denormalised listing table, without joins
+
+    Same fields as ProductListSerializer; category and subcategory carry only
+    id, name and slug.
+    """
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    category = serializers.SerializerMethodField()
+    subcategory = serializers.SerializerMethodField()
+    effective_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    primary_image = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ProductListing
+        fields = ProductListSerializer.Meta.fields
+        read_only_fields = fields
+    
+    def get_category(self, obj):
+        return {'id': obj.category_id, 'name': obj.category_name, 'slug': obj.category_slug}
+    
+    def get_subcategory(self, obj):
+        return {'id': obj.subcategory_id, 'name': obj.subcategory_name, 'slug': obj.subcategory_slug}
+    
+    def get_primary_image(self, obj):
+        if not obj.primary_image_id:
+            return None
+        url = default_storage.url(obj.primary_image)
+        request = self.context.get('request')
+        if request:
+            url = request.build_absolute_uri(url)
+        return {
+            'id': obj.primary_image_id,
+            'image': url,
+            'image_url': url,
+            'alt_text': obj.primary_image_alt,
+            'is_primary': obj.primary_image_is_primary,
+            'order': obj.primary_image_order,
+        }
+
+def grid_serializer_class(queryset):
+    """Serializer for a grid queryset from listing.grid_queryset()"""
+    return ProductListingSerializer if queryset.model is ProductListing else ProductListSerializer
 
 class ProductDetailSerializer(ProductSerializer):
     """Detailed serializer for single product view"""
@@ -156,6 +327,83 @@ class ProductDetailSerializer(ProductSerializer):
             category=obj.category,
             subcategory=obj.subcategory,
             is_active=True
-        ).exclude(id=obj.id)[:4]
+        ).exclude(id=obj.id).for_listing()[:4]
         
-        return ProductListSerializer(related, many=True, context=self.context).data 
\ No newline at end of file
+        return ProductListSerializer(related, many=True, context={**self.context, 'sparse_fields': False}).data 
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    product = serializers.SlugRelatedField(slug_field='slug', queryset=Product.objects.filter(is_active=True))
+    ttl_seconds = serializers.IntegerField(write_only=True, required=False, min_value=1)
+    
+    class Meta:
+        model = StockReservation
+        fields = ['token', 'product', 'quantity', 'status', 'expires_at', 'created_at', 'ttl_seconds']
+        read_only_fields = ['token', 'status', 'expires_at', 'created_at']
+    
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Quantity must be at least 1")
+        return value
+    
+    def validate_ttl_seconds(self, value):
+        if value > settings.STOCK_RESERVATION_MAX_TTL:
+            raise serializers.ValidationError(
+                f"Reservations can be held for at most {settings.STOCK_RESERVATION_MAX_TTL} seconds"
+            )
+        return value
+
+
+class BulkSalePricingSerializer(serializers.Serializer):
+    """Input for bulk sale pricing; without ids it applies to the filtered product list"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    mode = serializers.ChoiceField(choices=SALE_MODE_CHOICES + [('clear', 'Remove sale price')])
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    rounding = serializers.ChoiceField(choices=ROUNDING_CHOICES, default='none')
+    starts_at = serializers.DateTimeField(required=False, allow_null=True)
+    ends_at = serializers.DateTimeField(required=False, allow_null=True)
+    
+    def validate(self, data):
+        if data['mode'] != 'clear' and 'amount' not in data:
+            raise serializers.ValidationError({'amount': 'This field is required.'})
+        if data.get('starts_at') and data.get('ends_at') and data['ends_at'] <= data['starts_at']:
+            raise serializers.ValidationError({'ends_at': 'The sale must end after it starts.'})
+        if data['mode'] == 'percent' and data['amount'] >= 100:
+            raise serializers.ValidationError({'amount': 'A percentage discount must be below 100.'})
+        return data
+
+class InventorySyncItemSerializer(serializers.Serializer):
+    """One SKU in an inventory sync batch; omitted fields are left alone"""
+    sku = serializers.CharField(max_length=50)
+    mode = serializers.ChoiceField(choices=SYNC_MODES, required=False)
+    stock_quantity = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    sale_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    
+    def validate(self, data):
+        if not any(field in data for field in SYNC_FIELDS):
+            raise serializers.ValidationError(f"Send at least one of {', '.join(SYNC_FIELDS)}")
+        return data
+
+class InventorySyncSerializer(serializers.Serializer):
+    """Input for the POS/warehouse inventory sync endpoint"""
+    batch_id = serializers.CharField(max_length=100)
+    mode = serializers.ChoiceField(choices=SYNC_MODES, default='absolute')
+    items = InventorySyncItemSerializer(many=True, allow_empty=False)
+    
+    def validate_items(self, value):
+        if len(value) > settings.INVENTORY_SYNC_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"A batch can hold at most {settings.INVENTORY_SYNC_MAX_ITEMS} items"
+            )
+        return value
+
+class BulkFlagsSerializer(serializers.Serializer):
+    """Input for bulk featured/bestseller toggling"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    is_featured = serializers.BooleanField(required=False)
+    is_bestseller = serializers.BooleanField(required=False)
+    
+    def validate(self, data):
+        if 'is_featured' not in data and 'is_bestseller' not in data:
+            raise serializers.ValidationError("Set is_featured and/or is_bestseller")
+        return data
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .changes import record_tombstone, touch_products
+from .columnar import engine_enabled, refresh_snapshot
+from .db_routers import get_replica_aliases
+from .features import sync_feature_tags
+from .jobs import enqueue
+from .models import Category, Subcategory, Product, ProductImage, ProductReview, OutboxEvent
+from .outbox import DEFAULT_CONSUMER, outbox_batch, record_events
+from .reviews import refresh_rating_histograms
+from .specs import sync_product_specs
+
+# Sent once per catalogue write; bulk operations send it a single time when done
+catalogue_changed = Signal()
+
+CATALOGUE_MODELS = (Category, Subcategory, Product, ProductImage, ProductReview)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def _model_changed(sender, instance, using='default', **kwargs):
+    if sender in CATALOGUE_MODELS:
+        if 'created' in kwargs:
+            action = OutboxEvent.ACTION_CREATED if kwargs['created'] else OutboxEvent.ACTION_UPDATED
+        else:
+            action = OutboxEvent.ACTION_DELETED
+        record_events(sender, [instance.pk], action, using)
+        catalogue_changed.send(sender=sender, instance=instance)
+
+
+@receiver(post_delete, sender=Product)
+def _product_deleted(sender, instance, **kwargs):
+    record_tombstone(instance)
+
+
+@receiver(post_save, sender=Product)
+def _product_saved(sender, instance, update_fields=None, **kwargs):
+    # Runs inside Product.save()'s transaction
+    if update_fields is None or 'specifications' in update_fields:
+        sync_product_specs(instance)
+    if update_fields is None or 'features' in update_fields:
+        sync_feature_tags([instance])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def _product_child_changed(sender, instance, **kwargs):
+    # Deleting a review nobody could see (such as archiving spam) changes no payload
+    if sender is ProductReview and 'created' not in kwargs and not instance.is_approved:
+        return
+    if sender is ProductReview:
+        refresh_rating_histograms([instance.product_id])
+    # Images and review stats are part of the product payload in the change feed
+    touch_products([instance.product_id])
+
+
+@receiver(catalogue_changed)
+def _process_outbox_on_change(sender, **kwargs):
+    # An admin save touches the product and every inline; queue once per commit
+    if any(func is _process_outbox for _, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(_process_outbox)
+
+
+def _process_outbox():
+    # The unique key folds a burst of writes into one pending delivery
+    enqueue('products.process_outbox', unique_key='products.process_outbox')
+
+
+@receiver(outbox_batch)
+def _refresh_replicas_on_batch(sender, consumer, events, **kwargs):
+    if consumer != DEFAULT_CONSUMER or not getattr(settings, 'REPLICA_REFRESH_ON_CHANGE', False) \
+            or not get_replica_aliases():
+        return
+    # The backup is slow; a separate job keeps it from holding up the checkpoint
+    enqueue('products.refresh_replicas', unique_key='products.refresh_replicas')
+
+
+@receiver(outbox_batch)
+def _refresh_columnar_on_batch(sender, consumer, events, **kwargs):
+    # Patched before the checkpoint moves, while the events it reads are not yet pruned
+    if consumer == DEFAULT_CONSUMER and engine_enabled():
+        refresh_snapshot()
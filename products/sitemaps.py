@@ -0,0 +1,194 @@
+"""XML sitemaps and robots.txt for the storefront
+
+Product URLs are split into shards by primary-key range, so a product always
+lives in the same shard and each shard holds at most SITEMAP_SHARD_SIZE URLs.
+Every shard is streamed from the database in chunks and written to a cache
+file as it goes; the file name carries a fingerprint of the shard's rows, so
+only shards whose products changed are regenerated.
+"""
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from .db_routers import replica_reads
+from .models import Category, Subcategory, Product
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+STREAM_CHUNK = 1000
+
+# Storefront pages that are not backed by catalogue rows
+STATIC_PAGES = [
+    ('/', 'daily', '1.0'),
+    ('/products', 'daily', '0.9'),
+    ('/technology', 'monthly', '0.8'),
+]
+
+
+def _frontend_url(path):
+    return f'{settings.FRONTEND_BASE_URL.rstrip("/")}{path}'
+
+
+def _lastmod(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%S+00:00') if value else None
+
+
+def _url_entry(loc, lastmod=None, changefreq=None, priority=None):
+    parts = [f'  <url>\n    <loc>{escape(loc)}</loc>\n']
+    if lastmod:
+        parts.append(f'    <lastmod>{lastmod}</lastmod>\n')
+    if changefreq:
+        parts.append(f'    <changefreq>{changefreq}</changefreq>\n')
+    if priority:
+        parts.append(f'    <priority>{priority}</priority>\n')
+    parts.append('  </url>\n')
+    return ''.join(parts)
+
+
+def _shard_products(shard):
+    size = settings.SITEMAP_SHARD_SIZE
+    return Product.objects.filter(
+        is_active=True,
+        pk__gt=shard * size,
+        pk__lte=(shard + 1) * size
+    )
+
+
+def _fingerprint(queryset):
+    stats = queryset.order_by().aggregate(count=Count('pk'), updated=Max('updated_at'))
+    updated = stats['updated'].strftime('%Y%m%d%H%M%S%f') if stats['updated'] else '0'
+    return f'{stats["count"]}-{updated}'
+
+
+def _pages_rows():
+    for path, changefreq, priority in STATIC_PAGES:
+        yield _url_entry(_frontend_url(path), changefreq=changefreq, priority=priority)
+    for slug, updated_at in Category.objects.filter(is_active=True).values_list('slug', 'updated_at'):
+        yield _url_entry(_frontend_url(f'/category/{slug}'), _lastmod(updated_at), 'weekly', '0.8')
+    for slug, updated_at in Subcategory.objects.filter(is_active=True).values_list('slug', 'updated_at'):
+        yield _url_entry(_frontend_url(f'/subcategory/{slug}'), _lastmod(updated_at), 'weekly', '0.7')
+
+
+def _product_rows(shard):
+    rows = _shard_products(shard).order_by('pk').values_list('slug', 'updated_at')
+    for slug, updated_at in rows.iterator(chunk_size=STREAM_CHUNK):
+        yield _url_entry(_frontend_url(f'/products/{slug}'), _lastmod(updated_at), 'weekly', '0.6')
+
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= STREAM_CHUNK:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _cached_or_streamed(name, fingerprint, rows):
+    """Serve a sitemap from its cache file, or stream it while writing the cache"""
+    cache_dir = settings.SITEMAP_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f'{name}.{fingerprint}.xml')
+    if os.path.exists(cache_path):
+        return FileResponse(open(cache_path, 'rb'), content_type='application/xml')
+
+    def generate():
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f'{name}.', suffix='.tmp')
+        completed = False
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+                for chunk in [XML_HEADER + URLSET_OPEN], _batched(rows), [URLSET_CLOSE]:
+                    for piece in chunk:
+                        cache_file.write(piece)
+                        yield piece
+            os.replace(tmp_path, cache_path)
+            completed = True
+            # Drop older versions of this shard
+            for entry in os.listdir(cache_dir):
+                if entry.startswith(f'{name}.') and entry.endswith('.xml') and entry != os.path.basename(cache_path):
+                    os.remove(os.path.join(cache_dir, entry))
+        finally:
+            if not completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return StreamingHttpResponse(generate(), content_type='application/xml')
+
+
+@require_GET
+def sitemap_index(request):
+    """Sitemap index listing the pages sitemap and one sitemap per product shard"""
+    size = settings.SITEMAP_SHARD_SIZE
+    with replica_reads():
+        shards = list(
+            Product.objects.filter(is_active=True).order_by().annotate(
+                shard=ExpressionWrapper((F('pk') - 1) / size, output_field=IntegerField())
+            ).values('shard').annotate(updated=Max('updated_at')).values_list('shard', 'updated').order_by('shard')
+        )
+        pages_updated = max(
+            [updated for updated in (
+                Category.objects.aggregate(updated=Max('updated_at'))['updated'],
+                Subcategory.objects.aggregate(updated=Max('updated_at'))['updated'],
+            ) if updated],
+            default=None
+        )
+
+    entries = [(reverse('sitemap-pages'), pages_updated)]
+    for shard, updated in shards:
+        entries.append((reverse('sitemap-products', args=[shard]), updated))
+
+    lines = [XML_HEADER, '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+    for path, updated in entries:
+        lines.append(f'  <sitemap>\n    <loc>{escape(request.build_absolute_uri(path))}</loc>\n')
+        if updated:
+            lines.append(f'    <lastmod>{_lastmod(updated)}</lastmod>\n')
+        lines.append('  </sitemap>\n')
+    lines.append('</sitemapindex>\n')
+    return HttpResponse(''.join(lines), content_type='application/xml')
+
+
+@require_GET
+def sitemap_pages(request):
+    """Static storefront pages, categories and subcategories"""
+    with replica_reads():
+        fingerprint = f'{_fingerprint(Category.objects.all())}-{_fingerprint(Subcategory.objects.all())}'
+    return _cached_or_streamed('pages', fingerprint, _replica_rows(_pages_rows()))
+
+
+@require_GET
+def sitemap_products(request, shard):
+    """Products whose primary key falls in the shard's range"""
+    with replica_reads():
+        queryset = _shard_products(shard)
+        fingerprint = _fingerprint(queryset)
+    if fingerprint.startswith('0-'):
+        raise Http404('Empty sitemap shard')
+    return _cached_or_streamed(f'products-{shard}', fingerprint, _replica_rows(_product_rows(shard)))
+
+
+def _replica_rows(rows):
+    # Streaming runs after the view returns, outside its replica_reads() block
+    with replica_reads():
+        yield from rows
+
+
+@require_GET
+def robots_txt(request):
+    lines = [
+        'User-agent: *',
+        'Allow: /',
+        'Disallow: /admin',
+        'Disallow: /api/',
+        '',
+        f'Sitemap: {request.build_absolute_uri(reverse("sitemap-index"))}',
+        '',
+    ]
+    return HttpResponse('\n'.join(lines), content_type='text/plain')
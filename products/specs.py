@@ -0,0 +1,139 @@
+"""Filterable product specifications
+
+Product.specifications is free-form JSON, which SQLite can only filter by
+scanning every row. Each scalar entry (and each item of a list) is copied to
+ProductSpec, indexed by (key, value) and (key, number), whenever a product
+is saved, and ?spec.<key>= filters go through that table instead.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Product, ProductSpec
+
+SPEC_PARAM_PREFIX = 'spec.'
+RANGE_LOOKUPS = ('gte', 'lte', 'gt', 'lt')
+FACET_VALUES_LIMIT = 50
+
+
+def normalize_key(key):
+    return re.sub(r'[^a-z0-9]+', '_', str(key).lower()).strip('_')[:100]
+
+
+def normalize_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).strip().lower()[:255]
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    if not number.is_finite() or abs(number) >= Decimal('1e14'):
+        return None
+    return number.quantize(Decimal('0.0001'))
+
+
+def spec_rows(specifications):
+    """(key, label, value, value_normalized, value_number) rows for a specifications dict"""
+    rows = set()
+    if not isinstance(specifications, dict):
+        return rows
+    for label, raw in specifications.items():
+        key = normalize_key(label)
+        if not key:
+            continue
+        for value in (raw if isinstance(raw, list) else [raw]):
+            # Nested objects and nulls are not filterable
+            if value is None or isinstance(value, (dict, list)):
+                continue
+            display = ('Yes' if value else 'No') if isinstance(value, bool) else str(value)[:255]
+            rows.add((key, str(label)[:100], display, normalize_value(value), _as_number(value)))
+    return rows
+
+
+def sync_product_specs(product):
+    """Rewrite a product's spec rows when its specifications changed"""
+    wanted = spec_rows(product.specifications)
+    existing = set(
+        ProductSpec.objects.filter(product=product)
+        .values_list('key', 'label', 'value', 'value_normalized', 'value_number')
+    )
+    if wanted == existing:
+        return False
+    with transaction.atomic():
+        ProductSpec.objects.filter(product=product).delete()
+        ProductSpec.objects.bulk_create([
+            ProductSpec(product=product, key=key, label=label, value=value,
+                        value_normalized=normalized, value_number=number)
+            for key, label, value, normalized, number in wanted
+        ])
+    return True
+
+
+def rebuild_spec_index(chunk_size=500):
+    """Resync every product's spec rows; returns the number of products changed"""
+    changed = 0
+    products = Product.objects.order_by('pk').only('pk', 'specifications')
+    for product in products.iterator(chunk_size=chunk_size):
+        changed += sync_product_specs(product)
+    return changed
+
+
+def _spec_filter(name, raw):
+    key, _, lookup = name[len(SPEC_PARAM_PREFIX):].partition('__')
+    key = normalize_key(key)
+    if not key:
+        raise ValidationError({name: 'Unknown specification.'})
+    if lookup:
+        if lookup not in RANGE_LOOKUPS:
+            raise ValidationError({name: f'Use one of: {", ".join(RANGE_LOOKUPS)}.'})
+        number = _as_number(raw)
+        if number is None:
+            raise ValidationError({name: 'Must be a number.'})
+        return Q(key=key, **{f'value_number__{lookup}': number})
+    # Comma-separated values match any of them
+    values = [normalize_value(value) for value in raw.split(',') if value.strip()]
+    return Q(key=key, value_normalized__in=values)
+
+
+def filter_specifications(queryset, params):
+    """Apply ?spec.<key>=a,b and ?spec.<key>__gte=n filters; every spec must match"""
+    for name in params:
+        if not name.startswith(SPEC_PARAM_PREFIX):
+            continue
+        for raw in params.getlist(name):
+            condition = _spec_filter(name, raw)
+            queryset = queryset.filter(
+                pk__in=ProductSpec.objects.filter(condition).values('product_id')
+            )
+    return queryset
+
+
+def spec_facets(queryset):
+    """Available keys with value counts and numeric ranges for products in `queryset`"""
+    specs = ProductSpec.objects.filter(product__in=queryset.order_by().values('pk'))
+    facets = {}
+    value_rows = specs.order_by().values('key', 'value_normalized').annotate(
+        count=Count('product_id', distinct=True), shown_label=Max('label'), shown_value=Max('value')
+    ).order_by('key', '-count', 'value_normalized')
+    for row in value_rows:
+        facet = facets.setdefault(row['key'], {'key': row['key'], 'label': row['shown_label'], 'values': []})
+        if len(facet['values']) < FACET_VALUES_LIMIT:
+            facet['values'].append({'value': row['shown_value'], 'count': row['count']})
+
+    ranges = specs.filter(value_number__isnull=False).order_by().values('key').annotate(
+        min=Min('value_number'), max=Max('value_number')
+    )
+    for row in ranges:
+        if row['key'] in facets:
+            facets[row['key']]['min'] = row['min']
+            facets[row['key']]['max'] = row['max']
+    return list(facets.values())
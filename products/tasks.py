@@ -0,0 +1,58 @@
+"""Built-in background job tasks; enqueue them with products.jobs.enqueue"""
+from .archive import archive_products, archive_reviews
+from .columnar import engine_enabled, refresh_snapshot
+from .inventory import release_expired_reservations
+from .jobs import task
+from .outbox import DEFAULT_CONSUMER, process_outbox
+from .popularity import schedule_popularity_update, update_popularity
+from .pricing import apply_due_price_changes, schedule_price_changes
+from .replicas import refresh_replicas
+from .search import rebuild_search_index, search_index_available
+from .trigrams import rebuild_trigram_index
+
+
+@task('products.refresh_replicas')
+def refresh_replicas_task():
+    refresh_replicas()
+
+
+@task('products.process_outbox')
+def process_outbox_task(consumer=DEFAULT_CONSUMER, batch_size=500):
+    process_outbox(consumer, batch_size=batch_size)
+
+
+@task('products.release_expired_reservations')
+def release_expired_reservations_task(batch_size=500):
+    release_expired_reservations(batch_size=batch_size)
+
+
+@task('products.rebuild_search_index')
+def rebuild_search_index_task():
+    if search_index_available():
+        rebuild_search_index()
+        rebuild_trigram_index()
+
+
+@task('products.update_popularity')
+def update_popularity_task():
+    update_popularity()
+    # Scores decay daily even without new views
+    schedule_popularity_update()
+
+
+@task('products.refresh_columnar_snapshot')
+def refresh_columnar_snapshot_task():
+    if engine_enabled():
+        refresh_snapshot()
+
+
+@task('products.apply_price_changes')
+def apply_price_changes_task():
+    apply_due_price_changes()
+    schedule_price_changes()
+
+
+@task('products.archive_catalogue')
+def archive_catalogue_task(batch_size=200):
+    archive_products(batch_size=batch_size)
+    archive_reviews(batch_size=batch_size)
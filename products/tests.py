@@ -1,3 +1,596 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .archive import archive_products, archive_reviews, restore_products, restore_reviews
+from .inventory import release_expired_reservations, release_reservation, reserve_stock
+from .pricing import apply_due_price_changes, forget_next_price_change, next_price_change
+from .throttling import BUCKET_IDLE_SECONDS, TokenBucketStore, get_bucket_store
+from .trigrams import fuzzy_search
+from .models import (
+    ArchivedProduct, ArchivedReview, Category, InventorySyncBatch, Product, ProductImage, ProductListing,
+    ProductReview, ProductTombstone, StockReservation, Subcategory
+)
+
+
+def create_product(name='Oak Dining Table', **fields):
+    category, _ = Category.objects.get_or_create(name='Dining')
+    subcategory, _ = Subcategory.objects.get_or_create(category=category, name='Tables')
+    fields.setdefault('price', Decimal('500.00'))
+    fields.setdefault('stock_quantity', 10)
+    return Product.objects.create(
+        name=name, category=category, subcategory=subcategory, description=f'{name} description', **fields
+    )
+
+
+class InventorySyncTests(TestCase):
+    """POST /api/inventory/sync/"""
+    url = '/api/inventory/sync/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('pos', is_staff=True))
+        self.table = create_product('Oak Dining Table', sku='TABLE-1')
+        self.chair = create_product('Oak Dining Chair', sku='CHAIR-1', stock_quantity=4)
+
+    def sync(self, batch_id, items, **data):
+        return self.client.post(self.url, {'batch_id': batch_id, 'items': items, **data}, format='json')
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(User.objects.create_user('shopper'))
+        response = self.sync('b1', [{'sku': 'TABLE-1', 'stock_quantity': 3}])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_absolute_mode_sets_values(self):
+        response = self.sync('b1', [
+            {'sku': 'TABLE-1', 'stock_quantity': 3, 'price': '450.00'},
+            {'sku': 'CHAIR-1', 'stock_quantity': 4},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['replayed'])
+        self.assertEqual(response.data['summary'], {'updated': 1, 'unchanged': 1, 'not_found': 0, 'rejected': 0})
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.stock_quantity, 3)
+        self.assertEqual(self.table.price, Decimal('450.00'))
+        self.assertEqual(response.data['results'][0]['changed'], ['price', 'stock_quantity'])
+
+    def test_delta_mode_adds_to_current_values(self):
+        response = self.sync('b1', [{'sku': 'TABLE-1', 'stock_quantity': -4}, {'sku': 'CHAIR-1', 'stock_quantity': 6}],
+                             mode='delta')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.table.refresh_from_db()
+        self.chair.refresh_from_db()
+        self.assertEqual(self.table.stock_quantity, 6)
+        self.assertEqual(self.chair.stock_quantity, 10)
+
+    def test_item_mode_overrides_batch_mode(self):
+        self.sync('b1', [{'sku': 'TABLE-1', 'stock_quantity': 2, 'mode': 'delta'}, {'sku': 'CHAIR-1', 'stock_quantity': 2}])
+        self.table.refresh_from_db()
+        self.chair.refresh_from_db()
+        self.assertEqual(self.table.stock_quantity, 12)
+        self.assertEqual(self.chair.stock_quantity, 2)
+
+    def test_unknown_sku_is_reported_and_others_applied(self):
+        response = self.sync('b1', [{'sku': 'MISSING', 'stock_quantity': 1}, {'sku': 'TABLE-1', 'stock_quantity': 1}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0], {'sku': 'MISSING', 'status': 'not_found'})
+        self.assertEqual(response.data['summary']['not_found'], 1)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.stock_quantity, 1)
+
+    def test_invalid_item_is_rejected_without_partial_write(self):
+        response = self.sync('b1', [{'sku': 'CHAIR-1', 'stock_quantity': -5, 'price': '1.00'}], mode='delta')
+        self.assertEqual(response.data['results'][0]['status'], 'rejected')
+        self.assertIn('stock_quantity cannot go below zero', response.data['results'][0]['errors'])
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock_quantity, 4)
+        self.assertEqual(self.chair.price, Decimal('500.00'))
+
+    def test_replayed_batch_returns_stored_result_without_applying_again(self):
+        items = [{'sku': 'TABLE-1', 'stock_quantity': -2}]
+        first = self.sync('b1', items, mode='delta')
+        second = self.sync('b1', items, mode='delta')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertTrue(second.data['replayed'])
+        self.assertEqual(second.data['results'], first.data['results'])
+        self.assertEqual(second.data['applied_at'], first.data['applied_at'])
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.stock_quantity, 8)
+        self.assertEqual(InventorySyncBatch.objects.count(), 1)
+
+    def test_reused_batch_id_with_different_payload_conflicts(self):
+        self.sync('b1', [{'sku': 'TABLE-1', 'stock_quantity': 2}])
+        response = self.sync('b1', [{'sku': 'TABLE-1', 'stock_quantity': 7}])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.stock_quantity, 2)
+
+    def test_sync_moves_product_to_head_of_change_feed(self):
+        before = self.table.change_seq
+        self.sync('b1', [{'sku': 'TABLE-1', 'stock_quantity': 2}])
+        self.table.refresh_from_db()
+        self.assertGreater(self.table.change_seq, before)
+
+
+class StockReservationTests(TestCase):
+    """/api/reservations/ and expiry of lapsed holds"""
+    url = '/api/reservations/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shopper = User.objects.create_user('shopper')
+        self.client.force_authenticate(self.shopper)
+        self.product = create_product(stock_quantity=3)
+
+    def reserve(self, quantity, **data):
+        return self.client.post(self.url, {'product': self.product.slug, 'quantity': quantity, **data}, format='json')
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock_quantity
+
+    def test_reserve_deducts_stock(self):
+        response = self.reserve(2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], StockReservation.STATUS_ACTIVE)
+        self.assertEqual(self.stock(), 1)
+
+    def test_oversell_is_refused(self):
+        self.reserve(2)
+        response = self.reserve(2)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.stock(), 1)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_release_returns_stock_once(self):
+        token = self.reserve(2).data['token']
+        first = self.client.post(f'{self.url}{token}/release/')
+        second = self.client.post(f'{self.url}{token}/release/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['status'], StockReservation.STATUS_RELEASED)
+        self.assertEqual(second.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.stock(), 3)
+
+    def test_committed_reservation_keeps_stock_and_cannot_be_released(self):
+        token = self.reserve(2).data['token']
+        self.assertEqual(self.client.post(f'{self.url}{token}/commit/').status_code, status.HTTP_200_OK)
+        response = self.client.post(f'{self.url}{token}/release/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.stock(), 1)
+
+    def test_expired_reservations_return_stock(self):
+        self.reserve(1, ttl_seconds=60)
+        self.reserve(2, ttl_seconds=600)
+        self.assertEqual(self.stock(), 0)
+
+        released = release_expired_reservations(now=timezone.now() + timedelta(seconds=120))
+        self.assertEqual(released, 1)
+        self.assertEqual(self.stock(), 1)
+        self.assertEqual(
+            sorted(StockReservation.objects.values_list('status', flat=True)),
+            [StockReservation.STATUS_ACTIVE, StockReservation.STATUS_EXPIRED]
+        )
+        self.assertEqual(release_expired_reservations(now=timezone.now() + timedelta(seconds=120)), 0)
+        self.assertEqual(self.stock(), 1)
+
+    def test_reservations_are_scoped_to_their_user(self):
+        token = self.reserve(2).data['token']
+        self.assertEqual(StockReservation.objects.get(token=token).user, self.shopper)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other'))
+        self.assertEqual(other.get(f'{self.url}{token}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(other.post(f'{self.url}{token}/release/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.stock(), 1)
+        self.assertEqual(self.client.get(f'{self.url}{token}/').status_code, status.HTTP_200_OK)
+
+    def test_expired_reservation_cannot_be_committed(self):
+        token = self.reserve(1).data['token']
+        StockReservation.objects.filter(token=token).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client.post(f'{self.url}{token}/commit/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+
+class ChangeFeedTests(TestCase):
+    """GET /api/products/changes/"""
+    url = '/api/products/changes/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.table = create_product('Oak Dining Table')
+        self.chair = create_product('Oak Dining Chair')
+        self.bench = create_product('Oak Dining Bench')
+
+    def changes(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def head(self):
+        """Token at the current end of the feed"""
+        data = self.changes(limit=500)
+        while data['has_more']:
+            data = self.changes(data['next_token'], limit=500)
+        return data['next_token']
+
+    def upserted(self, data):
+        return [entry['product']['id'] for entry in data['results'] if entry['type'] == 'upsert']
+
+    def test_pages_follow_change_order(self):
+        first = self.changes(limit=2)
+        self.assertTrue(first['has_more'])
+        self.assertEqual(self.upserted(first), [self.table.pk, self.chair.pk])
+
+        second = self.changes(first['next_token'], limit=2)
+        self.assertFalse(second['has_more'])
+        self.assertEqual(self.upserted(second), [self.bench.pk])
+
+        # Nothing new: the same token comes back with an empty page
+        third = self.changes(second['next_token'])
+        self.assertEqual(third['results'], [])
+        self.assertEqual(third['next_token'], second['next_token'])
+
+    def test_updated_product_moves_to_head(self):
+        token = self.head()
+        self.table.name = 'Walnut Dining Table'
+        self.table.save()
+        data = self.changes(token)
+        self.assertEqual(self.upserted(data), [self.table.pk])
+        self.assertEqual(data['results'][0]['product']['name'], 'Walnut Dining Table')
+
+    def test_products_sharing_a_sequence_are_paged_by_id(self):
+        token = self.head()
+        Product.objects.filter(pk__in=[self.table.pk, self.chair.pk, self.bench.pk]).update(change_seq=10 ** 6)
+        first = self.changes(token, limit=2)
+        second = self.changes(first['next_token'], limit=2)
+        self.assertEqual(self.upserted(first) + self.upserted(second), [self.table.pk, self.chair.pk, self.bench.pk])
+
+    def test_deleted_product_leaves_tombstone(self):
+        token = self.head()
+        pk, slug = self.chair.pk, self.chair.slug
+        self.chair.delete()
+        data = self.changes(token)
+        self.assertEqual(data['results'], [{'type': 'delete', 'id': pk, 'slug': slug}])
+
+    def test_deactivated_product_is_reported_as_deleted(self):
+        token = self.head()
+        self.bench.is_active = False
+        self.bench.save()
+        data = self.changes(token)
+        self.assertEqual(data['results'], [{'type': 'delete', 'id': self.bench.pk, 'slug': self.bench.slug}])
+
+    def test_image_write_bumps_parent(self):
+        token = self.head()
+        image = ProductImage.objects.create(product=self.chair, image='products/chair.jpg', is_primary=True)
+        self.assertEqual(self.upserted(self.changes(token)), [self.chair.pk])
+
+        token = self.head()
+        image.delete()
+        self.assertEqual(self.upserted(self.changes(token)), [self.chair.pk])
+
+    def test_approved_review_bumps_parent(self):
+        token = self.head()
+        ProductReview.objects.create(
+            product=self.table, customer_name='Sita', email='sita@example.com', rating=4,
+            title='Sturdy', comment='Solid build', is_approved=True
+        )
+        data = self.changes(token)
+        self.assertEqual(self.upserted(data), [self.table.pk])
+        self.assertEqual(data['results'][0]['product']['review_count'], 1)
+
+    def test_reservation_and_release_bump_stock(self):
+        token = self.head()
+        reservation = reserve_stock(self.bench, 4)
+        data = self.changes(token)
+        self.assertEqual(self.upserted(data), [self.bench.pk])
+        self.assertEqual(data['results'][0]['product']['stock_quantity'], 6)
+
+        reservation.expires_at = timezone.now() - timedelta(seconds=1)
+        reservation.save()
+        release_expired_reservations()
+        data = self.changes(data['next_token'])
+        self.assertEqual(self.upserted(data), [self.bench.pk])
+        self.assertEqual(data['results'][0]['product']['stock_quantity'], 10)
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get(self.url, {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ThrottleTests(TestCase):
+    """Token buckets in a temporary THROTTLE_DB_PATH"""
+
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(directory, 'throttle.sqlite3')
+        self.enterContext(override_settings(THROTTLE_DB_PATH=self.path))
+        self.store = TokenBucketStore(self.path)
+
+    def keys(self):
+        return [key for key, in self.store._connection().execute('SELECT key FROM buckets ORDER BY key')]
+
+    def test_burst_then_refill(self):
+        # Capacity 3, one token every two seconds
+        takes = [self.store.take('k', 3, 0.5, now=1000) for _ in range(4)]
+        self.assertEqual([granted for granted, _ in takes], [True, True, True, False])
+        self.assertEqual(takes[2][1], 0)
+
+        self.assertEqual(self.store.take('k', 3, 0.5, now=1001), (False, 0.5))
+        self.assertEqual(self.store.take('k', 3, 0.5, now=1002), (True, 0))
+
+    def test_refill_is_capped_at_capacity(self):
+        self.store.take('k', 3, 0.5, now=1000)
+        granted, tokens = self.store.take('k', 3, 0.5, now=10 ** 6)
+        self.assertTrue(granted)
+        self.assertEqual(tokens, 2)
+
+    def test_buckets_are_per_key(self):
+        self.store.take('a', 1, 0.5, now=1000)
+        self.assertFalse(self.store.take('a', 1, 0.5, now=1000)[0])
+        self.assertTrue(self.store.take('b', 1, 0.5, now=1000)[0])
+
+    def test_exhausted_bucket_returns_429_with_retry_after(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'product_search': '2/min'}
+        client = APIClient()
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            statuses = [client.get('/api/products/search/', {'q': 'oak'}).status_code for _ in range(2)]
+            response = client.get('/api/products/search/', {'q': 'oak'})
+        self.assertNotIn(status.HTTP_429_TOO_MANY_REQUESTS, statuses)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # One token refills in 30 seconds
+        self.assertTrue(1 <= int(response['Retry-After']) <= 30)
+        self.assertEqual(get_bucket_store().path, self.path)
+
+    def test_take_occasionally_purges_idle_buckets(self):
+        self.store.take('idle', 3, 0.5, now=1000)
+        self.store.take('recent', 3, 0.5, now=1000 + BUCKET_IDLE_SECONDS)
+        self.assertEqual(self.keys(), ['idle', 'recent'])
+
+        with mock.patch('products.throttling.random.randrange', return_value=0):
+            self.store.take('new', 3, 0.5, now=1001 + BUCKET_IDLE_SECONDS)
+        self.assertEqual(self.keys(), ['new', 'recent'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SalePricingTests(TestCase):
+    """Sale windows applied by apply_due_price_changes and the cache lifetimes they cap"""
+
+    def setUp(self):
+        forget_next_price_change()
+        self.now = timezone.now()
+        self.starts = self.now + timedelta(hours=1)
+        self.ends = self.now + timedelta(hours=2)
+        self.product = create_product(sale_price=Decimal('400.00'), sale_starts_at=self.starts, sale_ends_at=self.ends)
+
+    def test_window_opens_and_closes(self):
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.sale_active)
+        self.assertEqual(self.product.effective_price, Decimal('500.00'))
+        self.assertEqual(self.product.next_price_change_at, self.starts)
+        change_seq = self.product.change_seq
+
+        self.assertEqual(apply_due_price_changes(now=self.starts + timedelta(seconds=1)), 1)
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.sale_active)
+        self.assertEqual(self.product.effective_price, Decimal('400.00'))
+        self.assertEqual(self.product.discount_percent, 20)
+        self.assertEqual(self.product.next_price_change_at, self.ends)
+        self.assertGreater(self.product.change_seq, change_seq)
+
+        self.assertEqual(apply_due_price_changes(now=self.ends + timedelta(seconds=1)), 1)
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.sale_active)
+        self.assertEqual(self.product.effective_price, Decimal('500.00'))
+        self.assertIsNone(self.product.next_price_change_at)
+        self.assertEqual(apply_due_price_changes(now=self.ends + timedelta(seconds=2)), 0)
+
+    def test_next_change_is_cached_until_forgotten(self):
+        self.assertEqual(next_price_change(), self.starts)
+        sooner = self.now + timedelta(minutes=10)
+        Product.objects.filter(pk=self.product.pk).update(sale_starts_at=sooner, next_price_change_at=sooner)
+        with self.assertNumQueries(0):
+            self.assertEqual(next_price_change(), self.starts)
+
+        forget_next_price_change()
+        self.assertEqual(next_price_change(), sooner)
+
+    def test_applying_changes_forgets_the_cached_boundary(self):
+        self.assertEqual(next_price_change(), self.starts)
+        apply_due_price_changes(now=self.starts + timedelta(seconds=1))
+        self.assertEqual(next_price_change(), self.ends)
+
+    def max_age(self, response):
+        directives = dict(
+            part.strip().partition('=')[::2] for part in response.get('Cache-Control', '').split(',') if part
+        )
+        return int(directives['max-age']) if 'max-age' in directives else None
+
+    def test_list_max_age_is_capped_at_the_next_change(self):
+        client = APIClient()
+        self.assertEqual(self.max_age(client.get('/api/products/')), settings.PRODUCT_CACHE_MAX_AGE)
+
+        soon = timezone.now() + timedelta(seconds=60)
+        self.product.sale_starts_at = soon
+        self.product.save()
+        forget_next_price_change()
+        self.assertTrue(50 <= self.max_age(client.get('/api/products/')) <= 60)
+
+    def test_stock_dependent_responses_have_no_max_age(self):
+        client = APIClient()
+        with mock.patch('products.views.record_view'):
+            detail = client.get(f'/api/products/{self.product.slug}/')
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertIsNone(self.max_age(detail))
+        self.assertIsNone(self.max_age(client.get('/api/products/', {'in_stock': 'true'})))
+
+
+class ListingTriggerTests(TestCase):
+    """ProductListing rows kept current by the SQLite triggers"""
+
+    def setUp(self):
+        self.product = create_product()
+
+    def listing(self):
+        return ProductListing.objects.get(product=self.product)
+
+    def test_product_rename_and_queryset_update_are_followed(self):
+        self.product.name = 'Walnut Dining Table'
+        self.product.save()
+        self.assertEqual(self.listing().name, 'Walnut Dining Table')
+
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('450.00'))
+        self.assertEqual(self.listing().effective_price, Decimal('450.00'))
+
+    def test_category_and_subcategory_renames_are_followed(self):
+        category = self.product.category
+        category.name = 'Dining Room'
+        category.slug = 'dining-room'
+        category.save()
+        Subcategory.objects.filter(pk=self.product.subcategory_id).update(name='Dining Tables', slug='dining-tables')
+
+        listing = self.listing()
+        self.assertEqual((listing.category_name, listing.category_slug), ('Dining Room', 'dining-room'))
+        self.assertEqual((listing.subcategory_name, listing.subcategory_slug), ('Dining Tables', 'dining-tables'))
+
+    def test_deactivated_products_leave_the_listing(self):
+        self.product.is_active = False
+        self.product.save()
+        self.assertFalse(ProductListing.objects.filter(product=self.product).exists())
+
+        self.product.is_active = True
+        self.product.save()
+        self.assertEqual(self.listing().name, self.product.name)
+
+    def test_approved_reviews_update_the_stats(self):
+        ProductReview.objects.create(
+            product=self.product, customer_name='Asha', email='asha@example.com', rating=4,
+            title='Sturdy', comment='Solid table', is_approved=True
+        )
+        ProductReview.objects.create(
+            product=self.product, customer_name='Ravi', email='ravi@example.com', rating=2,
+            title='Wobbly', comment='Not level', is_approved=False
+        )
+        listing = self.listing()
+        self.assertEqual((listing.review_count, listing.average_rating), (1, 4.0))
+
+
+class FuzzySearchTests(TestCase):
+    """Trigram fallback for searches with no exact match"""
+    url = '/api/products/search/'
+
+    def setUp(self):
+        # The search endpoint is throttled; keep its buckets out of the real store
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(THROTTLE_DB_PATH=os.path.join(directory, 'throttle.sqlite3')))
+        self.table = create_product('Oak Dining Table')
+        self.sofa = create_product('Leather Sofa')
+
+    def test_misspelt_query_suggests_the_closest_words(self):
+        ids, suggestion = fuzzy_search('dinning tabel')
+        # Both products are in Dining > Tables; the table's own name is the closer match
+        self.assertEqual(ids, [self.table.pk, self.sofa.pk])
+        self.assertEqual(suggestion, 'dining table')
+
+    def test_search_returns_did_you_mean(self):
+        response = APIClient().get(self.url, {'q': 'lether sofa'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['did_you_mean'], 'leather sofa')
+        self.assertEqual([product['id'] for product in response.data['results']], [self.sofa.pk])
+
+    def test_exact_match_has_no_suggestion(self):
+        response = APIClient().get(self.url, {'q': 'sofa'})
+        self.assertIsNone(response.data['did_you_mean'])
+        self.assertEqual([product['id'] for product in response.data['results']], [self.sofa.pk])
+
+
+class ArchiveTests(TestCase):
+    """archive_products/archive_reviews and the restores that undo them"""
+
+    def setUp(self):
+        self.long_ago = timezone.now() - timedelta(days=365)
+        self.shopper = User.objects.create_user('shopper')
+        self.product = create_product(is_active=False)
+        self.image = ProductImage.objects.create(product=self.product, image='products/table.jpg', is_primary=True)
+        self.review = ProductReview.objects.create(
+            product=self.product, customer_name='Asha', email='asha@example.com', rating=5,
+            title='Lovely', comment='Lovely table', is_approved=True
+        )
+
+    def age(self):
+        Product.objects.filter(pk=self.product.pk).update(updated_at=self.long_ago)
+
+    def test_product_round_trip_keeps_ids_and_related_rows(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=True)
+        reservation = reserve_stock(self.product, 1, user=self.shopper)
+        release_reservation(reservation)
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.age()
+
+        self.assertEqual(archive_products(), 1)
+        self.assertFalse(Product.objects.filter(pk=self.product.pk).exists())
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertTrue(ProductTombstone.objects.filter(product_id=self.product.pk).exists())
+        archived = ArchivedProduct.objects.get(product_id=self.product.pk)
+        self.assertEqual((len(archived.images), len(archived.reviews), len(archived.reservations)), (1, 1, 1))
+
+        self.assertEqual(restore_products(ArchivedProduct.objects.all()), (1, []))
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertFalse(product.is_active)
+        self.assertEqual(product.slug, self.product.slug)
+        self.assertTrue(ProductImage.objects.filter(pk=self.image.pk, product=product).exists())
+        self.assertTrue(ProductReview.objects.filter(pk=self.review.pk, is_approved=True).exists())
+        restored = StockReservation.objects.get(pk=reservation.pk)
+        self.assertEqual((restored.user, restored.status), (self.shopper, StockReservation.STATUS_RELEASED))
+        self.assertFalse(ArchivedProduct.objects.exists())
+        # Restored with a fresh updated_at, so the next run leaves it alone
+        self.assertEqual(archive_products(), 0)
+
+    def test_restore_clears_deleted_reservation_users(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=True)
+        release_reservation(reserve_stock(self.product, 1, user=self.shopper))
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.age()
+        archive_products()
+        self.shopper.delete()
+
+        self.assertEqual(restore_products(ArchivedProduct.objects.all()), (1, []))
+        self.assertIsNone(StockReservation.objects.get().user)
+
+    def test_recent_or_reserved_products_stay(self):
+        self.assertEqual(archive_products(), 0)
+
+        Product.objects.filter(pk=self.product.pk).update(is_active=True)
+        reserve_stock(self.product, 1)
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.age()
+        self.assertEqual(archive_products(), 0)
+
+    def test_restore_refuses_a_taken_slug(self):
+        self.age()
+        archive_products()
+        create_product(slug=self.product.slug, sku='OTHER-1')
+
+        restored, errors = restore_products(ArchivedProduct.objects.all())
+        self.assertEqual((restored, len(errors)), (0, 1))
+        self.assertTrue(ArchivedProduct.objects.exists())
+
+    def test_review_round_trip(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=True)
+        ProductReview.objects.filter(pk=self.review.pk).update(is_approved=False, created_at=self.long_ago)
+
+        self.assertEqual(archive_reviews(), 1)
+        self.assertFalse(ProductReview.objects.filter(pk=self.review.pk).exists())
+        self.assertEqual(restore_reviews(ArchivedReview.objects.all(), approve=True), (1, []))
+        self.assertTrue(ProductReview.objects.filter(pk=self.review.pk, is_approved=True).exists())
+        self.assertFalse(ArchivedReview.objects.exists())
@@ -0,0 +1,132 @@
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# A single UPSERT refills the bucket, takes a token if one is available and
+# records whether it did, so concurrent workers never race on read-modify-write
+_TAKE_TOKEN_SQL = '''
+INSERT INTO buckets (key, tokens, updated, granted) VALUES (?1, ?2 - 1, ?3, 1)
+ON CONFLICT (key) DO UPDATE SET
+    granted = min(?2, tokens + (?3 - updated) * ?4) >= 1,
+    tokens = min(?2, tokens + (?3 - updated) * ?4)
+             - (min(?2, tokens + (?3 - updated) * ?4) >= 1),
+    updated = ?3
+RETURNING tokens, granted
+'''
+
+# A bucket left alone for a full period is back at capacity, the same as a
+# missing one, so buckets idle longer than the longest period ('d') can go.
+# Roughly one take() in PURGE_EVERY does the sweep.
+BUCKET_IDLE_SECONDS = 86400
+PURGE_EVERY = 1000
+
+
+class TokenBucketStore:
+    """Token buckets kept in a small SQLite file shared by every worker process"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            # Counters are disposable: favour latency over durability
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL, granted INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, refill_rate, now=None):
+        """Take one token from the bucket; return (granted, tokens left)"""
+        now = time.time() if now is None else now
+        tokens, granted = self._connection().execute(
+            _TAKE_TOKEN_SQL, (key, capacity, now, refill_rate)
+        ).fetchone()
+        if random.randrange(PURGE_EVERY) == 0:
+            self.purge(BUCKET_IDLE_SECONDS, now)
+        return bool(granted), tokens
+
+    def purge(self, older_than, now=None):
+        """Drop buckets idle for longer than `older_than` seconds"""
+        now = time.time() if now is None else now
+        self._connection().execute('DELETE FROM buckets WHERE updated < ?', (now - older_than,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    path = str(settings.THROTTLE_DB_PATH)
+    # Reopened when the path changes, such as under override_settings
+    if _store is None or _store.path != path:
+        with _store_lock:
+            if _store is None or _store.path != path:
+                _store = TokenBucketStore(path)
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token-bucket throttle keyed by user (or client IP) and scope
+
+    The rate for a scope comes from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] in
+    the usual 'num/period' form: `num` is the burst size and the bucket refills
+    at num/period tokens per second.
+    """
+    scope = None
+    durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self):
+        self.capacity, self.refill_rate = self.parse_rate(self.get_rate())
+        self.tokens = None
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def parse_rate(self, rate):
+        if rate is None:
+            return None, None
+        num, period = rate.split('/')
+        capacity = int(num)
+        return capacity, capacity / self.durations[period[0]]
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if self.capacity is None:
+            return True
+        granted, self.tokens = get_bucket_store().take(
+            self.get_cache_key(request, view), self.capacity, self.refill_rate
+        )
+        return granted
+
+    def wait(self):
+        if self.tokens is None or not self.refill_rate:
+            return None
+        return max(1 - self.tokens, 0) / self.refill_rate
+
+
+class ReviewCreateThrottle(TokenBucketThrottle):
+    scope = 'review_create'
+
+
+class ProductSearchThrottle(TokenBucketThrottle):
+    scope = 'product_search'
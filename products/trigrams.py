@@ -0,0 +1,129 @@
+"""Typo-tolerant product search over trigrams
+
+An FTS5 index with the trigram tokenizer covers the listing table's product
+name, category and subcategory names and colour. A misspelt query is split
+into trigrams and the index returns the products sharing the most of them;
+only those candidates are scored, with pg_trgm-style word similarity, so the
+work per query does not grow with the catalogue. The index is fed by
+triggers on products_productlisting, which is itself kept current by the
+catalogue triggers; both are created by migrations.
+"""
+import re
+
+from django.db import connections
+
+from .listing import LISTING_TABLE
+from .search import search_index_available
+
+TRIGRAM_TABLE = 'products_product_trigrams'
+# Share of trigrams two words need in common to count as the same word
+SIMILARITY_THRESHOLD = 0.3
+FUZZY_CANDIDATES = 200
+
+_INDEXED = ('name', 'category_name', 'subcategory_name', 'color')
+_COLUMNS = ', '.join(_INDEXED)
+
+
+def _values(prefix):
+    return ', '.join(f'{prefix}.{column}' for column in _INDEXED)
+
+
+_TRIGRAM_SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5(
+        {_COLUMNS},
+        content='{LISTING_TABLE}', content_rowid='product_id', tokenize='trigram'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TRIGRAM_TABLE}_ai AFTER INSERT ON {LISTING_TABLE} BEGIN
+        INSERT INTO {TRIGRAM_TABLE}(rowid, {_COLUMNS}) VALUES (new.product_id, {_values('new')});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TRIGRAM_TABLE}_ad AFTER DELETE ON {LISTING_TABLE} BEGIN
+        INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}, rowid, {_COLUMNS})
+        VALUES ('delete', old.product_id, {_values('old')});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TRIGRAM_TABLE}_au AFTER UPDATE OF {_COLUMNS} ON {LISTING_TABLE} BEGIN
+        INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}, rowid, {_COLUMNS})
+        VALUES ('delete', old.product_id, {_values('old')});
+        INSERT INTO {TRIGRAM_TABLE}(rowid, {_COLUMNS}) VALUES (new.product_id, {_values('new')});
+    END''',
+]
+_TRIGRAM_TRIGGERS = [f'{TRIGRAM_TABLE}_ai', f'{TRIGRAM_TABLE}_ad', f'{TRIGRAM_TABLE}_au']
+
+# Applied by migrations, see products.operations
+TRIGRAM_SQL = _TRIGRAM_SCHEMA + [f"INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}) VALUES ('rebuild')"]
+TRIGRAM_DROP_SQL = [f'DROP TRIGGER IF EXISTS {name}' for name in _TRIGRAM_TRIGGERS] + [
+    f'DROP TABLE IF EXISTS {TRIGRAM_TABLE}'
+]
+
+
+def rebuild_trigram_index(using='default'):
+    """Reindex every listing row"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}) VALUES ('rebuild')")
+
+
+def words(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def trigrams(word):
+    """Trigrams of a word padded like pg_trgm: two spaces before, one after"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Shared trigrams over all trigrams of both words, from 0 to 1"""
+    left, right = trigrams(a), trigrams(b)
+    return len(left & right) / len(left | right)
+
+
+def _match_query(query_words):
+    # Unpadded trigrams: the FTS5 tokenizer indexes substrings, not word edges
+    grams = {word[i:i + 3] for word in query_words for i in range(len(word) - 2)}
+    return ' OR '.join(f'"{gram}"' for gram in sorted(grams))
+
+
+def _candidates(query_words, using):
+    match = _match_query(query_words)
+    if not match:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, {_COLUMNS} FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH %s '
+            f'ORDER BY rank LIMIT %s',
+            [match, FUZZY_CANDIDATES]
+        )
+        return [(row[0], set(words(' '.join(value or '' for value in row[1:])))) for row in cursor.fetchall()]
+
+
+def fuzzy_search(query, using='default'):
+    """Rank products by how closely their words match a possibly misspelt query
+
+    Returns (product ids best match first, "did you mean" text or None). A
+    product matches when every query word has a similar word in its name,
+    category, subcategory or colour; the suggestion swaps each query word
+    for the closest word found among the candidates.
+    """
+    query_words = words(query)
+    if not query_words or not search_index_available(using):
+        return [], None
+
+    scored = []
+    closest = {word: (0.0, word) for word in query_words}
+    for product_id, document in _candidates(query_words, using):
+        scores = []
+        for word in query_words:
+            best, best_word = max(((similarity(word, other), other) for other in document), default=(0.0, word))
+            if best > closest[word][0]:
+                closest[word] = (best, best_word)
+            scores.append(best)
+        if min(scores) >= SIMILARITY_THRESHOLD:
+            scored.append((sum(scores) / len(scores), product_id))
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    corrected = [
+        closest[word][1] if closest[word][0] >= SIMILARITY_THRESHOLD else word
+        for word in query_words
+    ]
+    suggestion = ' '.join(corrected) if corrected != query_words else None
+    return [product_id for _, product_id in scored], suggestion
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
-from . import views
+from . import sitemaps, views
 
 # Create the main router
 router = DefaultRouter()
@@ -9,12 +9,21 @@ router.register(r'categories', views.CategoryViewSet)
 router.register(r'subcategories', views.SubcategoryViewSet)
 router.register(r'products', views.ProductViewSet)
 router.register(r'product-images', views.ProductImageViewSet)
+router.register(r'reservations', views.StockReservationViewSet)
 
 # Create nested router for product reviews
 products_router = routers.NestedDefaultRouter(router, r'products', lookup='product')
 products_router.register(r'reviews', views.ProductReviewViewSet, basename='product-reviews')
 
 urlpatterns = [
+    path('robots.txt', sitemaps.robots_txt, name='robots-txt'),
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap-index'),
+    path('sitemaps/pages.xml', sitemaps.sitemap_pages, name='sitemap-pages'),
+    path('sitemaps/products-<int:shard>.xml', sitemaps.sitemap_products, name='sitemap-products'),
+    path('api/inventory/report/', views.InventoryReportView.as_view(), name='inventory-report'),
+    path('api/inventory/sync/', views.InventorySyncView.as_view(), name='inventory-sync'),
+    path('api/home/', views.HomeView.as_view(), name='home'),
+    path('api/jobs/metrics/', views.JobQueueMetricsView.as_view(), name='job-queue-metrics'),
     path('api/', include(router.urls)),
     path('api/', include(products_router.urls)),
 ] 
\ No newline at end of file
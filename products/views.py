@@ -1,19 +1,71 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, IsAdminUser, SAFE_METHODS
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg, Count, F
+from django.db.models import Q, Avg, Case, Count, F, When
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_response_headers
 
-from .models import Category, Subcategory, Product, ProductImage, ProductReview
+from .changes import InvalidChangeToken, changes_since, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .columnar import columnar_product_ids
+from .db_routers import replica_reads
+from .dimensions import filter_dimensions
+from .features import feature_counts, filter_features
+from .home import home_bundle
+from .filters import ProductOrderingFilter, order_products
+from .inventory import (
+    InsufficientStock, SyncBatchConflict, reserve_stock, commit_reservation, release_reservation,
+    filter_stock_status, inventory_report, sync_inventory
+)
+from .jobs import queue_metrics
+from .listing import grid_queryset, listing_available
+from .merchandising import apply_sale_pricing, clear_sale_pricing, set_merchandising_flags
+from .models import Category, Subcategory, Product, ProductImage, ProductReview, StockReservation, ProductListing
+from .pagination import ReviewCursorPagination
+from .popularity import record_view
+from .pricing import next_price_change, seconds_until_price_change
+from .reviews import prefetch_latest_reviews
 from .serializers import (
     CategorySerializer, SubcategorySerializer, ProductSerializer,
-    ProductListSerializer, ProductDetailSerializer, ProductImageSerializer,
-    ProductReviewSerializer
+    ProductListSerializer, ProductListingSerializer, ProductDetailSerializer, ProductImageSerializer,
+    ProductReviewSerializer, StockReservationSerializer, BulkSalePricingSerializer,
+    BulkFlagsSerializer, InventorySyncSerializer, grid_serializer_class
 )
+from .specs import filter_specifications, spec_facets
+from .throttling import ProductSearchThrottle, ReviewCreateThrottle
+from .trigrams import fuzzy_search
+
+class ReplicaReadMixin:
+    """Serve the view's database reads from a read replica when one is configured"""
+
+    def dispatch(self, request, *args, **kwargs):
+        # Writes (staff bulk actions) read the rows they change from primary
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+class PriceExpiryMixin:
+    """Expire cacheable responses at the next scheduled sale start or end"""
+    # Actions whose responses must not be cached, such as the change feed
+    uncached_actions = set()
+    # Query parameters that make a response depend on stock levels
+    uncached_params = {'in_stock', 'stock_status'}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (request.method in SAFE_METHODS and response.status_code == 200
+                and getattr(self, 'action', None) not in self.uncached_actions
+                and not self.uncached_params.intersection(request.query_params)):
+            patch_response_headers(
+                response, seconds_until_price_change(next_price_change(), settings.PRODUCT_CACHE_MAX_AGE)
+            )
+        return response
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(PriceExpiryMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for furniture categories"""
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
@@ -23,15 +75,14 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     def products(self, request, slug=None):
         """Get all products in a category"""
         category = self.get_object()
-        products = Product.objects.filter(
-            category=category,
-            is_active=True
-        ).select_related('category', 'subcategory').prefetch_related('images')
+        products = grid_queryset(set(ProductListSerializer(context={'request': request}).fields)).filter(
+            category=category
+        )
         
         # Apply filters
         subcategory = request.query_params.get('subcategory')
         if subcategory:
-            products = products.filter(subcategory__slug=subcategory)
+            products = products.filter(subcategory__in=Subcategory.objects.filter(slug=subcategory).values('pk'))
         
         material = request.query_params.get('material')
         if material:
@@ -39,27 +90,33 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         
         min_price = request.query_params.get('min_price')
         if min_price:
-            products = products.filter(price__gte=min_price)
+            products = products.filter(effective_price__gte=min_price)
         
         max_price = request.query_params.get('max_price')
         if max_price:
-            products = products.filter(price__lte=max_price)
+            products = products.filter(effective_price__lte=max_price)
+        
+        # Filter by dimensions (max_length, max_width, max_height, fits)
+        products = filter_dimensions(products, request.query_params)
+        
+        # Filter by specifications (spec.<key>=value, spec.<key>__gte=n)
+        products = filter_specifications(products, request.query_params)
         
         # Apply ordering
-        ordering = request.query_params.get('ordering', '-created_at')
-        products = products.order_by(ordering)
+        products = order_products(products, request.query_params.get('ordering'))
         
+        serializer_class = grid_serializer_class(products)
         page = self.paginate_queryset(products)
         if page is not None:
-            serializer = ProductListSerializer(page, many=True, context={'request': request})
+            serializer = serializer_class(page, many=True, context={'request': request})
             return self.get_paginated_response(serializer.data)
         
-        serializer = ProductListSerializer(products, many=True, context={'request': request})
+        serializer = serializer_class(products, many=True, context={'request': request})
         return Response(serializer.data)
 
-class SubcategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class SubcategoryViewSet(PriceExpiryMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for furniture subcategories"""
-    queryset = Subcategory.objects.filter(is_active=True)
+    queryset = Subcategory.objects.filter(is_active=True).select_related('category')
     serializer_class = SubcategorySerializer
     lookup_field = 'slug'
     filter_backends = [DjangoFilterBackend]
@@ -69,10 +126,9 @@ class SubcategoryViewSet(viewsets.ReadOnlyModelViewSet):
     def products(self, request, slug=None):
         """Get all products in a subcategory"""
         subcategory = self.get_object()
-        products = Product.objects.filter(
-            subcategory=subcategory,
-            is_active=True
-        ).select_related('category', 'subcategory').prefetch_related('images')
+        products = grid_queryset(set(ProductListSerializer(context={'request': request}).fields)).filter(
+            subcategory=subcategory
+        )
         
         # Apply filters
         material = request.query_params.get('material')
@@ -81,66 +137,125 @@ class SubcategoryViewSet(viewsets.ReadOnlyModelViewSet):
         
         min_price = request.query_params.get('min_price')
         if min_price:
-            products = products.filter(price__gte=min_price)
+            products = products.filter(effective_price__gte=min_price)
         
         max_price = request.query_params.get('max_price')
         if max_price:
-            products = products.filter(price__lte=max_price)
+            products = products.filter(effective_price__lte=max_price)
+        
+        # Filter by dimensions (max_length, max_width, max_height, fits)
+        products = filter_dimensions(products, request.query_params)
+        
+        # Filter by specifications (spec.<key>=value, spec.<key>__gte=n)
+        products = filter_specifications(products, request.query_params)
         
         # Apply ordering
-        ordering = request.query_params.get('ordering', '-created_at')
-        products = products.order_by(ordering)
+        products = order_products(products, request.query_params.get('ordering'))
         
+        serializer_class = grid_serializer_class(products)
         page = self.paginate_queryset(products)
         if page is not None:
-            serializer = ProductListSerializer(page, many=True, context={'request': request})
+            serializer = serializer_class(page, many=True, context={'request': request})
             return self.get_paginated_response(serializer.data)
         
-        serializer = ProductListSerializer(products, many=True, context={'request': request})
+        serializer = serializer_class(products, many=True, context={'request': request})
         return Response(serializer.data)
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(PriceExpiryMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for furniture products"""
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductListSerializer
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, ProductOrderingFilter]
     filterset_fields = ['category', 'subcategory', 'material', 'finish', 'color', 'is_featured', 'is_bestseller']
-    search_fields = ['name', 'description', 'short_description', 'sku']
-    ordering_fields = ['price', 'created_at', 'name']
+    ordering_fields = ['price', 'discount', 'created_at', 'name', 'popularity']
     ordering = ['-created_at']
+    # Grid actions read the denormalised listing table; the rest work on products
+    grid_actions = {'list', 'featured', 'bestsellers', 'on_sale', 'biggest_discounts', 'search', 'specs', 'features'}
+    # Detail and multi-get carry live stock levels
+    uncached_actions = {'changes', 'retrieve', 'batch'}
+    
+    @property
+    def search_fields(self):
+        if self._uses_listing():
+            return ['name', 'product__description', 'product__short_description', 'product__sku']
+        return ['name', 'description', 'short_description', 'sku']
+    
+    def _uses_listing(self):
+        return self.action in self.grid_actions and listing_available(ProductListing.objects.db)
     
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related(
-            'category', 'subcategory'
-        ).prefetch_related('images', 'reviews')
+        if self._uses_listing():
+            queryset = ProductListing.objects.all()
+        else:
+            # Only load what the (possibly ?fields=/?omit= trimmed) serializer emits
+            fields = set(self.get_serializer().fields)
+            queryset = Product.objects.filter(is_active=True).for_listing(fields)
+            if 'reviews' in fields:
+                queryset = queryset.prefetch_related(prefetch_latest_reviews())
         
-        # Filter by price range
+        # Filter by the price customers pay (sale price when on sale)
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
         
         if min_price:
-            queryset = queryset.filter(price__gte=min_price)
+            queryset = queryset.filter(effective_price__gte=min_price)
         if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+            queryset = queryset.filter(effective_price__lte=max_price)
         
         # Filter by sale items
         on_sale = self.request.query_params.get('on_sale')
         if on_sale == 'true':
-            queryset = queryset.filter(sale_price__isnull=False).filter(sale_price__lt=F('price'))
+            queryset = queryset.filter(effective_price__lt=F('price'))
         
         # Filter by stock availability
         in_stock = self.request.query_params.get('in_stock')
         if in_stock == 'true':
             queryset = queryset.filter(stock_quantity__gt=0)
         
+        # Filter by stock status (low, out, ok)
+        stock_status = self.request.query_params.get('stock_status')
+        if stock_status:
+            queryset = filter_stock_status(queryset, stock_status)
+        
+        # Filter by dimensions (max_length, max_width, max_height, fits)
+        queryset = filter_dimensions(queryset, self.request.query_params)
+        
+        # Filter by specifications (spec.<key>=value, spec.<key>__gte=n)
+        queryset = filter_specifications(queryset, self.request.query_params)
+        
+        # Filter by feature tags (feature=a,b for any; repeat feature= for all)
+        queryset = filter_features(queryset, self.request.query_params)
+        
         return queryset
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ProductDetailSerializer
+        if self._uses_listing():
+            return ProductListingSerializer
         return ProductListSerializer
     
+    def list(self, request, *args, **kwargs):
+        ids = columnar_product_ids(request.query_params)
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        
+        # Filtered and ordered in memory; only the page's rows come from the database
+        page = self.paginate_queryset(ids)
+        ids = [int(pk) for pk in (ids if page is None else page)]
+        rows = {product.pk: product for product in self.get_queryset().filter(pk__in=ids)}
+        serializer = self.get_serializer([rows[pk] for pk in ids if pk in rows], many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # Buffered in memory; flushed to the daily view counts in batches
+        record_view(instance.pk)
+        return Response(self.get_serializer(instance).data)
+    
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured products"""
@@ -168,9 +283,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def on_sale(self, request):
         """Get products on sale"""
-        products = self.get_queryset().filter(
-            sale_price__isnull=False
-        ).filter(sale_price__lt=F('price'))
+        products = self.get_queryset().filter(effective_price__lt=F('price'))
         
         page = self.paginate_queryset(products)
         if page is not None:
@@ -181,30 +294,188 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """Get several products by slug and/or id in one request, in request order"""
+        slugs = [slug for slug in request.query_params.get('slugs', '').split(',') if slug]
+        try:
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk]
+        except ValueError:
+            return Response({'error': 'ids must be a comma-separated list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        slugs, ids = list(dict.fromkeys(slugs)), list(dict.fromkeys(ids))
+        if not slugs and not ids:
+            return Response({'error': 'Pass slugs and/or ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(slugs) + len(ids) > settings.PRODUCT_BATCH_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.PRODUCT_BATCH_MAX_ITEMS} products can be fetched at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        products = list(self.get_queryset().filter(Q(slug__in=slugs) | Q(pk__in=ids)))
+        by_slug = {product.slug: product for product in products}
+        by_id = {product.pk: product for product in products}
+        
+        # Request order, each product once even if asked for by slug and id
+        ordered = []
+        seen = set()
+        for product in [by_slug.get(slug) for slug in slugs] + [by_id.get(pk) for pk in ids]:
+            if product is not None and product.pk not in seen:
+                seen.add(product.pk)
+                ordered.append(product)
+        
+        serializer = ProductListSerializer(ordered, many=True, context=self.get_serializer_context())
+        return Response({
+            'results': serializer.data,
+            'missing': {
+                'slugs': [slug for slug in slugs if slug not in by_slug],
+                'ids': [pk for pk in ids if pk not in by_id],
+            },
+        })
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Products created, updated, deactivated or deleted since a change token"""
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Inactive products are included so they can be reported as removed
+        fields = set(self.get_serializer().fields)
+        queryset = Product.objects.for_listing(fields)
+        try:
+            entries, next_token, has_more = changes_since(
+                request.query_params.get('since'), limit, queryset
+            )
+        except InvalidChangeToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        products = [item for kind, item in entries if kind == 'product']
+        serialized = iter(ProductListSerializer(products, many=True, context=self.get_serializer_context()).data)
+        results = []
+        for kind, item in entries:
+            if kind == 'product':
+                results.append({'type': 'upsert', 'product': next(serialized)})
+            else:
+                product_id, slug, _ = item
+                results.append({'type': 'delete', 'id': product_id, 'slug': slug})
+        
+        return Response({'results': results, 'next_token': next_token, 'has_more': has_more})
+    
+    @action(detail=False, methods=['get'])
+    def specs(self, request):
+        """Specification keys, values and numeric ranges across the filtered products"""
+        return Response(spec_facets(self.filter_queryset(self.get_queryset())))
+    
+    @action(detail=False, methods=['get'])
+    def features(self, request):
+        """Feature tags with product counts across the filtered products"""
+        return Response(feature_counts(self.filter_queryset(self.get_queryset())))
+    
+    @action(detail=False, methods=['get'])
+    def biggest_discounts(self, request):
+        """Get products on sale, largest discount first"""
+        products = self.get_queryset().filter(discount_percent__gt=0).order_by('-discount_percent', '-created_at')
+        
+        page = self.paginate_queryset(products)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(products, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], throttle_classes=[ProductSearchThrottle])
     def search(self, request):
         """Advanced search functionality"""
         query = request.query_params.get('q', '')
         if not query:
             return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        products = self.get_queryset().filter(
+        matches = Product.objects.filter(
             Q(name__icontains=query) |
             Q(description__icontains=query) |
             Q(short_description__icontains=query) |
             Q(sku__icontains=query) |
             Q(category__name__icontains=query) |
             Q(subcategory__name__icontains=query)
-        )
+        ).values('pk')
+        products = self.get_queryset().filter(pk__in=matches)
+        
+        # Nothing contains the query as typed: rank close spellings through the trigram index
+        did_you_mean = None
+        if not products.exists():
+            ids, did_you_mean = fuzzy_search(query, using=products.db)
+            if ids:
+                products = self.get_queryset().filter(pk__in=ids).order_by(
+                    Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)])
+                )
         
         page = self.paginate_queryset(products)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            response.data['did_you_mean'] = did_you_mean
+            return response
         
         serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        return Response({'results': serializer.data, 'did_you_mean': did_you_mean})
+
+    def _bulk_queryset(self, request, ids):
+        queryset = self.filter_queryset(self.get_queryset())
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        return queryset
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_pricing(self, request):
+        """Set or clear sale prices on many products at once (staff only)"""
+        serializer = BulkSalePricingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        ids = data.get('ids')
+        if ids is None and not request.query_params:
+            return Response(
+                {'error': 'Pass product ids or filter the product list with query parameters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self._bulk_queryset(request, ids)
+        batches = []
+        progress = lambda done, total: batches.append({'done': done, 'total': total})
+        if data['mode'] == 'clear':
+            updated, skipped = clear_sale_pricing(queryset, progress=progress), 0
+        else:
+            updated, skipped = apply_sale_pricing(
+                queryset, data['mode'], data['amount'], data['rounding'], progress=progress,
+                starts_at=data.get('starts_at'), ends_at=data.get('ends_at')
+            )
+        return Response({'updated': updated, 'skipped': skipped, 'batches': batches})
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_flags(self, request):
+        """Toggle featured/bestseller flags on many products at once (staff only)"""
+        serializer = BulkFlagsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        ids = data.pop('ids', None)
+        if ids is None and not request.query_params:
+            return Response(
+                {'error': 'Pass product ids or filter the product list with query parameters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        batches = []
+        updated = set_merchandising_flags(
+            self._bulk_queryset(request, ids),
+            progress=lambda done, total: batches.append({'done': done, 'total': total}),
+            **data
+        )
+        return Response({'updated': updated, 'batches': batches})
 
-class ProductImageViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductImageViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for product images"""
     queryset = ProductImage.objects.all()
     serializer_class = ProductImageSerializer
@@ -216,6 +487,12 @@ class ProductReviewViewSet(viewsets.ModelViewSet):
     queryset = ProductReview.objects.filter(is_approved=True)
     serializer_class = ProductReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewCursorPagination
+    
+    def get_throttles(self):
+        if self.action == 'create':
+            return [ReviewCreateThrottle()]
+        return super().get_throttles()
     
     def get_queryset(self):
         product_slug = self.kwargs.get('product_slug')
@@ -236,3 +513,97 @@ class ProductReviewViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
         return super().create(request, *args, **kwargs)
+
+
+class StockReservationViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """ViewSet for time-limited stock reservations"""
+    queryset = StockReservation.objects.select_related('product')
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'token'
+    
+    def get_queryset(self):
+        # Other users' tokens are not found, so they cannot be committed or released
+        return super().get_queryset().filter(user=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation = reserve_stock(
+                serializer.validated_data['product'],
+                serializer.validated_data['quantity'],
+                serializer.validated_data.get('ttl_seconds'),
+                user=request.user
+            )
+        except InsufficientStock:
+            return Response({'error': 'Not enough stock available'}, status=status.HTTP_409_CONFLICT)
+        
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def commit(self, request, token=None):
+        """Confirm a reservation before it expires"""
+        reservation = self.get_object()
+        if not commit_reservation(reservation):
+            return Response({'error': 'Reservation is no longer active'}, status=status.HTTP_409_CONFLICT)
+        
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+    
+    @action(detail=True, methods=['post'])
+    def release(self, request, token=None):
+        """Cancel a reservation and return its stock"""
+        reservation = self.get_object()
+        if not release_reservation(reservation):
+            return Response({'error': 'Reservation is no longer active'}, status=status.HTTP_409_CONFLICT)
+        
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+
+class InventoryReportView(APIView):
+    """Staff-only stock value and low-stock counts per category and subcategory"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(inventory_report())
+
+
+class InventorySyncView(APIView):
+    """Staff-only batched stock and price updates from POS and warehouse systems"""
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request):
+        serializer = InventorySyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            batch, replayed = sync_inventory(data['batch_id'], data['items'], data['mode'], user=request.user)
+        except SyncBatchConflict as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        
+        summary = {key: 0 for key in ('updated', 'unchanged', 'not_found', 'rejected')}
+        for result in batch.results:
+            summary[result['status']] += 1
+        return Response({
+            'batch_id': batch.batch_id,
+            'replayed': replayed,
+            'applied_at': batch.created_at,
+            'summary': summary,
+            'results': batch.results,
+        })
+
+
+class HomeView(PriceExpiryMixin, ReplicaReadMixin, APIView):
+    """Every homepage section in one cached response"""
+    
+    def get(self, request):
+        return Response(home_bundle(request))
+
+class JobQueueMetricsView(APIView):
+    """Staff-only background job queue depth"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(queue_metrics())